@@ -16,7 +16,7 @@
 ------------------------------------------------------------------------------
 
 with Ada.Characters.Handling; use Ada.Characters.Handling;
-with GNATCOLL.Any_Types;      use GNATCOLL.Any_Types;
+with Ada.Containers.Vectors;
 
 with GPS.Editors;             use GPS.Editors;
 with GPS.Kernel;              use GPS.Kernel;
@@ -33,12 +33,6 @@ package body Completion.Python is
       return Simple_Python_Completion_Proposal;
    --  Creates a simple completion proposal
 
-   function Object_To_Proposal
-     (Resolver : access Completion_Python;
-      Object   : Class_Instance)
-      return Simple_Python_Completion_Proposal;
-   --  Return a completion proposal, assuming Object is a CompletionProposal
-
    ----------------------
    -- Lazy computation --
    ----------------------
@@ -53,14 +47,45 @@ package body Completion.Python is
       Object   : Class_Instance;
    end record;
 
+   --  The proposals are transferred from Python in batches, to limit the
+   --  number of calls between Ada and Python: the first batch is small, so
+   --  that the first proposals are displayed quickly, and the next ones are
+   --  larger, since the completion window fetches them in an idle loop.
+
+   First_Batch_Size : constant := 32;
+   Max_Batch_Size   : constant := 1024;
+
+   type Proposal_Fields is record
+      Category      : Language_Category;
+      Name          : Unbounded_String;
+      Label         : Unbounded_String;
+      Documentation : Unbounded_String;
+      Action_Name   : Unbounded_String;
+      Icon_Name     : Unbounded_String;
+      Object        : Class_Instance;
+   end record;
+   --  The fields of a proposal, as returned by get_data_as_list
+
+   package Proposal_Fields_Vectors is new Ada.Containers.Vectors
+     (Positive, Proposal_Fields);
+
    type Python_Iterator is
      new Completion_List_Pckg.Virtual_List_Component_Iterator
    with record
-      Resolver : access Completion_Python;
-      Object   : Class_Instance;
-      Proposal : Simple_Python_Completion_Proposal := No_Proposal;
+      Resolver   : access Completion_Python;
+      Object     : Class_Instance;
+      Batch      : Proposal_Fields_Vectors.Vector;
+      Index      : Positive := 1;
+      --  The current proposal in Batch
+
+      Batch_Size : Positive := First_Batch_Size;
+      Python_End : Boolean := False;
+      --  Whether the Python iterator has no more proposals
    end record;
 
+   procedure Fetch_Batch (It : in out Python_Iterator);
+   --  Replace It.Batch with the next proposals of the Python iterator
+
    overriding function First (List : Python_Component)
       return Completion_List_Pckg.Virtual_List_Component_Iterator'Class;
    overriding function At_End (It : Python_Iterator) return Boolean;
@@ -88,23 +113,67 @@ package body Completion.Python is
       Free (Args);
       Free (Sub);
 
+      Fetch_Batch (Iterator);
       return Iterator;
    end First;
 
-   ------------
-   -- At_End --
-   ------------
+   -----------------
+   -- Fetch_Batch --
+   -----------------
 
-   overriding function At_End (It : Python_Iterator) return Boolean is
+   procedure Fetch_Batch (It : in out Python_Iterator) is
       Sub    : Subprogram_Type := Get_Method
-        (It.Object, "_ada_at_end");
+        (It.Object, "_ada_next_batch");
       Script : constant Scripting_Language  := Get_Script (Sub.all);
-      Args   : Callback_Data'Class := Create (Script, 0);
-      Res    : constant Boolean := Execute (Sub, Args);
+      Args   : Callback_Data'Class := Create (Script, 1);
    begin
+      Set_Nth_Arg (Args, 1, It.Batch_Size);
+
+      declare
+         List : List_Instance'Class := Execute (Sub, Args);
+         Count : constant Natural := List.Number_Of_Arguments;
+      begin
+         It.Batch.Clear;
+         It.Index := 1;
+
+         for J in 1 .. Count loop
+            declare
+               Fields : List_Instance'Class := List.Nth_Arg (J);
+            begin
+               It.Batch.Append
+                 ((Category      =>
+                     Language_Category'Val (Nth_Arg (Fields, 6) - 1),
+                   Name          => To_Unbounded_String
+                     (String'(Nth_Arg (Fields, 1))),
+                   Label         => To_Unbounded_String
+                     (String'(Nth_Arg (Fields, 2))),
+                   Documentation => To_Unbounded_String
+                     (String'(Nth_Arg (Fields, 3))),
+                   Action_Name   => To_Unbounded_String
+                     (String'(Nth_Arg (Fields, 4))),
+                   Icon_Name     => To_Unbounded_String
+                     (String'(Nth_Arg (Fields, 5))),
+                   Object        => Nth_Arg (Fields, 7, Any_Class)));
+               Free (Fields);
+            end;
+         end loop;
+
+         It.Python_End := Count < It.Batch_Size;
+         It.Batch_Size := Positive'Min (It.Batch_Size * 4, Max_Batch_Size);
+         Free (List);
+      end;
+
       Free (Args);
       Free (Sub);
-      return Res;
+   end Fetch_Batch;
+
+   ------------
+   -- At_End --
+   ------------
+
+   overriding function At_End (It : Python_Iterator) return Boolean is
+   begin
+      return It.Index > Natural (It.Batch.Length);
    end At_End;
 
    ----------
@@ -112,14 +181,11 @@ package body Completion.Python is
    ----------
 
    overriding procedure Next (It : in out Python_Iterator) is
-      Sub     : Subprogram_Type := Get_Method
-        (It.Object, "_ada_next");
-      Script  : constant Scripting_Language  := Get_Script (Sub.all);
-      Args    : Callback_Data'Class := Create (Script, 0);
-      Ignored : Any_Type := Execute (Sub, Args);
    begin
-      Free (Args);
-      Free (Sub);
+      It.Index := It.Index + 1;
+      if It.Index > Natural (It.Batch.Length) and then not It.Python_End then
+         Fetch_Batch (It);
+      end if;
    end Next;
 
    ---------
@@ -129,27 +195,23 @@ package body Completion.Python is
    overriding function Get
      (It : in out Python_Iterator) return Completion_Proposal'Class
    is
-      Sub    : Subprogram_Type := Get_Method
-        (It.Object, "_ada_get");
-      Script : constant Scripting_Language  := Get_Script (Sub.all);
-      Args   : Callback_Data'Class := Create (Script, 0);
-      Object : Class_Instance;
-
+      Fields   : constant Proposal_Fields := It.Batch.Element (It.Index);
+      Proposal : Simple_Python_Completion_Proposal := Create_Simple_Proposal
+        (It.Resolver,
+         Fields.Category,
+         To_String (Fields.Name),
+         To_String (Fields.Label),
+         To_String (Fields.Documentation),
+         To_String (Fields.Action_Name),
+         To_String (Fields.Icon_Name));
    begin
-      --  The code below can be used to implement a cache
-      --  ??? and probably should
-
---        if It.Proposal = No_Proposal then
---           Object := Execute (Sub, Args);
---           It.Proposal := Object_To_Proposal (It.Resolver, Object);
---        end if;
---
---        return It.Proposal;
+      --  An empty documentation might be computed lazily, when the proposal
+      --  is selected: keep the Python object in this case.
+      if Fields.Documentation = Null_Unbounded_String then
+         Proposal.Object := Fields.Object;
+      end if;
 
-      Object := Execute (Sub, Args);
-      Free (Args);
-      Free (Sub);
-      return Object_To_Proposal (It.Resolver, Object);
+      return Proposal;
    end Get;
 
    ----------------------------
@@ -170,40 +232,12 @@ package body Completion.Python is
                    Label    => To_Unbounded_String (Label),
                    Documentation => To_Unbounded_String (Documentation),
                    Action_Name => To_Unbounded_String (Action_Name),
-                   Icon_Name => To_Unbounded_String (Icon_Name));
+                   Icon_Name => To_Unbounded_String (Icon_Name),
+                   Object    => No_Class_Instance);
 
       return Proposal;
    end Create_Simple_Proposal;
 
-   ------------------------
-   -- Object_To_Proposal --
-   ------------------------
-
-   function Object_To_Proposal
-     (Resolver : access Completion_Python;
-      Object   : Class_Instance)
-      return Simple_Python_Completion_Proposal
-   is
-      Sub      : Subprogram_Type := Get_Method (Object, "get_data_as_list");
-      Script   : constant Scripting_Language  := Get_Script (Sub.all);
-      Proposal : Simple_Python_Completion_Proposal;
-      Args     : Callback_Data'Class := Create (Script, 0);
-      Fields   : List_Instance := Execute (Sub, Args);
-   begin
-      Proposal := Create_Simple_Proposal
-        (Resolver,
-         Language_Category'Val (Nth_Arg (Fields, 6) - 1),
-         Nth_Arg (Fields, 1),
-         Nth_Arg (Fields, 2),
-         Nth_Arg (Fields, 3),
-         Nth_Arg (Fields, 4),
-         Nth_Arg (Fields, 5));
-      Free (Args);
-      Free (Sub);
-      Free (Fields);
-      return Proposal;
-   end Object_To_Proposal;
-
    -------------------------
    -- Get_Completion_Root --
    -------------------------
@@ -274,6 +308,22 @@ package body Completion.Python is
    overriding function Get_Documentation
      (Proposal : Simple_Python_Completion_Proposal) return String is
    begin
+      if Proposal.Documentation = Null_Unbounded_String
+        and then Proposal.Object /= No_Class_Instance
+      then
+         declare
+            Sub    : Subprogram_Type := Get_Method
+              (Proposal.Object, "get_documentation");
+            Script : constant Scripting_Language  := Get_Script (Sub.all);
+            Args   : Callback_Data'Class := Create (Script, 0);
+            Doc    : constant String := Execute (Sub, Args);
+         begin
+            Free (Args);
+            Free (Sub);
+            return Doc;
+         end;
+      end if;
+
       return To_String (Proposal.Documentation);
    end Get_Documentation;
 
@@ -352,7 +402,8 @@ package body Completion.Python is
          Label         => Proposal.Label,
          Documentation => Proposal.Documentation,
          Icon_Name     => Proposal.Icon_Name,
-         Action_Name   => Proposal.Action_Name);
+         Action_Name   => Proposal.Action_Name,
+         Object        => Proposal.Object);
    end Deep_Copy;
 
    -----------------
@@ -6245,7 +6245,7 @@ class File(object):
         """
         pass  # implemented in Ada
 
-    def references(self, kind="", sortby=0):
+    def references(self, kind="", sortby=0, show_kind=False):
         """
         Returns all references (to any entity) within the file. The acceptable
         values for kind can currently be retrieved directly from the
@@ -6266,8 +6266,15 @@ class File(object):
            appear in the file; 1 indicates that they are sorted first by
            entity, and then in file order.
 
+        :param bool show_kind: if True, the kind of each reference (as
+           would be returned by :func:`GPS.Entity.references` with
+           show_kind) is added to each tuple. This is the efficient way to
+           get the kinds of all the references in a set of files, rather
+           than querying each entity separately.
+
         :return: A list of tuples (:class:`GPS.Entity`,
-           :class:`GPS.FileLocation`)
+           :class:`GPS.FileLocation`), or (:class:`GPS.Entity`,
+           :class:`GPS.FileLocation`, string) if show_kind is True.
         """
 
     def remove_property(self, name):
@@ -7731,6 +7738,37 @@ class Message(object):
         """
         pass  # implemented in Ada
 
+    @staticmethod
+    def count(category=None, file=None, flags=0):
+        """
+        Returns the number of top (nested are not included) messages
+        currently stored in GPS. This is much cheaper than computing the
+        length of :func:`GPS.Message.list`, since no message instance is
+        created.
+
+        :param category: a String.
+            Specifying this parameter restricts the count to messages
+            of this category only
+
+        :param file: a :class:`GPS File`.
+            Specifying this parameter restricts the count to messages
+            to this file only.
+
+        :param flags: an integer.
+            When not zero, only the messages which have at least one of these
+            flags set are counted (see :func:`GPS.Message.get_flags`).
+
+        :return: an integer
+
+        .. code-block:: python
+
+           # Whether there are messages for this file in the Locations view
+           GPS.Message.count(
+               file=GPS.File("foo.adb"),
+               flags=GPS.Message.Flags.IN_LOCATIONS) > 0
+        """
+        pass  # implemented in Ada
+
     def create_nested_message(self, file, line, column, text):
         """
         Add nested message.
@@ -8310,6 +8348,21 @@ class Preference(object):
         """
         pass  # implemented in Ada
 
+    @staticmethod
+    def list():
+        """
+        Lists the names of all the preferences, including the ones defined
+        by GPS itself.
+
+        :return: A list of strings
+
+        .. code-block:: python
+
+           for name in GPS.Preference.list():
+              print "%s = %s" % (name, GPS.Preference(name).get())
+        """
+        pass  # implemented in Ada
+
 
 ###########################################################
 # PreferencesPage
@@ -42,6 +42,7 @@ package body GPS.Kernel.Messages.Shell is
    Category_Cst      : aliased constant String := "category";
    File_Cst          : aliased constant String := "file";
    Hint_Cst          : aliased constant String := "hint";
+   Flags_Cst         : aliased constant String := "flags";
 
    type Message_Property_Record is new Instance_Property_Record with record
       Message : Message_Reference;
@@ -511,6 +512,94 @@ package body GPS.Kernel.Messages.Shell is
                Add_Messages_For_Category (To_Unbounded_String (Cat));
             end if;
          end;
+
+      elsif Command = "count" then
+         Name_Parameters
+           (Data,
+            (1 => Category_Cst'Access,
+             2 => File_Cst'Access,
+             3 => Flags_Cst'Access));
+
+         declare
+            Cat       : constant String := Nth_Arg (Data, 1, "");
+            File_Inst : constant Class_Instance :=
+              Nth_Arg
+                (Data, 2, Get_File_Class (Kernel),
+                 Default => No_Class_Instance, Allow_Null => True);
+            Mask      : constant Message_Flags :=
+              From_Int (Nth_Arg (Data, 3, 0));
+            Count     : Natural := 0;
+
+            procedure Count_Messages_For_Category_File
+              (C : Unbounded_String;
+               F : Virtual_File);
+            --  Add to Count the number of messages for category C and file F
+            --  which match Mask.
+
+            procedure Count_Messages_For_Category (C : Unbounded_String);
+            --  Add to Count the number of messages in C for the given file.
+
+            --------------------------------------
+            -- Count_Messages_For_Category_File --
+            --------------------------------------
+
+            procedure Count_Messages_For_Category_File
+              (C : Unbounded_String;
+               F : Virtual_File)
+            is
+               Messages : constant Message_Array :=
+                 Get_Messages (Container, C, F);
+            begin
+               if Mask = Empty_Message_Flags then
+                  Count := Count + Messages'Length;
+               else
+                  for J in Messages'Range loop
+                     if (Messages (J).Get_Flags and Mask)
+                       /= Empty_Message_Flags
+                     then
+                        Count := Count + 1;
+                     end if;
+                  end loop;
+               end if;
+            end Count_Messages_For_Category_File;
+
+            ---------------------------------
+            -- Count_Messages_For_Category --
+            ---------------------------------
+
+            procedure Count_Messages_For_Category (C : Unbounded_String) is
+            begin
+               if File_Inst = No_Class_Instance then
+                  declare
+                     Files : constant Virtual_File_Array :=
+                       Get_Files (Container, C);
+                  begin
+                     for J in Files'Range loop
+                        Count_Messages_For_Category_File (C, Files (J));
+                     end loop;
+                  end;
+               else
+                  Count_Messages_For_Category_File
+                    (C, Get_Data (File_Inst));
+               end if;
+            end Count_Messages_For_Category;
+
+         begin
+            if Cat = "" then
+               declare
+                  Categories : constant Unbounded_String_Array :=
+                    Get_Categories (Container);
+               begin
+                  for J in Categories'Range loop
+                     Count_Messages_For_Category (Categories (J));
+                  end loop;
+               end;
+            else
+               Count_Messages_For_Category (To_Unbounded_String (Cat));
+            end if;
+
+            Set_Return_Value (Data, Count);
+         end;
       end if;
    end Message_Command_Handler;
 
@@ -556,6 +645,10 @@ package body GPS.Kernel.Messages.Shell is
         (Kernel, "list", 0, 2, Message_Command_Handler'Access,
          Message_Class, True);
 
+      Register_Command
+        (Kernel, "count", 0, 3, Message_Command_Handler'Access,
+         Message_Class, True);
+
       Register_Command
         (Kernel, "set_sort_order_hint", 2, 2, Message_Command_Handler'Access,
          Message_Class, True);
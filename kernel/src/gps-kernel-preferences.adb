@@ -77,6 +77,10 @@ package body GPS.Kernel.Preferences is
      (Data : in out Callback_Data'Class; Command : String);
    --  Get preference command handler
 
+   procedure List_Command_Handler
+     (Data : in out Callback_Data'Class; Command : String);
+   --  Handler for GPS.Preference.list
+
    procedure Preferences_Page_Commands_Handler
      (Data : in out Callback_Data'Class; Command : String);
    --  Handler for the commands related with preferences pages.
@@ -244,6 +248,29 @@ package body GPS.Kernel.Preferences is
       end;
    end Preferences_Page_Commands_Handler;
 
+   --------------------------
+   -- List_Command_Handler --
+   --------------------------
+
+   procedure List_Command_Handler
+     (Data : in out Callback_Data'Class; Command : String)
+   is
+      pragma Unreferenced (Command);
+      Manager : constant Preferences_Manager :=
+        Get_Kernel (Data).Get_Preferences;
+      C       : Preference_Cursor := Manager.Get_First_Reference;
+      P       : Preference;
+   begin
+      Set_Return_Value_As_List (Data);
+
+      loop
+         P := Get_Pref (C, Manager);
+         exit when P = null;
+         Set_Return_Value (Data, P.Get_Name);
+         Next (C);
+      end loop;
+   end List_Command_Handler;
+
    -------------------------
    -- Get_Command_Handler --
    -------------------------
@@ -1946,6 +1973,12 @@ package body GPS.Kernel.Preferences is
          Class        => Pref_Class,
          Handler      => Get_Command_Handler'Access);
 
+      Register_Command
+        (Kernel, "list",
+         Class         => Pref_Class,
+         Static_Method => True,
+         Handler       => List_Command_Handler'Access);
+
       Register_Command
         (Kernel, "create",
          Minimum_Args => 2,
@@ -145,6 +145,7 @@ package body GPS.Scripts.Files is
             Sortby : constant Integer := Nth_Arg
                (Data, 3, References_Sort'Pos (References_Sort'First));
             Sort   : constant References_Sort := References_Sort'Val (Sortby);
+            Show_Kind : constant Boolean := Nth_Arg (Data, 4, False);
             Result : List_Instance'Class := New_List (Get_Script (Data));
             F      : constant Class_Instance :=
               Nth_Arg
@@ -170,6 +171,11 @@ package body GPS.Scripts.Files is
                       File   => Get_Data (F),
                       Line   => Loc.Line,
                       Column => Loc.Column));
+
+                  if Show_Kind then
+                     L.Set_Nth_Arg (Natural'Last, Get_Display_Kind (R));
+                  end if;
+
                   Result.Set_Nth_Arg (Natural'Last, L);
                   Free (L);  --  refcount has been increased above
                end;
@@ -271,7 +277,8 @@ package body GPS.Scripts.Files is
          Class   => Get_File_Class (Kernel),
          Handler => File_Command_Handler'Access,
          Params  => (2 => Param ("kind", Optional => True),
-                     3 => Param ("sortby", Optional => True)));
+                     3 => Param ("sortby", Optional => True),
+                     4 => Param ("show_kind", Optional => True)));
    end Register_Commands;
 
 end GPS.Scripts.Files;
@@ -30,6 +30,7 @@ graphical tree widget, which you can dynamically manipulate.
 
 from GPS import Console, EditorBuffer, File, Preference, Project, XMLViewer
 from gs_utils import interactive
+import import_graph
 import traceback
 import re
 import os
@@ -176,22 +177,10 @@ def compute_project_dependencies(output):
         current_deps = dict()
         for p in Project.root().dependencies(recursive=True):
             current_deps[p] = [cur for cur in p.dependencies(recursive=False)]
-            tmp = dict()
-            previous = p
-            for s in p.sources(recursive=False):
-                for imp in s.imports(include_implicit=True,
-                                     include_system=False):
-                    ip = imp.project(default_to_root=False)
-                    if ip and ip != p:
-                        if show_single_file:
-                            if ip != previous:
-                                tmp[ip] = [(s, imp)]
-                        else:
-                            try:
-                                tmp[ip].append((s, imp))
-                            except KeyError:
-                                tmp[ip] = [(s, imp)]
-                        previous = ip
+            tmp = import_graph.graph.project_imports(
+                p, include_implicit=True)
+            if show_single_file:
+                tmp = {ip: reasons[:1] for ip, reasons in tmp.items()}
             depends_on[p] = tmp
 
         no_source_projects = [
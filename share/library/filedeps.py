@@ -18,60 +18,31 @@ second (for instance "file1" depends on "file2", which depends on "file3")
 
 import GPS
 import os.path
+import import_graph
 from gs_utils import interactive
 
 
 def internal_dependency_path(from_file, to_file, include_implicit):
-    # We do the computation starting from to_file, since it is more efficient
-    # to compute "imported" files than "importing files". Since we want to
-    # compute the path itself, do not do a recursive search.
-    deps = dict()
-
-    # List of files to analyze. This is a list of tuples, the first element of
-    # which is the name of the file to analyze, and the second is the name of
-    # the parent that put it in the list
-    to_analyze = [(from_file, None)]
-
-    while len(to_analyze) != 0:
-        (file, because_of) = to_analyze.pop()
-        imports = file.imports(include_implicit=include_implicit,
-                               include_system=False)
-
-        # imports does not list the dependency from body to spec, so we add it
-        # explicitly if from_file is a body.
-
-        ext = os.path.splitext(from_file.path)
-        if ext[1] == ".adb" or (ext[1] == ".ada" and ext[0][-2:] == ".2"):
-            imports.append(from_file.other_file())
-
-        deps[file] = because_of
-        if file == to_file:
-            break
-
-        for f in imports:
-            if f and f not in deps:
-                to_analyze.append((f, file))
-
-    target = to_file
-    result = ""
-    targets = []
-
-    while target:
-        targets.append(target)
-        result = " -> " + target.path + "\n" + result
-        if target not in deps:
-            result = "No dependency between these two files"
-            break
-        target = deps[target]
-    return (result, targets)
+    # The imports of each file are cached in import_graph, so that computing
+    # the path again (for instance with implicit dependencies) does not
+    # query the cross-reference database again.
+    path = import_graph.graph.shortest_path(
+        from_file, to_file, include_implicit=include_implicit)
+
+    if path is None:
+        return ("No dependency between these two files", [to_file])
+
+    result = "".join(" -> " + f.path + "\n" for f in path)
+    path.reverse()
+    return (result, path)
 
 
 def dependency_path(from_file, to_file, fill_location=False, title=""):
     """Shows why modifying to_file implies that from_file needs to be
        recompiled. This information is computed from the cross-references
        database, and requires your application to have been compiled
-       properly. This function does not attempt to compute the shortest
-       dependency path, and just returns the first one it finds.
+       properly. This function returns one of the shortest dependency
+       paths.
        FROM_FILE and TO_FILE must be instances of GPS.File.
        If FILL_LOCATION is True, then the locations view will also be
        filled."""
@@ -96,6 +67,7 @@ def dependency_path(from_file, to_file, fill_location=False, title=""):
 
     if fill_location and result != "No dependency between these two files":
         target = targets.pop()
+        added = False  # Whether a location was added for one of the steps
 
         # Fill the locations view with the result
         while len(targets) != 0:
@@ -38,12 +38,44 @@ It also shows how to get the word under the cursor in GPS.
 # No user customization below this line
 ###########################################################################
 
+import re
 import os_utils
 from text_utils import goto_word_start, goto_word_end, BlockIterator, \
     with_save_excursion
 import GPS
 import modules   # from GPS
 from gs_utils import make_interactive
+from workflows import run_as_workflow
+from workflows.promises import wait_idle
+
+BATCH_SIZE = 200
+# The maximal number of words sent to aspell on a single line
+
+PIPELINE_DEPTH = 4
+# The maximal number of lines sent to aspell before reading its output
+
+BLOCKS_PER_STEP = 50
+# The number of blocks scanned by the background check before it lets
+# GPS handle the pending events
+
+word_re = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+# The words sent to aspell. Apostrophes inside a word are kept, as aspell
+# does, so that contractions like "doesn't" are checked as a whole.
+
+
+def parse_aspell_output(output):
+    """
+    Parse the output of aspell for one or more lines, and return a dict
+    mapping the mispelled words to their list of suggestions. The
+    mispelled words for which aspell has no suggestion are ignored.
+    """
+    result = {}
+    for proposal in output.splitlines():
+        if proposal and proposal[0] == '&':
+            colon = proposal.find(":")
+            meta = proposal[:colon].split()
+            result[meta[1]] = proposal[colon + 2:].replace(' ', '').split(',')
+    return result
 
 
 def find_current_word(context):
@@ -72,6 +104,69 @@ def find_current_word(context):
     context.ispell_module_word = buffer.get_chars(start, cursor)
 
 
+class Background_Checker(object):
+    """
+    Checks words with a separate aspell process, without blocking GPS, to
+    fill the cache of known words of the module. The words are sent in
+    batches, and several batches can be waiting for the output of aspell.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.process = None
+        self.queue = []     # the batches of words to send
+        self.pending = []   # the batches sent, waiting for the output
+
+    def check(self, words):
+        """Check the words that are not known yet"""
+        queued = set(w for batch in self.queue + self.pending for w in batch)
+        words = [w for w in set(words)
+                 if not self.module.is_known(w) and w not in queued]
+        for j in range(0, len(words), BATCH_SIZE):
+            self.queue.append(words[j:j + BATCH_SIZE])
+        self._send()
+
+    def _send(self):
+        while self.queue and len(self.pending) < PIPELINE_DEPTH:
+            if not self.process:
+                try:
+                    self.process = GPS.Process(
+                        self.module.ispell_command,
+                        regexp="^[\\r\\n]+",
+                        on_match=self._on_match,
+                        on_exit=self._on_exit,
+                        task_manager=False)
+                except Exception:
+                    self.process = None
+                    self.queue = []
+                    return
+
+            batch = self.queue.pop(0)
+            self.pending.append(batch)
+            self.process.send(" %s" % (" ".join(batch), ))
+
+    def _on_match(self, process, matched, unmatched):
+        if self.pending:
+            self.module.add_results(self.pending.pop(0), unmatched)
+            self._send()
+
+    def _on_exit(self, process, status, output):
+        self.process = None
+        self.queue = []
+        self.pending = []
+
+    def accept(self, word):
+        """Accept word for the rest of the session, as the user did"""
+        if self.process:
+            self.process.send("@%s" % (word, ))
+
+    def kill(self):
+        """Kill the aspell process, if it is running"""
+        if self.process:
+            self.process.kill()
+        self._on_exit(None, 0, "")
+
+
 class Spell_Check_Module(modules.Module):
 
     def setup(self):
@@ -104,7 +199,17 @@ is sent to its stdin.""",
         self.dynamic = None         # context menu
         self.personal_dict_modified = False
         self.window = None          # The command window for user interaction
-        self.local_dict = set()     # Temporary saves user overrides
+
+        # The cache of the words checked during this session: the set of
+        # correct words, and the suggestions for the mispelled words.
+        self.good_words = set()
+        self.bad_words = {}
+
+        # For each file, the text of the blocks that had no mispelling
+        # during the last check, so that they are not checked again.
+        self.clean_blocks = {}
+
+        self.background = Background_Checker(self)
 
         make_interactive(
             callback=self.spell_check_comments,
@@ -132,6 +237,7 @@ is sent to its stdin.""",
     def teardown(self):
         """Terminates the module"""
         self.kill()
+        self.background.kill()
         super(Spell_Check_Module, self).teardown()
 
     def _filter_has_word(self, context):
@@ -169,6 +275,13 @@ is sent to its stdin.""",
             if self.ispell:
                 GPS.Logger('ISPELL').log('command changed, restart process')
                 self.kill()
+            self.background.kill()
+
+            # The results depend on the command (for instance on the
+            # language)
+            self.good_words = set()
+            self.bad_words = {}
+            self.clean_blocks = {}
 
             self.ispell_command = ''
             if os_utils.locate_exec_on_path(cmd.split()[0]):
@@ -202,21 +315,42 @@ is sent to its stdin.""",
 
                 # Make sure the dict is saved: since ispell doesn't show any
                 # output, we generate some
-                next(self.generate_fix("word"))
+                self.ispell.send(" word")
+                self.ispell.expect("^[\\r\\n]+", timeout=2000)
 
                 self.personal_dict_modified = False
 
+    def is_known(self, word):
+        """Whether word is in the cache of checked words"""
+        return word in self.good_words or word in self.bad_words
+
+    def add_results(self, words, output):
+        """Add to the cache the result of checking words with aspell.
+           The words accepted by the user since they were sent to aspell
+           remain correct.
+        """
+        bad = {w: suggestions
+               for w, suggestions in parse_aspell_output(output).items()
+               if w not in self.good_words}
+        self.bad_words.update(bad)
+        self.good_words.update(w for w in words if w not in bad)
+
+    def _accept_word(self, word):
+        self.bad_words.pop(word, None)
+        self.good_words.add(word)
+        self.background.accept(word)
+
     def ignore_word(self, word):
         """Should ignore word from now on, but not add it to personal dict"""
         self._restart_if_needed()
-        self.local_dict.add(word)
+        self._accept_word(word)
         self.ispell.send("@%s\n" % word)
 
     def add_word_to_dict(self, word):
         """Add word to the user's personal dictionary"""
         self._restart_if_needed()
         self.ispell.send("*%s\n" % word)
-        self.local_dict.add(word)
+        self._accept_word(word)
         self.personal_dict_modified = True
 
     def _before_killing_ispell(self, proc, output):
@@ -250,92 +384,124 @@ is sent to its stdin.""",
     # Finding mispellings
     ##############################
 
-    def generate_fix(self, category):
+    def check_words(self, words):
         """
-        A generator that runs ispell to find out the possible mispelling in
-        the text. It yields for every mispelling (and sets self.current to
-        the current value, so that replace() can be called).
-        For efficiency, it passes whole lines at a time to ispell (which does
-        not accept multi-line input).
+        Check the words that are not in the cache yet, and add them to the
+        cache. The words are sent in batches, and up to PIPELINE_DEPTH
+        batches are sent before reading the output of ispell.
+        Return False if ispell could not check them.
 
         Ispell runs forever, waiting for words to check on its standard input.
         Note the use of a timeout in the call to expect(). This is so that if
         for some reason ispell answers something unexpected, we don't keep
         waiting for ever.
         """
-
-        self.buffer = GPS.EditorBuffer.get()
-
-        for start, end in BlockIterator(self.buffer, category):
-            while start < end:
-                end_line = start.forward_line()
-                # need mark, since we modify buffer
-                next_line = end_line.create_mark()
-                line = self.buffer.get_chars(start, end_line - 1)
-                offset_adjust = 0
-                attempt = 0
-                result = None
-
-                # When a user choses to ignore a word, we need to take
-                # into account for all mispelling suggested in the current
-                # block, since ispell had not been updated yet.
-
-                self.local_dict = set()
-
-                while attempt < 2:
-                    self._restart_if_needed()
-                    if not self.ispell:
-                        raise StopIteration
-
-                    # Always prepend a space, to protect special characters at
-                    # the beginning of words that might be interpreted by
-                    # aspell.
-
-                    self.ispell.send(" %s" % (line, ))
-
-                    # output of aspell ends with an empty line, but includes
-                    # multiple blank lines
-
-                    result = self.ispell.expect("^[\\r\\n]+", timeout=2000)
-                    if result:
-                        break
-
+        words = [w for w in set(words) if not self.is_known(w)]
+        batches = [words[j:j + BATCH_SIZE]
+                   for j in range(0, len(words), BATCH_SIZE)]
+        attempt = 0
+
+        while batches and attempt < 2:
+            self._restart_if_needed()
+            if not self.ispell:
+                return False
+
+            # Always prepend a space, to protect special characters at
+            # the beginning of words that might be interpreted by aspell.
+            sent = batches[:PIPELINE_DEPTH]
+            for batch in sent:
+                self.ispell.send(" %s" % (" ".join(batch), ))
+
+            # The output of aspell for each line ends with an empty line
+            for batch in sent:
+                result = self.ispell.expect("^[\\r\\n]+", timeout=2000)
+                if not result:
                     attempt += 1
                     self.kill()
+                    break
+                self.add_results(batch, result)
+                batches.pop(0)
 
-                if not result:
-                    raise StopIteration
-
-                for proposal in result.splitlines():
-                    if proposal and proposal[0] == '&':
-                        colon = proposal.find(":")
-                        meta = proposal[:colon].split()
+        return not batches
 
-                        if meta[1] not in self.local_dict:
-                            s = start - 1 + offset_adjust + int(meta[3])
-                            e = s + len(meta[1])
-                            e_off = e.offset()
+    def generate_fix(self, category):
+        """
+        A generator that finds out the possible mispelling in the text. It
+        yields for every mispelling (and sets self.current to the current
+        value, so that replace() can be called).
+        For efficiency, the words of each block are checked at once, and
+        only the words not checked before during the session are sent to
+        ispell. The blocks that had no mispelling during the last check are
+        skipped.
+        """
 
-                            # need to take a mark one character away, since
-                            # otherwise the mark would end up at the beginning
-                            # of the replacement
-                            e_mark = (e + 1).create_mark()
+        self.buffer = GPS.EditorBuffer.get()
+        clean = self.clean_blocks.setdefault(self.buffer.file().name(), set())
+        seen = set()
 
-                            self.current = (
-                                meta[1],   # mispelled
-                                s,
-                                e,
-                                proposal[colon + 2:].replace(' ', '')
-                                .split(','))
-                            yield self.current
+        for start, end in BlockIterator(self.buffer, category):
+            text = self.buffer.get_chars(start, end)
+            if text in clean:
+                seen.add(text)
+                continue
+
+            matches = list(word_re.finditer(text))
+            if not self.check_words(m.group(0) for m in matches):
+                return
+
+            offset_adjust = 0
+            for m in matches:
+                if m.group(0) in self.bad_words:
+                    s = start + offset_adjust + m.start()
+                    e = s + len(m.group(0))
+                    e_off = e.offset()
+
+                    # need to take a mark one character away, since
+                    # otherwise the mark would end up at the beginning
+                    # of the replacement
+                    e_mark = (e + 1).create_mark()
+
+                    self.current = (
+                        m.group(0),   # mispelled
+                        s,
+                        e,
+                        self.bad_words[m.group(0)])
+                    yield self.current
+
+                    # Take into account changes in the length of words
+                    offset_adjust += (e_mark.location().offset() -
+                                      e_off - 1)
+
+            if offset_adjust == 0 and not any(
+                    m.group(0) in self.bad_words for m in matches):
+                clean.add(text)
+                seen.add(text)
+
+        # Forget the blocks that no longer exist
+        if category not in ('word', 'selection'):
+            self.clean_blocks[self.buffer.file().name()] = seen
+
+    @run_as_workflow
+    def check_in_background(self, buffer, category):
+        """
+        Send the words of the blocks of buffer that need to be checked to
+        the background checker, so that they are in the cache when the
+        user reaches them.
+        """
+        clean = self.clean_blocks.get(buffer.file().name(), set())
+        words = []
 
-                            # Take into account changes in the length of words
-                            offset_adjust += (e_mark.location().offset() -
-                                              e_off - 1)
+        for count, (start, end) in enumerate(BlockIterator(buffer, category)):
+            text = buffer.get_chars(start, end)
+            if text not in clean:
+                words.extend(word_re.findall(text))
 
-                start = next_line.location()
+            if count % BLOCKS_PER_STEP == BLOCKS_PER_STEP - 1:
+                self.background.check(words)
+                words = []
+                yield wait_idle()
 
-        raise StopIteration
+        self.background.check(words)
 
     ##############################
     # Command window
@@ -352,6 +518,11 @@ is sent to its stdin.""",
         self.mispellings = self.generate_fix(category)  # init generator
         self._next_with_error_or_destroy()
 
+        # Check the rest of the editor while the user handles the first
+        # mispelling
+        if self.window and category not in ('word', 'selection'):
+            self.check_in_background(self.buffer, category)
+
     @with_save_excursion
     def replace(self, input):
         """
@@ -419,11 +590,9 @@ is sent to its stdin.""",
         key = key.replace("shift-", "")
         if key == "i":
             self.ignore_word(self.current[0])
-            self.local_dict.add(self.current[0])
             self._next_with_error_or_destroy()
         elif key == "a":
             self.add_word_to_dict(self.current[0])
-            self.local_dict.add(self.current[0])
             self._next_with_error_or_destroy()
         elif key == "r":
             self.window.write("")
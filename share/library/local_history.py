@@ -1,14 +1,15 @@
 """Local history for files
 
 This script provides a local history for files: every time a file is saved,
-it is also committed in a local RCS directory, which can later be used to
-easily revert to a previous version.
+a snapshot of it is also stored in a local history directory, which can
+later be used to easily revert to a previous version.
 Compared to the standard undo feature in GPS, this provides a persistent
 undo across GPS sessions.
 
-You must install RCS. On Unix systems, this is generally available by
-default. On Windows, this is available through the cygwin environment.
-If RCS is not detected on your PATH, this module will do nothing.
+Snapshots are stored in a content-addressed store: each distinct version of
+a file is compressed and stored only once, under the name of its checksum,
+and each file has an append-only index listing its revisions. No external
+tool is needed, and saving a file does not spawn any process.
 
 A new contextual menu is shown for files that have a local history. This
 menu allows you to view the diff between the current version of the file
@@ -24,16 +25,20 @@ therefore be reverted.
 ############################################################################
 
 from GPS import Console, Contextual, EditorBuffer, File, Hook, Logger, \
-    Preference, Process, Vdiff, XMLViewer
+    Preference, Vdiff, XMLViewer
+from gi.repository import GLib
 import os
 import shutil
 import datetime
+import difflib
+import hashlib
 import traceback
 import time
 import re
+import zlib
 
 Preference("Plugins/local_history/rcsdir").create(
-    "Local RCS dir", "string",
+    "Local history dir", "string",
     """Name of the local directory created to store history locally.
 One such directory will be created in each object directory of the project
 and its subprojects""",
@@ -49,11 +54,11 @@ Preference("Plugins/local_history/maxrevisions").create(
     """Maximal number of revisions to keep""",
     200, 0, 10000)
 
-Preference("Plugins/local_history/diff_switches").create(
-    "Diff switches", "string",
-    """Additional switches to pass to rcsdiff. In particular, this can be used
-to specify your preferred format for diff""",
-    "-u")
+Preference("Plugins/local_history/diff_context").create(
+    "Diff context lines", "integer",
+    """Number of context lines shown around each change by the
+"Show Patch" contextual menu""",
+    3, 0, 100)
 
 Preference("Plugins/local_history/when_no_prj").create(
     "When no project", "boolean",
@@ -63,16 +68,111 @@ of the directory that contains the file. When the file belongs to a project,
 the local history goes to the object directory of the project.""",
     False)
 
+DATE_FORMAT = "%Y.%m.%d.%H.%M.%S"
+# The format of the dates stored in the index files
+
+OBJECTS_DIR = "objects"
+# Name of the subdirectory of the history dir that contains the snapshots
+
+INDEX_EXT = ".hist"
+# Extension of the index files, one per file with a local history
+
+
+class HistoryIndex(object):
+
+    """The list of revisions of a file, as stored in its index file.
+
+       The index file is append-only: each line is of the form
+           <revision> <date> <checksum>
+       The contents is cached in memory and only read again when the
+       file is modified behind our back, so that listing the revisions
+       does not require any I/O in the common case."""
+
+    # Cache of all the indexes already loaded, indexed by path
+    _cache = {}
+
+    def __init__(self, path):
+        self.path = path
+        self.revisions = []  # list of (revision, date, checksum)
+        self._stamp = None   # (size, mtime) of the file when last read
+
+    @staticmethod
+    def get(path):
+        """Return the index stored in path, reading it only if needed"""
+        index = HistoryIndex._cache.get(path)
+        if index is None:
+            index = HistoryIndex(path)
+            HistoryIndex._cache[path] = index
+        index._refresh()
+        return index
+
+    def _stat(self):
+        try:
+            s = os.stat(self.path)
+            return (s.st_size, s.st_mtime)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+
+        self.revisions = []
+        if stamp is not None:
+            with open(self.path) as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) == 3:
+                        self.revisions.append(
+                            (int(fields[0]), fields[1], fields[2]))
+        self._stamp = stamp
+
+    def last(self):
+        """The most recent revision, or None"""
+        return self.revisions[-1] if self.revisions else None
+
+    def append(self, date, checksum):
+        """Add a new revision at the end of the index"""
+        last = self.last()
+        revision = (last[0] + 1 if last else 1, date, checksum)
+        with open(self.path, "a") as f:
+            f.write("%s %s %s\n" % revision)
+        self.revisions.append(revision)
+        self._stamp = self._stat()
+
+    def truncate(self, keep):
+        """Only keep the revisions for which keep(revision) is True.
+           Return the list of removed revisions."""
+        kept = [r for r in self.revisions if keep(r)]
+        removed = [r for r in self.revisions if not keep(r)]
+        if removed:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                for r in kept:
+                    f.write("%s %s %s\n" % r)
+            os.replace(tmp, self.path)
+            self.revisions = kept
+            self._stamp = self._stat()
+        return removed
+
 
 class LocalHistory:
 
     """This class provides access to the local history of a file"""
 
+    # The history dirs that need to be garbage collected, and the idle
+    # callback that does it.
+    _pending_gc = set()
+    _gc_id = None
+
     def __init__(self, file):
         """Create a new instance of LocalHistory.
            File must be an instance of GPS.File"""
 
         self.file = file.path
+        self.rcs_dir = None
+
         project = file.project(default_to_root=False)
         if project:
             dir = project.object_dirs(recursive=False)[0]
@@ -83,123 +183,155 @@ class LocalHistory:
 
         self.rcs_dir = os.path.join(
             dir, Preference("Plugins/local_history/rcsdir").get())
-        self.rcs_file = os.path.join(self.rcs_dir,
-                                     os.path.basename(self.file)) + ",v"
+        self.objects_dir = os.path.join(self.rcs_dir, OBJECTS_DIR)
+        self.index_file = os.path.join(
+            self.rcs_dir, os.path.basename(self.file)) + INDEX_EXT
 
-        # convert all \ to / for Cygwin toolset, note that forward
-        # slashes are handled by the native Win32 API. So it is safe to
-        # do that on Windows.
-
-        self.file = self.file.replace("\\", "/")
-        self.rcs_file = self.rcs_file.replace("\\", "/")
+    def _object_path(self, checksum):
+        return os.path.join(self.objects_dir, checksum[:2], checksum[2:])
 
     def get_revisions(self):
         """Extract all revisions and associated dates.
-           Result is a list of tuples: (revision_number, date), where
-           revision is the RCS revision number less the "1." prefix.
+           Result is a list of tuples: (revision_number, date).
            First in the list is the most recent revision."""
         if not self.rcs_dir:
-            return
-        try:
-            f = open(self.rcs_file)
-            result = []
-
-            previous = None
-
-            for line in f.readlines():
-                if line.startswith("log"):
-                    break
-                if line.startswith("date\t") and previous is not None:
-                    date = line.split()[1]
-                    result.append((int(previous[2:]), date[:-1]))
-                previous = line
-
-            f.close()
-            return result
-        except Exception:
             return None
+        return [(r[0], r[1])
+                for r in reversed(HistoryIndex.get(self.index_file).revisions)]
 
-    def on_lock_taken(self, proc, exit_status, output):
-        """
-        Called when we have finished taking the lock on the local RCS file
-        """
-        pwd = os.getcwd()
-        os.chdir(self.rcs_dir)
-        # Specify our own date, so that the date associated with the revision
-        # is the one when the file was saved. Otherwise, it defaults to the
-        # last modification of the date, and this might dependent on the local
-        # time zone
-        proc = Process(
-            "ci -d" +
-            datetime.datetime.now().strftime("%Y/%m/%d\\ %H:%M:%S") +
-            " " + os.path.basename(self.file))
-        os.chdir(pwd)
-        proc.send(".\n")
+    def get_contents(self, revision):
+        """Return the contents of the file at given revision, as bytes,
+           or None if this revision is not known"""
+        if not self.rcs_dir:
+            return None
+        for r in HistoryIndex.get(self.index_file).revisions:
+            if r[0] == revision:
+                try:
+                    with open(self._object_path(r[2]), "rb") as f:
+                        return zlib.decompress(f.read())
+                except (OSError, zlib.error):
+                    Logger("LocalHist").log(
+                        "Missing snapshot %s for %s" % (r[2], self.file))
+                    return None
+        return None
 
     def add_to_history(self):
         """Expand the local history for file, to include the current version"""
         if not self.rcs_dir:
-            Logger("LocalHist").log("No RCS dir for file " + self.file)
+            Logger("LocalHist").log("No local history dir for file "
+                                    + self.file)
             return
-        if not os.path.isdir(self.rcs_dir):
-            os.makedirs(self.rcs_dir)
-            Logger("LocalHist").log("creating directory %s" % self.rcs_dir)
 
-        shutil.copy2(self.file, self.rcs_dir)
-        if os.path.isfile(self.rcs_file):
-            Process("rcs -l " + self.rcs_file, on_exit=self.on_lock_taken)
-        else:
-            self.on_lock_taken(None, 0, "")
+        with open(self.file, "rb") as f:
+            contents = f.read()
+        checksum = hashlib.sha1(contents).hexdigest()
+
+        index = HistoryIndex.get(self.index_file)
+        last = index.last()
+        if last and last[2] == checksum:
+            # Saved without modification: nothing new to record
+            return
+
+        # Identical contents are only stored once, whatever the file
+        obj = self._object_path(checksum)
+        if not os.path.isfile(obj):
+            if not os.path.isdir(os.path.dirname(obj)):
+                os.makedirs(os.path.dirname(obj))
+                Logger("LocalHist").log(
+                    "creating directory %s" % os.path.dirname(obj))
+            tmp = obj + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(contents))
+            os.replace(tmp, obj)
+
+        # Use the date when the file was saved
+        index.append(datetime.datetime.now().strftime(DATE_FORMAT), checksum)
 
     def cleanup_history(self):
-        """Remove the older revision histories for self"""
+        """Remove the older revision histories for self.
+           The snapshots that are no longer referenced are removed later on,
+           in the background."""
         if not self.rcs_dir:
             return
 
         max_days = Preference("Plugins/local_history/maxdays").get()
         older = datetime.datetime.now() - datetime.timedelta(days=max_days)
-        older = older.strftime("%Y.%m.%d.%H.%M.%S")
+        older = older.strftime(DATE_FORMAT)
+
+        index = HistoryIndex.get(self.index_file)
+        last = index.last()
+        if not last:
+            return
 
-        revisions = self.get_revisions()
         max_revisions = Preference("Plugins/local_history/maxrevisions").get()
-        if revisions:
-            version = max(0, revisions[0][0] - max_revisions)
-            for r in revisions:
-                if r[1] < older:
-                    version = max(version, r[0])
-                    break
-
-            if version >= 1:
-                Logger("LocalHist").log(
-                    "Truncating file %s to revision %s" % (
-                        self.rcs_file, version))
-                proc = Process("rcs -o:1.%s %s" % (version, self.rcs_file))
-                proc.wait()
-
-    def local_checkout(self, revision):
-        """Do a local checkout of file at given revision in the RCS directory.
-           Return the name of the checked out file"""
-        if self.rcs_dir and os.path.isdir(self.rcs_dir):
-            try:
-                os.unlink(os.path.join(self.rcs_dir,
-                                       os.path.basename(self.file)))
-            except Exception:
-                pass
-
-            pwd = os.getcwd()
-            os.chdir(self.rcs_dir)
-            proc = Process("co -r" + revision + " " + self.rcs_file)
-            os.chdir(pwd)
-            if proc.wait() == 0:
-                return os.path.join(self.rcs_dir, os.path.basename(self.file))
-        return None
+        first_kept = last[0] - max_revisions
+
+        # Always keep the most recent revision
+        removed = index.truncate(
+            lambda r: r is last or (r[0] > first_kept and r[1] >= older))
+        if removed:
+            Logger("LocalHist").log(
+                "Truncating history of %s to revision %s" % (
+                    self.file, removed[-1][0] + 1))
+            LocalHistory._schedule_gc(self.rcs_dir)
+
+    @staticmethod
+    def _schedule_gc(rcs_dir):
+        """Remove, in an idle callback, the snapshots of rcs_dir that are
+           no longer referenced by any index"""
+        LocalHistory._pending_gc.add(rcs_dir)
+        if LocalHistory._gc_id is None:
+            LocalHistory._gc_id = GLib.idle_add(LocalHistory._on_idle_gc)
+
+    @staticmethod
+    def _on_idle_gc():
+        """Process one history dir per call, so as not to block GPS"""
+        if not LocalHistory._pending_gc:
+            LocalHistory._gc_id = None
+            return False
+
+        rcs_dir = LocalHistory._pending_gc.pop()
+        try:
+            referenced = set()
+            for name in os.listdir(rcs_dir):
+                if name.endswith(INDEX_EXT):
+                    referenced.update(
+                        r[2] for r in HistoryIndex.get(
+                            os.path.join(rcs_dir, name)).revisions)
+
+            objects_dir = os.path.join(rcs_dir, OBJECTS_DIR)
+            for prefix in os.listdir(objects_dir):
+                subdir = os.path.join(objects_dir, prefix)
+                for name in os.listdir(subdir):
+                    if prefix + name not in referenced:
+                        os.unlink(os.path.join(subdir, name))
+                if not os.listdir(subdir):
+                    os.rmdir(subdir)
+        except Exception:
+            Logger("LocalHist").log(
+                "Unexpected exception " + traceback.format_exc())
+
+        return True  # will process the next dir, if any
+
+    def _checkout(self, revision, file_ext):
+        """Write the contents of file at given revision in the local
+           history directory. Return the name of the checked out file"""
+        contents = self.get_contents(revision)
+        if contents is None:
+            return None
+        file_ext = file_ext.replace("/", ".").replace(":", "-")
+        local = os.path.join(
+            self.rcs_dir, os.path.basename(self.file) + " " + file_ext)
+        with open(local, "wb") as f:
+            f.write(contents)
+        return local
 
     def revert_file(self, revision):
         """Revert file to a local history revision"""
         if not self.rcs_dir:
             return
-        Logger("LocalHist").log("revert " + self.file + " to " + revision)
-        local = self.local_checkout(revision)
+        Logger("LocalHist").log("revert %s to %s" % (self.file, revision))
+        local = self._checkout(revision, "revert")
         if local:
             shutil.copymode(self.file, local)
             shutil.move(local, self.file)
@@ -210,62 +342,62 @@ class LocalHistory:
            The referenced file will have a name ending with file_ext"""
         if not self.rcs_dir:
             return
-        local = self.local_checkout(revision)
-        file_ext = file_ext.replace("/", ".").replace(":", "-")
-        local2 = os.path.basename(local) + " " + file_ext
-        local2 = os.path.join(self.rcs_dir, local2)
-        shutil.move(local, local2)
-        Vdiff.create(File(local2), File(self.file))
+        local = self._checkout(revision, file_ext)
+        if not local:
+            return
+        Vdiff.create(File(local), File(self.file))
         try:
-            os.chmod(local2, 0o777)
-            os.unlink(local2)
+            os.chmod(local, 0o777)
+            os.unlink(local)
         except Exception:
             pass
 
     def show_diff(self, revision, date):
         """Show, in a console, the diff between the current version and
            revision"""
-        if self.rcs_dir and os.path.isdir(self.rcs_dir):
-            pwd = os.getcwd()
-            os.chdir(os.path.dirname(self.file))
-            diff_switches = Preference(
-                "Plugins/local_history/diff_switches").get()
-            proc = Process("rcsdiff " + diff_switches +
-                           " -r" + revision + " " + self.rcs_file)
-            diff = proc.get_result()
-            os.chdir(pwd)
-            Console("Local History").clear()
-            Console("Local History").write("Local history at " + date + "\n")
-            Console("Local History").write(diff)
+        contents = self.get_contents(revision)
+        if contents is None:
+            return
+
+        with open(self.file, "rb") as f:
+            current = f.read()
+
+        diff = difflib.unified_diff(
+            contents.decode("utf-8", "replace").splitlines(True),
+            current.decode("utf-8", "replace").splitlines(True),
+            fromfile="%s@%s" % (os.path.basename(self.file), date),
+            tofile=os.path.basename(self.file),
+            n=Preference("Plugins/local_history/diff_context").get())
+
+        Console("Local History").clear()
+        Console("Local History").write("Local history at " + date + "\n")
+        Console("Local History").write("".join(diff))
 
     def has_local_history(self):
         """Whether there is local history information for self"""
-        return os.path.isfile(self.rcs_file)
+        return self.rcs_dir is not None and os.path.isfile(self.index_file)
 
     def on_select_xml_node(self, node_name, attrs, value):
         if node_name == "revision":
             attr = dict()
-            for a in re.findall("""(\\w+)=['"](.*?)['"]\B""", attrs):
+            for a in re.findall("""(\\w+)=['"](.*?)['"]\\B""", attrs):
                 attr[a[0]] = a[1]
-            self.show_diff(attr["name"], attr["date"])
+            self.show_diff(int(attr["name"]), attr["date"])
 
     def create_xml_node(self, node_name, attrs, value):
         attr = dict()
-        for a in re.findall("""(\\w+)=['"](.*?)['"]\B""", attrs):
+        for a in re.findall("""(\\w+)=['"](.*?)['"]\\B""", attrs):
             attr[a[0]] = a[1]
         if node_name == "revision":
             return ["[<b>" + attr["date"] + "</b>] " + attr["name"]]
 
     def view_all(self, revisions, dates):
         """View all revisions of self in a graphical tree"""
-        if self.rcs_dir and os.path.isdir(self.rcs_dir):
-            pwd = os.getcwd()
-            os.chdir(os.path.dirname(self.file))
-
+        if self.has_local_history():
             xml = "<local_history>\n"
             for index, r in enumerate(revisions):
-                xml = xml + "  <revision name='" + r + "' date='" \
-                    + dates[index] + "' />"
+                xml = xml + "  <revision name='%s' date='%s' />" % (
+                    r, dates[index])
 
             xml = xml + "</local_history>"
 
@@ -274,16 +406,6 @@ class LocalHistory:
                              on_select=self.on_select_xml_node,
                              parser=self.create_xml_node)
             view.parse_string(xml)
-            os.chdir(pwd)
-
-
-def has_RCS_on_path():
-    """True if RCS was found on the PATH"""
-    for path in os.getenv("PATH").split(os.pathsep):
-        if os.path.isfile(os.path.join(path, "ci")) \
-                or os.path.isfile(os.path.join(path, "ci.exe")):
-            return True
-    return False
 
 
 def on_file_saved(hook, file):
@@ -308,21 +430,20 @@ def contextual_filter(context):
 
 def contextual_factory(context):
     try:
-        hist = LocalHistory(context.file())
-        revisions = hist.get_revisions()
-
-        # Save in the context the result of parsing the file. This factory is
+        # Save in the context the result of parsing the index. This factory is
         # used for multiple contextual menus, so this saves some processing.
-        # Part of this parsing is also needed when performing the action.
+        # Part of this is also needed when performing the action.
 
         try:
             return context.revisions_menu
         except Exception:
-            context.revisions = ["1.%s" % a[0] for a in revisions]
+            hist = LocalHistory(context.file())
+            revisions = hist.get_revisions()
+            context.revisions = [a[0] for a in revisions]
             result = []
             for a in revisions:
                 date = datetime.datetime(
-                    *(time.strptime(a[1], "%Y.%m.%d.%H.%M.%S")[0:6]))
+                    *(time.strptime(a[1], DATE_FORMAT)[0:6]))
                 result.append(date.strftime("%Y-%m-%d/%H:%M:%S"))
             context.revisions_menu = result
             return context.revisions_menu
@@ -349,33 +470,33 @@ def on_patch(context, choice, choice_index):
 
 def on_view_all(context):
     hist = LocalHistory(context.file())
+    contextual_factory(context)
     hist.view_all(context.revisions, context.revisions_menu)
 
 
 def register_module(hook):
-    """Activate this local history module if RCS is found on the path"""
-
-    if has_RCS_on_path():
-        Hook("file_saved").add(on_file_saved, last=True)
-        Contextual("Local History/Revert to").create_dynamic(
-            factory=contextual_factory,
-            on_activate=on_revert,
-            label="Local History//Revert to",
-            filter=contextual_filter)
-        Contextual("Local History/Diff").create_dynamic(
-            factory=contextual_factory,
-            on_activate=on_diff,
-            label="Local History//Diff",
-            filter=contextual_filter)
-        Contextual("Local History/Show Patch").create_dynamic(
-            factory=contextual_factory,
-            on_activate=on_patch,
-            label="Local History//Show Patch",
-            filter=contextual_filter)
-        Contextual("Local History View").create(
-            on_activate=on_view_all,
-            label="Local History//View",
-            filter=contextual_filter)
+    """Activate this local history module"""
+
+    Hook("file_saved").add(on_file_saved, last=True)
+    Contextual("Local History/Revert to").create_dynamic(
+        factory=contextual_factory,
+        on_activate=on_revert,
+        label="Local History//Revert to",
+        filter=contextual_filter)
+    Contextual("Local History/Diff").create_dynamic(
+        factory=contextual_factory,
+        on_activate=on_diff,
+        label="Local History//Diff",
+        filter=contextual_filter)
+    Contextual("Local History/Show Patch").create_dynamic(
+        factory=contextual_factory,
+        on_activate=on_patch,
+        label="Local History//Show Patch",
+        filter=contextual_filter)
+    Contextual("Local History View").create(
+        on_activate=on_view_all,
+        label="Local History//View",
+        filter=contextual_filter)
 
 
 Hook("gps_started").add(register_module)
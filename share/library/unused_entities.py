@@ -22,9 +22,14 @@ they might show references to entities even though these entities are in fact
 no longer used (which means GPS will not correctly report all cases of unused
 entities).
 
-Executing this script blocks the whole GPS interface, so it is normal that
-GPS becomes unresponsive. Depending of the size of your project, this can
-take a while to execute.
+The search runs in the background, and its progress is shown in the Task
+Manager. It waits for the cross-reference database to be up to date, for
+instance after a compilation. It then collects, in a single query per source
+file, the kind of all the references found in the files that can reference
+the entities (the whole application, or for a single file the files that
+depend on it), then reports the unused entities file by file as they are
+confirmed. Before being reported, an entity is checked with its own list of
+references, which also includes the implicit ones.
 Note that you can save the contents of the Locations window, after execution,
 through the GPS.Locations.dump() method in the python console.
 """
@@ -36,6 +41,9 @@ through the GPS.Locations.dump() method in the python console.
 from GPS import Preference, Project, Console, Editor, File, Locations, \
     EditorBuffer, MDI
 from gs_utils import interactive
+import cross_references
+import time
+import workflows
 
 xmlada_projects = [
     "xmlada_sax", "xmlada_dom", "xmlada_schema", "xmlada_unicode",
@@ -43,6 +51,16 @@ xmlada_projects = [
 aws_projects = ["aws_config", "aws_libz", "aws_shared", "aws_ssl_support",
                 "aws_components", "aws_xmlada", "aws"]
 
+STEP_DURATION = 0.05
+# How long, in seconds, the search runs before giving control back to GPS
+
+declaration_kinds = ("declaration", "body", "label", "full declaration",
+                     "private part", "end of spec", "end of body",
+                     "label on end line")
+# The kinds of references which do not count as a use of the entity. The
+# last ones are only listed by GPS.File.references, which also returns the
+# references that delimit the declaration of the entity.
+
 Preference("Plugins/unused_entities/ignoreprj").create(
     "Ignored projects", "string",
     """Comma-separated list of projects for which we never want to look for
@@ -52,8 +70,8 @@ Preference("Plugins/unused_entities/ignoreprj").create(
     ",".join(xmlada_projects + aws_projects))
 
 
-def EntityIterator(where):
-    """Return all entities from WHERE"""
+def SourceIterator(where):
+    """Return all source files from WHERE"""
     if not where:
         ignore_projects = [s.strip().lower() for s in Preference(
             "Plugins/unused_entities/ignoreprj").get().split(",")]
@@ -63,32 +81,68 @@ def EntityIterator(where):
                 Console().write(
                     "Searching unused entities in project " + p.name() + "\n")
                 for s in p.sources():
-                    for e in s.entities(local=True):
-                        yield e
+                    yield s
     elif isinstance(where, Project):
         for s in where.sources():
-            for e in s.entities(local=True):
-                yield e
+            yield s
     elif isinstance(where, File):
-        for e in where.entities(local=True):
-            yield e
+        yield where
 
 
-def GlobalIterator(where):
-    """Return all global entities from WHERE"""
-    for e in EntityIterator(where):
-        if e.attributes()["global"]:
-            yield e
+class Step(object):
+    """Splits the search in steps of STEP_DURATION"""
 
+    def __init__(self):
+        self.start = time.time()
 
-def is_unused(entity):
-    refs = entity.references(
-        include_implicit=True, synchronous=True, show_kind=True)
-    for loc, kind in refs.items():
-        if kind != 'declaration' \
-                and kind != 'body' \
-                and kind != 'label':
+    def done(self):
+        """Whether the current step is over. If so, a new one starts"""
+        now = time.time()
+        if now - self.start < STEP_DURATION:
             return False
+        self.start = now
+        return True
+
+
+def referencing_files(source, result, step):
+    """A workflow that adds to RESULT the files that can reference the
+       entities declared in SOURCE: SOURCE and its other file, the Ada units
+       nested in them (child units and subunits), and the files that import
+       any of these, directly or not"""
+    to_analyze = [source, source.other_file()]
+    units = set(f.unit().lower() for f in to_analyze if f.unit())
+    if units:
+        for f in Project.root().sources(recursive=True):
+            if any(f.unit().lower().startswith(u + ".") for u in units):
+                to_analyze.append(f)
+            if step.done():
+                yield None  # give control back to GPS
+
+    while to_analyze:
+        f = to_analyze.pop()
+        if f and f not in result:
+            result.add(f)
+            to_analyze.extend(f.imported_by(include_system=False))
+            if step.done():
+                yield None
+
+
+def used_entities(files):
+    """Return the set of entities that are referenced in FILES, other than
+       through their declarations, bodies or labels"""
+    used = set()
+    for f in files:
+        for entity, loc, kind in f.references(show_kind=True):
+            if kind not in declaration_kinds:
+                used.add(entity)
+    return used
+
+
+def is_unused(entity, used):
+    """Whether ENTITY is unused, given the set of entities used in the files
+       that can reference it"""
+    if entity in used:
+        return False
 
     # If we have a primitive operation, do not report it for now, since it
     # might actually be called through dispatching. We do not know yet how
@@ -97,20 +151,62 @@ def is_unused(entity):
     if entity.primitive_of():
         return False
 
+    # Confirm with the references of the entity itself, which include the
+    # implicit ones and the files that were not searched
+
+    refs = entity.references(
+        include_implicit=True, synchronous=True, show_kind=True)
+    for loc, kind in refs.items():
+        if kind not in declaration_kinds:
+            return False
+
     return True
 
 
-def UnusedIterator(where, globals_only):
-    """Return all unused entities from WHERE, and only global entities if
-       GLOBALS_ONLY is true"""
-    if globals_only:
-        iter = GlobalIterator
+def find_unused_entities(task, where, globals_only):
+    """A workflow that lists the unused entities from WHERE in the locations
+       window, and only global entities if GLOBALS_ONLY is true"""
+
+    # Do not report entities from a database that is being refreshed
+    yield cross_references.r.wait_up_to_date()
+
+    step = Step()
+
+    # An entity can be referenced from any file of the application, but
+    # those of a single file only from the files that depend on it
+    if isinstance(where, File):
+        files = set()
+        yield referencing_files(where, files, step)
+        files = list(files)
     else:
-        iter = EntityIterator
+        files = Project.root().sources(recursive=True)
+    sources = list(SourceIterator(where))
+    total = len(files) + len(sources)
+
+    used = set()
+    for idx, f in enumerate(files):
+        used |= used_entities([f])
+        if step.done():
+            task.set_progress(idx + 1, total)
+            yield None  # give control back to GPS
+
+    for idx, s in enumerate(sources):
+        if step.done():
+            task.set_progress(len(files) + idx, total)
+            yield None
+
+        for e in s.entities(local=True):
+            if (not globals_only or e.attributes()["global"]) \
+                    and is_unused(e, used):
+                Locations.add(category="Unused entity",
+                              file=e.declaration().file(),
+                              line=e.declaration().line(),
+                              column=e.declaration().column(),
+                              message="unused entity " + e.name(),
+                              highlight="Unused_Entities",
+                              length=len(e.name()))
 
-    for e in iter(where):
-        if is_unused(e):
-            yield e
+    Console().write("Done searching for unused entities\n")
 
 
 def show_unused_entities(where, globals_only):
@@ -119,16 +215,9 @@ def show_unused_entities(where, globals_only):
     Locations.remove_category("Unused entity")
     MDI.get("Messages").raise_window()
 
-    for e in UnusedIterator(where, globals_only=globals_only):
-        Locations.add(category="Unused entity",
-                      file=e.declaration().file(),
-                      line=e.declaration().line(),
-                      column=e.declaration().column(),
-                      message="unused entity " + e.name(),
-                      highlight="Unused_Entities",
-                      length=len(e.name()))
-
-    Console().write("Done searching for unused entities\n")
+    workflows.task_workflow(
+        "unused entities", find_unused_entities, active=True,
+        where=where, globals_only=globals_only)
 
 
 @interactive(name='show unused entities from file',
@@ -4,7 +4,8 @@ import re
 from . import core
 from os_utils import locate_exec_on_path
 import traceback
-from workflows import run_as_workflow
+from workflows import run_as_workflow, run_in_executor
+import bisect
 
 MAP_FILE_BASE_NAME = "map.txt"
 
@@ -15,11 +16,214 @@ GPS.current_context())" />
 """
 
 
+# The regexps used to parse the map file
+region_r = re.compile(
+    r'^(?P<name>\*?\w+\*?)\s+(?P<origin>0x[0-9a-f]+)' +
+    r'\s+(?P<length>0x[0-9a-f]+)\s+x?r?w?')
+section_r = re.compile(r'^(?P<name>[\w.]+)(\s+(?P<origin>0x[0-9a-f]+)' +
+                       r'\s+(?P<length>0x[0-9a-f]+))?\s*$|' +
+                       r'^(?P<name2>[\w.]+)\s+(?P<origin2>0x[0-9a-f]+)' +
+                       r'\s+(?P<length2>0x[0-9a-f]+)\s')
+wrapped_r = re.compile(r'^\s+(?P<origin>0x[0-9a-f]+)' +
+                       r'\s+(?P<length>0x[0-9a-f]+)(\s|$)')
+module_r = re.compile(r'^\s+[\w.]*\s+(?P<origin>0x[0-9a-f]+)\s+' +
+                      r'(?P<size>0x[0-9a-f]+) (?P<files>.+\.o\)?)')
+
+NOT_ALLOCATED_SECTIONS_PREFIXES = ('.debug', '.comment')
+
+
+def is_section_allocated(section):
+    """
+    Return True if the given section tuple is going to be allocated in
+    memory, False otherwise.
+
+    An allocated section is a memory section that will actually be
+    loaded by the target. Sections related with debug information,
+    code comments or that have null size are typically not allocated
+    and should be ignored.
+    """
+    return (section[2] != 0
+            and not section[0].startswith(NOT_ALLOCATED_SECTIONS_PREFIXES))
+
+
+class MapFile(object):
+    """
+    The contents of a map file generated by ld. This does not use the GPS
+    API, so that it can be parsed in the background.
+
+    :ivar regions: a list of (name, origin, length) tuples
+    :ivar sections: a list of (name, origin, length, region_name) tuples,
+       for the allocated sections
+    :ivar modules: a list of (obj_file, lib_file, origin, size,
+       region_name, section_name) tuples
+    """
+
+    def __init__(self):
+        self.regions = []
+        self.sections = []
+        self.modules = []
+
+        # The index of the regions: their sorted start addresses, and the
+        # corresponding (end address, name). The regions whose name is
+        # surrounded with "*", like *default*, usually overlap the others:
+        # they are only used when no other region matches.
+        self.__starts = []
+        self.__regions = []
+        self.__fallback_regions = []
+
+    def index_regions(self):
+        """Build the index used by region_name_from_address"""
+        ordered = []
+        for name, origin, length in self.regions:
+            start = int(origin, 16)
+            if name.startswith("*"):
+                self.__fallback_regions.append((start, start + length, name))
+            else:
+                ordered.append((start, start + length, name))
+        ordered.sort()
+        self.__starts = [r[0] for r in ordered]
+        self.__regions = [(r[1], r[2]) for r in ordered]
+
+    def region_name_from_address(self, addr):
+        """
+        Return the name of the region associated with the given address or
+        an empty string if not found.
+        """
+        idx = bisect.bisect_right(self.__starts, addr) - 1
+        if idx >= 0 and addr < self.__regions[idx][0]:
+            return self.__regions[idx][1]
+
+        for start, end, name in self.__fallback_regions:
+            if start <= addr < end:
+                return name
+        return ""
+
+
+def parse_map_file(map_file_name, map_dir):
+    """
+    Parse the given map file in one pass. The lines are only matched
+    against the regexps that apply to the part of the file being parsed:
+    first the memory configuration, then the memory map.
+
+    :param str map_dir: the directory of the object files with no
+       directory information.
+    :return: a tuple (MapFile, None), or (None, traceback) if the file
+       could not be parsed.
+    """
+    try:
+        return _parse_map_file(map_file_name, map_dir), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _parse_map_file(map_file_name, map_dir):
+    result = MapFile()
+    modules_dict = {}
+    section = None         # the current section
+    section_name = None    # the name of a section, when wrapped on two lines
+    allocated = False      # whether the current section is allocated
+    in_memory_map = False
+
+    def start_section(name, origin, length):
+        s = (name, origin, int(length, 16),
+             result.region_name_from_address(int(origin, 16)))
+        if is_section_allocated(s):
+            result.sections.append(s)
+        return s, is_section_allocated(s)
+
+    with open(map_file_name, 'r') as f:
+        for line in f:
+            if not in_memory_map:
+                if line.startswith("Linker script and memory map"):
+                    in_memory_map = True
+                    result.index_regions()
+                else:
+                    m = region_r.search(line)
+                    if m:
+                        result.regions.append(
+                            (m.group('name'), m.group('origin'),
+                             int(m.group('length'), 16)))
+                continue
+
+            if not line[:1].isspace():
+                m = section_r.search(line)
+                if m:
+                    if m.group('name2'):
+                        section, allocated = start_section(
+                            m.group('name2'), m.group('origin2'),
+                            m.group('length2'))
+                        section_name = None
+                    elif m.group('origin'):
+                        section, allocated = start_section(
+                            m.group('name'), m.group('origin'),
+                            m.group('length'))
+                        section_name = None
+                    else:
+                        # The name is too long: the origin and length are
+                        # on the next line.
+                        section_name = m.group('name')
+                continue
+
+            if section_name:
+                m = wrapped_r.search(line)
+                if m:
+                    section, allocated = start_section(
+                        section_name, m.group('origin'), m.group('length'))
+                section_name = None
+                continue
+
+            if section is None or not allocated:
+                continue
+
+            m = module_r.search(line)
+            if m:
+                module_size = int(m.group('size'), 16)
+
+                # Do nothing if the module's size is null
+                if module_size == 0:
+                    continue
+
+                # Get the object file name and, if any, information about
+                # the library for which this file has been compiled.
+                files_info = m.group('files')
+                files = re.split(r"\(|\)", files_info)
+                obj_file = files[0] if len(files) == 1 else files[1]
+                lib_file = files[0] if len(files) > 1 else ""
+
+                # If the object file name does not contain any directory
+                # information assume that this file is located in the same
+                # directory as the map file.
+                if not os.path.dirname(obj_file) and not lib_file:
+                    obj_file = os.path.join(map_dir, obj_file)
+
+                # If a previous module decription has been found for the
+                # same key, just add the size of this one to the previously
+                # found one.
+                entry = modules_dict.get((files_info, section[0]), None)
+                if entry:
+                    entry[3] += module_size
+                else:
+                    modules_dict[(files_info, section[0])] = [
+                        obj_file, lib_file, m.group('origin'), module_size,
+                        section[3], section[0]]
+
+    if not in_memory_map:
+        result.index_regions()
+    result.modules = [tuple(m) for m in modules_dict.values()]
+    return result
+
+
 @core.register_memory_usage_provider("LD")
 class LD(core.MemoryUsageProvider):
 
     _cache = {}
 
+    _parsed_key = None
+    # The (file, mtime, size) of the last map file that was parsed
+
+    _last_map = None
+    # The MapFile parsed from that file
+
     # The list of supported targets
     _supported_targets = ["arm-eabi", "leon3-elf", "m68020-elf",
                           "powerpc-elf", "powerpc-eabispe", "riscv32-elf",
@@ -103,178 +307,25 @@ class LD(core.MemoryUsageProvider):
             visitor.on_memory_usage_data_fetched([], [], [])
             return
 
-        # The information we want to fetch: memory regions and memory sections
-        # ??? Find a way to have a finer grain view (symbols? compilation
-        # units?)
-        regions = []
-        sections = []
-        modules_dict = {}
-        modules = []
-
-        # The regexps used to match the information we want to fetch
-        region_r = re.compile(
-            r'^(?P<name>\*?\w+\*?)\s+(?P<origin>0x[0-9a-f]+)' +
-            r'\s+(?P<length>0x[0-9a-f]+)\s+x?r?w?')
-        section_r = re.compile(r'^(?P<name>[\w.]+)\s+(?P<origin>0x[0-9a-f]+)' +
-                               r'\s+(?P<length>0x[0-9a-f]+)')
-        module_r = re.compile(r'^\s+[\w.]*\s+(?P<origin>0x[0-9a-f]+)\s+' +
-                              r'(?P<size>0x[0-9a-f]+) (?P<files>.+\.o\)?)')
-
-        def region_name_from_address(addr):
-            """
-            Return the name of the region associated with the given address or
-            an empty string if not found.
-            """
-
-            for region in regions:
-                region_addr = int(region[1], 16)
-                region_size = region[2]
-
-                if addr >= region_addr and addr < (region_addr + region_size):
-                    return region[0]
-
-            return ""
-
-        def is_section_allocated(section):
-            """
-            Return True if the given section tuple is going to be allocated in
-            memory, False otherwise.
-
-            An allocated section is a memory section that will actually be
-            loaded by the target. Sections related with debug information,
-            code comments or that have null size are typically not allocated
-            and should be ignored.
-            """
-
-            not_alloc_sections_prefixes = ['.debug', '.comment']
-
-            for prefix in not_alloc_sections_prefixes:
-                if section[0].startswith(prefix):
-                    return False
-
-            if section[2] == 0:
-                return False
-
-            return True
-
-        def try_match_region(line):
-            """
-            Try to match a region description in the given line.
-
-            Return a tuple (name, origin, length) if a region was matched
-            and None otherwise.
-            """
-
-            m = region_r.search(line)
-            if m:
-                return (m.group('name'), m.group('origin'),
-                        int(m.group('length'), 16))
-            else:
-                return None
-
-        def try_match_section(line):
-            """
-            Try to match an allocated section description in the given live.
-
-            Return a tuple (name, origin, length, region_name) if a section was
-            matched and None otherwise.
-            """
-
-            m = section_r.search(line)
-
-            if m:
-                section_addr = m.group('origin')
-                region_name = region_name_from_address(int(section_addr, 16))
-                section = (m.group('name'), section_addr,
-                           int(m.group('length'), 16), region_name)
-
-                return section
-            else:
-                return None
-
-        def try_match_module(line):
-            """
-            Try to match a module description in the given line.
-
-            A module description gives information about the size taken by
-            an object file in a given section.
-            """
-
-            # Don't try to match a module if sections have not been parsed yet
-            if not sections:
+        # Map files of large executables take a while to parse: do it in
+        # the background, and only when the file has changed.
+        stamp = os.stat(map_file_name)
+        key = (map_file_name, stamp.st_mtime, stamp.st_size)
+
+        if LD._parsed_key != key:
+            map_data, error = yield run_in_executor(
+                parse_map_file, map_file_name, map_dir)
+            if error:
+                logger = GPS.Logger("GPS.MEMORY_USAGE.SCRIPTS.LD")
+                logger.log("Exception caught while parsing ld's map file:")
+                logger.log(error)
                 return
+            LD._parsed_key = key
+            LD._last_map = map_data
 
-            m = module_r.search(line)
-            if m:
-                files_info = m.group('files')
-                files = re.split(r"\(|\)", files_info)
-
-                # Get the object file name and, if any, information about
-                # the library for which this file has been compiled.
-
-                obj_file = files[0] if len(files) == 1 else files[1]
-                lib_file = files[0] if len(files) > 1 else ""
-                module_size = int(m.group('size'), 16)
-                section = sections[-1]
-
-                # Do nothing if the module belongs to a section that will not
-                # be allocated or if it's size is null.
-
-                if module_size == 0 or not is_section_allocated(section):
-                    return
-
-                section_name = section[0]
-                module = modules_dict.get((files_info, section_name), None)
-
-                # If the object file name does not contain any directory
-                # information assume that this file is located in the same
-                # directory as the map file.
-
-                if not os.path.dirname(obj_file) and not lib_file:
-                    obj_file = os.path.join(map_dir, obj_file)
-
-                # If a previous module decription has been found for the same
-                # key, just add the size of this one to the previously found
-                # one.
-
-                if module:
-                    module[3] += int(m.group('size'), 16)
-                else:
-                    region_name = section[3]
-                    module = [obj_file, lib_file, m.group('origin'),
-                              int(m.group('size'), 16),
-                              region_name, section_name]
-                    modules_dict[(files_info, section_name)] = module
-
-        # Parse the memory map file to retrieve the memory regions and
-        # the path of the linked executable.
-
-        try:
-            with open(map_file_name, 'r') as f:
-                for line in f:
-                    region = try_match_region(line)
-                    if not region:
-                        section = try_match_section(line)
-                        if section:
-                            sections.append(section)
-                        else:
-                            try_match_module(line)
-                    else:
-                        regions.append(region)
-
-            for module in modules_dict.values():
-                modules.append(tuple(module))
-
-            # Keep only the sections that will be allocated in memory
-
-            sections = [s for s in sections if is_section_allocated(s)]
-
-            visitor.on_memory_usage_data_fetched(regions, sections, modules)
-
-        except Exception:
-            logger = GPS.Logger("GPS.MEMORY_USAGE.SCRIPTS.LD")
-            logger.log("Exception caught while parsing ld's map file:")
-            logger.log(traceback.format_exc())
+        visitor.on_memory_usage_data_fetched(
+            LD._last_map.regions, LD._last_map.sections,
+            LD._last_map.modules)
 
 
 GPS.parse_xml(xml)
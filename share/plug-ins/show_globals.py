@@ -1,15 +1,18 @@
 """
 This plug-in provides support for displaying SPARK global contracts generated
 by the GNATprove --flow-show-gg switch.
+The contracts are generated again only when one of the sources of the unit
+has changed (see compiler_artifacts.py).
 """
 
-import distutils.dep_util
 import json
 import os
 
 import GPS
+import compiler_artifacts
 from gs_utils import in_ada_file, interactive
 import libadalang as lal
+import lal_utils
 import os_utils
 
 
@@ -63,15 +66,14 @@ def get_subp_decl(buf, line, column):
     """ Return the subprogram declaration node at line, column.
     Return None if none is found.
     """
-    unit = buf.get_analysis_unit()
-    decl = unit.root.find(lambda x: x.sloc_range.start.line == line and
-                          x.sloc_range.start.column == column and
-                          isinstance(x, (lal.SubpDecl, lal.ExprFunction,
-                                         lal.SingleTaskDecl,
-                                         lal.TaskTypeDecl, lal.EntryDecl,
-                                         lal.SubpBody)))
+    for decl in lal_utils.index(buf).starting_at(line, column):
+        if isinstance(decl, (lal.SubpDecl, lal.ExprFunction,
+                             lal.SingleTaskDecl,
+                             lal.TaskTypeDecl, lal.EntryDecl,
+                             lal.SubpBody)):
+            return decl
 
-    return decl
+    return None
 
 
 def has_aspects(subp_decl_node):
@@ -232,15 +234,6 @@ def edit_file(file, json_name):
         GLOBAL_MARKS.setdefault(file.name(), []).append(mark_num)
 
 
-def on_exit(process, status, full_output):
-    """ Triggered when GNATprove process has exited
-    """
-    if status:
-        _log(process.get_result())
-    else:
-        edit_file(process.file, process.gg_json)
-
-
 def show_generated_global_contracts():
     """ Display the currently edited file's generated global contracts in
     GNATstudio.
@@ -256,21 +249,17 @@ def show_generated_global_contracts():
         _log("Could not find an object directory for %s, reverting to %s" %
              (file, objdir))
     gg_json = os.path.join(objdir, "gnatprove", unitname + ".gg")
+    ali = os.path.join(objdir, "gnatprove", unitname + ".ali")
 
-    if distutils.dep_util.newer(file.name(), gg_json):
-        prj = (' -P """%s"""' % project.file().name("Build_Server"))
-        scenario = project.scenario_variables_cmd_line("-X")
-        cmd = COMMAND.format(project=prj, unit=file.base_name())
-        if scenario:
-            cmd += ' ' + scenario
-        proc = GPS.Process(cmd, on_exit=on_exit, remote_server="Build_Server")
-        proc.file = file
-        proc.gg_json = gg_json
-    elif not os.path.isfile(gg_json):
-        _log("Aborting operation: Can't find %s." % gg_json)
-        return
-    else:
-        edit_file(file, gg_json)
+    prj = (' -P """%s"""' % project.file().name("Build_Server"))
+    scenario = project.scenario_variables_cmd_line("-X")
+    cmd = COMMAND.format(project=prj, unit=file.base_name())
+    if scenario:
+        cmd += ' ' + scenario
+
+    compiler_artifacts.request(
+        compiler_artifacts.Artifact(gg_json, file, ali, cmd),
+        lambda gg_json: edit_file(file, gg_json))
 
 
 #################################
@@ -2,11 +2,14 @@
 This plug-in provides support for displaying Ada representation clauses
 generated by GNAT (-gnatRXjs switch with X the current level).
 Warning: the 'j' option was added with GNAT 20, thus a 20+ version is needed.
+The json files are generated again only when one of the sources of the unit
+or the representation level has changed (see compiler_artifacts.py).
 """
 
 import os
 import json
 import GPS
+import compiler_artifacts
 from gs_utils import in_ada_file, interactive
 
 
@@ -213,16 +216,8 @@ def edit_file(file_name, json_name):
         REPRESENTATION_MARKS[file_name].append(mark_num)
 
 
-def on_exit(process, status, full_output):
-    if status:
-        _log(process.get_result())
-    else:
-        _log("... start parsing the json", mode="text")
-        edit_file(process.file_name, process.json_name)
-
-
 def show_representation_clauses(file_name, json_name):
-    """Generate the json files if missing"""
+    """Generate the json files if missing or out of date"""
     context = GPS.current_context()
     try:
         if context.project():
@@ -242,10 +237,12 @@ def show_representation_clauses(file_name, json_name):
            (prj, level, unit_name))
     if scenario:
         cmd += ' ' + scenario
-    _log("Generating %s ..." % json_name, mode="text")
-    proc = GPS.Process(cmd, on_exit=on_exit, remote_server="Build_Server")
-    proc.file_name = file_name
-    proc.json_name = json_name
+    ali = os.path.join(os.path.dirname(json_name), unit_name) + ".ali"
+
+    compiler_artifacts.request(
+        compiler_artifacts.Artifact(
+            json_name, GPS.File(file_name), ali, cmd, params=level),
+        lambda json_name: edit_file(file_name, json_name))
 
 
 #################################
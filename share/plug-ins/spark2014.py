@@ -509,6 +509,13 @@ def get_compunit_for_message(text, fn):
     return os.path.splitext(fname)[0]
 
 
+spark_files = {}
+# The contents of the .spark files read so far, indexed by file name. For
+# each file, this contains the (mtime, size) of the file when it was read,
+# and the mapping msg_id -> extra_info for the messages of its unit. These
+# files are only read again when they change.
+
+
 class GNATprove_Parser(tool_output.OutputParser):
 
     """Class that parses messages of the gnatprove tool, and creates
@@ -521,7 +528,8 @@ class GNATprove_Parser(tool_output.OutputParser):
        it's not visible in GPS, and builds up a mapping
          msg -> id
        Once GNATprove is terminated, for each msg which has an entry in this
-       mapping, the parser opens the JSON file "unit.spark".
+       mapping, the parser opens the JSON file "unit.spark", unless it has
+       not changed since it was last read.
        See the :func:`parsejson()` function for the format of this file.
        Once this file is parsed, the GNATprove parser now knows the extra
        information associated to a message, if any. See
@@ -556,6 +564,11 @@ class GNATprove_Parser(tool_output.OutputParser):
 
         # holds the unit names for which extra info is retrieved
         self.units_with_extra_info = []
+        # map from unit to corresponding object directory
+        self.imported_units = {}
+        # the directories where the .spark files are searched, computed
+        # when the first message with extra info is found
+        self.artifact_dirs = None
         # holds the mapping "msg" -> msg_id
         self.msg_id = {}
         self.message_re = re.compile(r"(?P<filename>^[^: ]+)"
@@ -568,7 +581,7 @@ class GNATprove_Parser(tool_output.OutputParser):
         self.extra_re = re.compile(r"(?P<text>.*)"
                                    r"\[#(?P<extra>[0-9]+)\]$")
 
-        # holds the mapping "unit,msg_id" -> extra_info
+        # holds the mapping unit -> (msg_id -> extra_info)
         self.extra_info = {}
         self.has_analysis_messages = False
 
@@ -603,29 +616,31 @@ class GNATprove_Parser(tool_output.OutputParser):
         """
 
         lines = []
+        files = {}
         if os.path.isfile(filename):
             with open(filename, 'r') as f:
                 for line in f:
                     sl = line.split(':')
                     if len(sl) >= 2:
+                        if sl[0] not in files:
+                            files[sl[0]] = GPS.File(sl[0])
                         lines.append(
-                            GPS.FileLocation(GPS.File(sl[0]),
+                            GPS.FileLocation(files[sl[0]],
                                              int(sl[1]),
                                              1))
         return lines
 
-    def handle_entry(self, unit, list, session_map=None):
+    def handle_entry(self, entries, list, session_map=None):
         """code do handle one entry of the JSON file. See :func:`parsejson()`
            for the details of the format.
         """
 
         for entry in list:
             if 'msg_id' in entry:
-                full_id = unit, entry['msg_id']
                 ent = entry
                 if session_map is not None and 'session_dir' in ent:
                     ent['session_dir'] = session_map[ent['session_dir']]
-                self.extra_info[full_id] = ent
+                entries[ent['msg_id']] = ent
 
     def parsejson(self, unit, fn):
         """parse the json file "fn", which belongs to unit "unit" and fill
@@ -636,11 +651,21 @@ class GNATprove_Parser(tool_output.OutputParser):
            dictionaries have the field "msg_id", these dictionaries are extra
            information for the corresponding message for the current unit. For
            those messages, we simply build up a mapping
-             (unit, id) -> extra_info
+             unit -> (id -> extra_info)
            which is later used to act on this extra information for each
            message.
+           The result of parsing the file is kept in spark_files, and reused
+           as long as the file does not change.
         """
-        if os.path.isfile(fn):
+        try:
+            stat = os.stat(fn)
+        except OSError:
+            return
+
+        stamp = (stat.st_mtime, stat.st_size)
+        cached = spark_files.get(fn)
+        if cached is None or cached[0] != stamp:
+            entries = {}
             with open(fn, 'r') as f:
                 try:
                     dict = json.load(f)
@@ -650,11 +675,14 @@ class GNATprove_Parser(tool_output.OutputParser):
                         session_map = {int(k): v for k,
                                        v in session_map.items()}
                     if 'flow' in dict:
-                        self.handle_entry(unit, dict['flow'])
+                        self.handle_entry(entries, dict['flow'])
                     if 'proof' in dict:
-                        self.handle_entry(unit, dict['proof'], session_map)
+                        self.handle_entry(entries, dict['proof'], session_map)
                 except ValueError:
                     pass
+            cached = spark_files[fn] = (stamp, entries)
+
+        self.extra_info[unit] = cached[1]
 
     def get_rule_id(self, output, extra):
         """return the rule ID associated to the output.
@@ -695,19 +723,26 @@ class GNATprove_Parser(tool_output.OutputParser):
         if 'cntexmp' in extra:
             counterexample = extra['cntexmp']
 
-        lines = []
+        # The trace file is only parsed when the user asks to show the path
+        tracefile = None
         if 'tracefile' in extra and extra['tracefile'] != '':
             tracefile = os.path.join(objdir, extra['tracefile'])
-            lines = self.parse_trace_file(tracefile)
+            if not os.path.isfile(tracefile) or \
+               os.path.getsize(tracefile) == 0:
+                tracefile = None
 
-        if counterexample != {} or lines != []:
+        if counterexample != {} or tracefile is not None:
             if counterexample != {}:
                 msg = 'Show counterexample'
             else:
                 msg = 'Show path'
-            m.set_subprogram(lambda m: toggle_trace(m, lines, counterexample),
-                             'gps-gnatprove-symbolic',
-                             msg)
+            m.set_subprogram(
+                lambda m: toggle_trace(
+                    m,
+                    self.parse_trace_file(tracefile) if tracefile else [],
+                    counterexample),
+                'gps-gnatprove-symbolic',
+                msg)
         # We don't want to open hundreds of editors if a Prove All
         # or Prove File was launched with a manual prover.
         # We only open an editor for prove check.
@@ -826,11 +861,6 @@ class GNATprove_Parser(tool_output.OutputParser):
                 messages_category, GPS.Message.Flags.INVISIBLE)
             self.previous_messages_removed = True
 
-        artifact_dirs = (
-            [os.path.join(f, obj_subdir_name)
-             for f in GPS.Project.root().object_dirs(recursive=True)])
-        imported_units = {}  # map from unit to corresponding object directory
-
         lines = text.splitlines()
         for line in lines:
             msg_match = re.match(self.message_re, line)
@@ -850,8 +880,7 @@ class GNATprove_Parser(tool_output.OutputParser):
                 if extra_match:
                     text = extra_match.group('text')
                     extra, unit = self.get_extra_info(
-                        extra_match.group('extra'), text, fn, command,
-                        imported_units, artifact_dirs)
+                        extra_match.group('extra'), text, fn, command)
                 else:
                     extra = {}
 
@@ -869,7 +898,7 @@ class GNATprove_Parser(tool_output.OutputParser):
                     message = self.split_in_secondary_messages(
                         fn, lineno, column, text, importance, extra)
                     self.act_on_extra_info(
-                        message, extra, imported_units[unit], command)
+                        message, extra, self.imported_units[unit], command)
                 else:
                     # Let the "location parser" handle non-spark messages
                     GPS.Locations.add(messages_category, fn, lineno,
@@ -880,30 +909,30 @@ class GNATprove_Parser(tool_output.OutputParser):
                     # codefixes later
                     self.non_spark_output += line + "\n"
 
-    def get_extra_info(self, id, text, fn, command,
-                       imported_units, artifact_dirs):
+    def get_extra_info(self, id, text, fn, command):
         """Parse the .spark file of the corresponding unit to
            get the extra info.
         """
-        extra = {}
         unit = get_compunit_for_message(text, fn)
-        full_id = unit, int(id)
         # First time this unit is seen, identify the corresponding
         # object directory where extra info can be found for that unit.
-        if unit not in imported_units:
-            for artifact_dir in artifact_dirs:
+        if unit not in self.imported_units:
+            if self.artifact_dirs is None:
+                self.artifact_dirs = (
+                    [os.path.join(f, obj_subdir_name)
+                     for f in GPS.Project.root().object_dirs(recursive=True)])
+            for artifact_dir in self.artifact_dirs:
                 sparkfile = os.path.join(artifact_dir, unit + ".spark")
                 if os.path.exists(sparkfile):
                     self.parsejson(unit, sparkfile)
-                    imported_units[unit] = artifact_dir
+                    self.imported_units[unit] = artifact_dir
                     break
         # If no object directory was identified, associate the default
         # artifacts directory.
-        if unit not in imported_units:
-            imported_units[unit] = GPS.Project.root().artifacts_dir()
+        if unit not in self.imported_units:
+            self.imported_units[unit] = GPS.Project.root().artifacts_dir()
 
-        if full_id in self.extra_info:
-            extra = self.extra_info[full_id]
+        extra = self.extra_info.get(unit, {}).get(int(id), {})
         return extra, unit
 
 
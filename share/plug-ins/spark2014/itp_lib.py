@@ -1,4 +1,5 @@
 import GPS
+import collections
 import json
 from os import path, utime
 # Import graphics Gtk libraries for proof interactive elements
@@ -130,6 +131,18 @@ COLUMN_STATUS = "Status"
 # Menu for the Manual proof
 MENU_NAME = "Manual Proof Commands"
 
+# The string that ends each notification sent by the itp server
+NOTIFICATION_DELIMITER = ">>>>"
+
+# The requests are sent in chunks of at most this size. From different
+# documentation, it can be assumed that pipes have a size of at least 4096
+# (on all platforms).
+SEND_CHUNK_SIZE = 4080
+
+# The requests are sent before the next timeout when the buffer reaches this
+# size.
+SEND_THRESHOLD = 3800
+
 
 def print_debug(s):
     """print debugging information when debug_mode is set"""
@@ -379,16 +392,71 @@ def parse_message(j, abs_tree):
         print_debug("TODO")
 
 
-def find_last(s, sep, first, last):
-    """ Returns the biggest int res such that res < last and s[first:res]
-        finish with sep.
+class RequestWriter:
+    """ This class buffers the requests sent to the itp server, and sends
+        them in chunks of complete requests that fit in the pipe.
     """
 
-    res = s.find(sep, first, last)
-    if res == -1 or res == first:
-        return(first)
-    else:
-        return (find_last(s, sep, (res + len(sep)), last))
+    def __init__(self, process):
+        self.process = process
+        self.pending = collections.deque()  # the requests, with their "\n"
+        self.size = 0                       # the total size of pending
+
+    def write(self, request):
+        """ Add a request to the buffer """
+        request += "\n"
+        self.pending.append(request)
+        self.size += len(request)
+
+    def flush(self):
+        """ Send the first chunk of requests. A request larger than
+            SEND_CHUNK_SIZE is sent on its own.
+        """
+        chunk = []
+        chunk_size = 0
+        while self.pending and (
+                not chunk or
+                chunk_size + len(self.pending[0]) <= SEND_CHUNK_SIZE):
+            request = self.pending.popleft()
+            chunk.append(request)
+            chunk_size += len(request)
+
+        if chunk:
+            self.size -= chunk_size
+            self.process.send("".join(chunk))
+
+
+class NotificationReader:
+    """ This class splits the output of the itp server into notifications.
+        The output read at once can contain several notifications, and the
+        last one can be incomplete.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, output):
+        """ Add output to the buffer, and return the list of the complete
+            notifications it contains, as strings starting with "{".
+        """
+        self.buffer += output
+        parts = self.buffer.split(NOTIFICATION_DELIMITER)
+        self.buffer = parts.pop()
+        result = []
+        for part in parts:
+            # Remove remaining stderr output (stderr and stdout are mixed)
+            # by looking for the beginning of the notification.
+            i = part.find("{")
+            if i == -1:
+                print_debug(part)
+            else:
+                result.append(part[i:])
+        return result
+
+    def decode(self, notification):
+        """ Return the json object for notification """
+        return self.decoder.raw_decode(notification)[0]
 
 
 class Tree:
@@ -482,6 +550,22 @@ class Tree:
         # find something that do exactly this in Gtk ??? (does not exist ?)
         self.node_id_to_row_ref = {}
 
+        # While the notifications received at once are handled, the view is
+        # only expanded at the end.
+        self.frozen = False
+        self.expand_needed = False
+
+    def freeze(self):
+        """ Stop updating the view until thaw is called """
+        self.frozen = True
+
+    def thaw(self):
+        """ Update the view after the changes done since freeze """
+        self.frozen = False
+        if self.expand_needed:
+            self.expand_needed = False
+            self.view.expand_all()
+
     def clear(self):
         """ clear the content of the tree """
         self.node_id_to_row_ref = {}
@@ -534,7 +618,10 @@ class Tree:
         self.set_iter(new_iter, node)
         # ??? We currently always expand the tree. We may not want to do that
         # in the future.
-        self.view.expand_all()
+        if self.frozen:
+            self.expand_needed = True
+        else:
+            self.view.expand_all()
 
     def get_parent_node(self, node):
         """ Returns the parent id of the node or 0 if the parent is
@@ -700,10 +787,10 @@ class Tree_with_process(MenuITP):
         # init local variables
         self.save_and_exit = False
         self.exit_sent = False
-        # send_queue and size_queue are used for request sent by the IDE to ITP
-        # server.
-        self.send_queue = ""
-        self.size_queue = 0
+        # writer buffers the requests sent by the IDE to ITP server. It is
+        # created with the process.
+        self.writer = None
+        self.reader = NotificationReader()
         self.checking_notification = False
         print_debug("ITP launched")
 
@@ -750,11 +837,15 @@ class Tree_with_process(MenuITP):
 
         # init the tree
         self.tree = Tree()
+        self.reader = NotificationReader()
+        # Match all the notifications received so far at once
         self.process = GPS.Process(command,
-                                   regexp=">>>>",
+                                   regexp=".*" + NOTIFICATION_DELIMITER,
+                                   single_line_regexp=True,
                                    on_match=self.check_notifications,
                                    directory=dir_gnat_server,
                                    on_exit=self.exit_by_gnat_server)
+        self.writer = RequestWriter(self.process)
         self.console = GPS.Console(ITP_CONSOLE,
                                    on_input=self.interactive_console_input)
         self.console.write("> ")
@@ -851,23 +942,33 @@ class Tree_with_process(MenuITP):
         """
         self.kill()
 
-    def check_notifications(self, unused, delimiter, notification):
+    def check_notifications(self, unused, notifications, before):
         """ function used as an on_match by the GPS.Process used to launch
             the itp server. This does the server to plugin communication.
+            All the notifications received at once are handled together, and
+            the proof tree view is only updated at the end.
         """
         self.checking_notification = True
-        print_debug(notification)
+        print_debug(notifications)
+        self.tree.freeze()
         try:
-            # Remove remaining stderr output (stderr and stdout are mixed) by
-            # looking for the beginning of the notification (begins with {).
-            i = notification.find("{")
-            notif = notification[i:]
-            if notif[:10] == "{ Failure:":
-                irr_error = "Irrecoverable error of manual proof." + notif
-                GPS.MDI.dialog(irr_error)
-                self.kill()
-                return
-            p = json.loads(notification[i:])
+            for notif in self.reader.feed(before + notifications):
+                if not itp_started:
+                    break
+                if notif[:10] == "{ Failure:":
+                    irr_error = "Irrecoverable error of manual proof." + notif
+                    GPS.MDI.dialog(irr_error)
+                    self.kill()
+                    return
+                self.parse_notification(notif)
+        finally:
+            self.tree.thaw()
+            self.checking_notification = False
+
+    def parse_notification(self, notification):
+        """ Decode a notification and update the tree accordingly """
+        try:
+            p = self.reader.decode(notification)
             parse_notif(p, self, self.proof_task)
         except (ValueError):
             print("Bad Json value")
@@ -878,7 +979,6 @@ class Tree_with_process(MenuITP):
         except (TypeError):
             print("Bad type")
             print(notification)
-        self.checking_notification = False
 
     def select_function(self, select, model, path, currently_selected):
         """ function used as the select function of the proof tree """
@@ -937,16 +1037,8 @@ class Tree_with_process(MenuITP):
         # code here. This looks really bad and should be investigated: if this
         # kind of checks really is necessary, it should be done in function
         # send/on_match from GPS.Process (obviously not here).
-        if not self.size_queue == 0 and not self.checking_notification:
-            # We send only complete request and less than 4080 char
-            n = find_last(self.send_queue, "\n", 0, 4080)
-            if n == -1 or n == 0 or n is None:
-                self.send_queue = ""
-                self.size_queue = 0
-            else:
-                self.process.send(self.send_queue[0:n])
-                self.send_queue = self.send_queue[n:]
-                self.size_queue = len(self.send_queue)
+        if self.writer and not self.checking_notification:
+            self.writer.flush()
 
     # This is used as a wrapper (for debug) that actually create the message.
     # The function really sending this is called actual_send. 2 functions are
@@ -962,13 +1054,10 @@ class Tree_with_process(MenuITP):
         """
 
         print_debug(s)
-        self.send_queue = self.send_queue + s + "\n"
-        self.size_queue = self.size_queue + len(s) + 4
-        # From different documentation, it can be assumed that pipes have a
-        # size of at least 4096 (on all platforms). So, our heuristic is to
-        # check at 3800 if it is worth sending before the timeout
-        # automatically does it.
-        if self.size_queue > 3800:
+        self.writer.write(s)
+        # Check if it is worth sending before the timeout automatically does
+        # it.
+        if self.writer.size > SEND_THRESHOLD:
             self.actual_send(0)
 
     def command_request(self, command, node_id):
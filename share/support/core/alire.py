@@ -1,5 +1,11 @@
 """
 Alire integration script.
+
+The environment printed by "alr printenv" for a crate is cached in the
+GNAT Studio home directory, keyed on the contents of the files it depends
+on (the crate manifest and lock file, and the Alire configuration). When
+it is available, the environment is set before the project is loaded, and
+Alire is only run in the background to check that it is still valid.
 """
 
 ###########################################################################
@@ -7,6 +13,8 @@ Alire integration script.
 ###########################################################################
 
 import GPS
+import hashlib
+import json
 import os_utils
 import os.path
 import re
@@ -16,6 +24,10 @@ from gi.repository import Gtk
 alr = os_utils.locate_exec_on_path("alr")
 saved_env = {}  # all changed env variables and their values
 project_to_reload = None  # The project we should reload after finding an Alire manifest
+to_revalidate = None  # The project loaded with a cached environment
+revalidating = None  # The project whose cached environment is being checked
+printed_env = {}  # The environment printed by the last run of Alire
+env_cache_file = os.path.join(GPS.get_home_dir(), "alire_env.json")
 
 def find_alire_root(path):
     """
@@ -31,11 +43,96 @@ def find_alire_root(path):
     return find_alire_root(parent)
 
 
+def environment_key(root):
+    """
+    Return a hash of the files that impact the environment printed by
+    Alire for the crate in root.
+    """
+    user_dir = os.environ.get("ALR_CONFIG") or os.path.join(
+        os.path.expanduser("~"), ".config", "alire")
+    files = [os.path.join(root, "alire.toml"),
+             os.path.join(root, "alire.lock"),
+             os.path.join(root, "alire", "config.toml"),
+             os.path.join(root, "alire", "settings.toml"),
+             os.path.join(user_dir, "config.toml"),
+             os.path.join(user_dir, "settings.toml")]
+
+    h = hashlib.sha1()
+    for f in files:
+        h.update(f.encode())
+        try:
+            with open(f, "rb") as fd:
+                h.update(fd.read())
+        except IOError:
+            h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_env_cache():
+    try:
+        with open(env_cache_file) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def cached_env(root, key):
+    """
+    Return the environment printed by Alire for the crate in root, if it
+    was computed with the same configuration files, or None.
+    """
+    entry = load_env_cache().get(root)
+    if entry and entry.get("key") == key:
+        return entry["env"]
+    return None
+
+
+def save_env(root, key, env):
+    cache = load_env_cache()
+    cache[root] = {"key": key, "env": env}
+    try:
+        with open(env_cache_file, "w") as f:
+            json.dump(cache, f)
+    except IOError:
+        GPS.Logger("ALIRE").log("Could not write %s" % env_cache_file)
+
+
+def set_env(name, value):
+    """Set an environment variable, saving its original value"""
+    if name not in saved_env:
+        saved_env[name] = GPS.getenv(name)
+    GPS.setenv(name, value)
+    os.environ[name] = value
+
+
+def run_alire(root):
+    """Run Alire in the background to compute the environment"""
+    printed_env.clear()
+    GPS.Logger("ALIRE").log("Running alire...")
+    alire_target = GPS.BuildTarget("Alire")
+    alire_target.execute(directory=root, synchronous=False)
+
+
+def reload_project(file):
+    """Reload the project once its environment is set"""
+    global project_to_reload
+    GPS.MDI.get("Locations").set_activity_progress_bar_visibility(False)
+    GPS.Project.load(file)
+    project_to_reload = None
+
+
 def on_project_recomputed(hook):
-    global progress_timeout
+    global progress_timeout, to_revalidate, revalidating
 
-    if project_to_reload:
-        file, root = project_to_reload
+    if to_revalidate:
+        # The project was loaded with a cached environment: check in the
+        # background that it is still the one printed by Alire.
+        revalidating = to_revalidate
+        to_revalidate = None
+        run_alire(revalidating[1])
+
+    elif project_to_reload:
+        file, root, _ = project_to_reload
         timeout_count = 0
 
         def display_message(timeout):
@@ -64,9 +161,7 @@ def on_project_recomputed(hook):
                 timeout.remove()
 
         # Run Alire to setup the environment
-        GPS.Logger("ALIRE").log("Running alire...")
-        alire_target = GPS.BuildTarget("Alire")
-        alire_target.execute(directory=root, synchronous=False)
+        run_alire(root)
 
         # Display a message in the Locations view to warn the user that
         # Alire is being ran
@@ -78,35 +173,64 @@ def on_compilation_finished(hook, category, target_name, mode_name, status, cmd)
     Reload the project once Alire has been ran to setup the
     environment.
     """
-    global project_to_reload
+    global project_to_reload, revalidating
     if not target_name.startswith("Alire"):
         return
 
     if project_to_reload:
-        file, root = project_to_reload
+        file, root, _ = project_to_reload
+        if not status:
+            # Compute the key now: running Alire might have created or
+            # updated the lock file
+            save_env(root, environment_key(root), printed_env)
         GPS.Logger("ALIRE").log(
             "Alire configuration finished, reloading %s" % str(file))
-        GPS.MDI.get("Locations").set_activity_progress_bar_visibility(False)
-        GPS.Project.load(file)
+        reload_project(file)
         GPS.Locations.add(
             "Alire", GPS.File(file), 1, 1,
             "Alire environment is now setup: project has been reloaded",
             importance=GPS.Message.Importance.INFORMATIONAL)
         GPS.MDI.information_popup(
                 'Alire project is now setup', 'vcs-up-to-date')
-        project_to_reload = None
+
+    elif revalidating:
+        file, root, key = revalidating
+        revalidating = None
+        if status:
+            return
+
+        # Running Alire might have created or updated the lock file
+        new_key = environment_key(root)
+        if printed_env == cached_env(root, key):
+            if new_key != key:
+                save_env(root, new_key, printed_env)
+            return
+
+        GPS.Logger("ALIRE").log(
+            "Alire environment has changed, reloading %s" % str(file))
+        save_env(root, new_key, printed_env)
+        project_to_reload = (file, root, new_key)
+        reload_project(file)
+        GPS.Locations.add(
+            "Alire", GPS.File(file), 1, 1,
+            "Alire environment has changed: project has been reloaded",
+            importance=GPS.Message.Importance.INFORMATIONAL)
 
 
 def on_project_changing(hook, file):
     """
     Detect if we are dealing with an Alire project.
-    If yes, save the project we are trying to load so we
-    can launch Alire after failing to load it, in order to
-    reload it once the needed environment is set.
+    If yes, and the environment printed by Alire is in the cache,
+    set it before loading the project. Otherwise, save the project
+    we are trying to load so we can launch Alire after failing to
+    load it, in order to reload it once the needed environment is set.
     """
-    global saved_env, project_to_reload
+    global saved_env, project_to_reload, to_revalidate
 
-    if project_to_reload or "ALIRE" in os.environ:
+    # Do nothing when reloading the project, or when GNAT Studio was
+    # launched with the Alire environment already set.
+    if project_to_reload or (
+            "ALIRE" in os.environ and "ALIRE" not in saved_env):
         project_to_reload = None
         return
 
@@ -121,12 +245,24 @@ def on_project_changing(hook, file):
             del os.environ[name]
 
     saved_env = {}
+    to_revalidate = None
 
     root = find_alire_root(file.path)
 
     if root:
-        GPS.Logger("ALIRE").log("Alire manifest detected!")
-        project_to_reload = (file.path, root)
+        key = environment_key(root)
+        env = cached_env(root, key)
+
+        if env is not None:
+            # Load the project directly with the cached environment
+            GPS.Logger("ALIRE").log(
+                "Alire manifest detected, using cached environment")
+            for name, value in env.items():
+                set_env(name, value)
+            to_revalidate = (file.path, root, key)
+        else:
+            GPS.Logger("ALIRE").log("Alire manifest detected!")
+            project_to_reload = (file.path, root, key)
 
 
 class Alire_Parser(tool_output.OutputParser):
@@ -140,8 +276,6 @@ class Alire_Parser(tool_output.OutputParser):
         self.exp = re.compile(r"export (\S+)=(.*)")
 
     def on_stdout(self, text, command):
-        global saved_env
-
         for line in text.splitlines():
             m = self.exp.fullmatch(line)
 
@@ -149,9 +283,8 @@ class Alire_Parser(tool_output.OutputParser):
                 name = m.group(1)
                 value = m.group(2)
                 GPS.Logger("ALIRE").log("%s=%s" % (name, value))
-                saved_env[name] = GPS.getenv(name)
-                GPS.setenv(name, value)
-                os.environ[name] = value
+                printed_env[name] = value
+                set_env(name, value)
 
 
 if alr:
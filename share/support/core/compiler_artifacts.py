@@ -0,0 +1,272 @@
+"""
+This file provides a cache for the artifacts generated by the compiler or
+GNATprove for a source file, and displayed by some views: the expanded code
+(.dg files), the generated global contracts (.gg files) or the
+representation clauses (-gnatR json files).
+
+For each artifact, the closure of the sources it was computed from (as
+listed in the ALI file of the unit) is recorded, so that the artifact is only
+generated again when one of these sources has changed, and not only when the
+source file itself has changed.
+
+An artifact is generated by one process at a time: a request with other
+options while it is being generated waits for the current generation.
+
+If the "Prefetch compiler artifacts" preference is enabled, artifacts which
+have been requested once are also generated again in the background when one
+of their sources is saved, so that showing them again is immediate.
+"""
+
+import os
+import GPS
+from gs_utils import hook
+
+
+PREFETCH_PREF = GPS.Preference("Plugins/compiler_artifacts/prefetch")
+PREFETCH_PREF.create(
+    "Prefetch compiler artifacts", "boolean",
+    "If enabled, the expanded code, generated global contracts and "
+    "representation clauses that have already been displayed for a file "
+    "are computed again in the background when one of their sources is "
+    "saved. This runs the compiler or GNATprove in the object "
+    "directory after each save.",
+    False)
+
+
+class Artifact(object):
+    """
+    Describes how to generate an artifact for a source file.
+    """
+
+    def __init__(self, path, source, ali, command, on_output=None,
+                 params=None):
+        """
+        :param str path: the artifact file.
+        :param GPS.File source: the source file the artifact is computed for.
+        :param str ali: the ALI file of the unit, which lists the
+           dependencies of the artifact.
+        :param str command: the command line which generates the artifact.
+           It is run on the build server.
+        :param on_output: if set, a function called with the path of the
+           artifact and the output of the command once it has completed
+           successfully, to write the artifact.
+        :param params: any value identifying the options used to generate
+           the artifact: the artifact is generated again when it changes.
+        """
+        self.path = path
+        self.source = source
+        self.ali = ali
+        self.command = command
+        self.on_output = on_output
+        self.params = params
+
+
+class _Generation(object):
+    """An artifact being generated, and the callbacks waiting for it"""
+
+    def __init__(self, artifact, quiet):
+        self.artifact = artifact
+        self.quiet = quiet
+        self.callbacks = []
+
+
+_records = {}
+# The inputs of the known artifacts, indexed by artifact path. The values are
+# tuples (params, {input file path: modification time})
+
+_requested = {}
+# The artifacts that have been requested in this session, indexed by
+# artifact path. These are the ones that are prefetched.
+
+_running = {}
+# The artifacts being generated, indexed by artifact path
+
+_waiting = {}
+# The requests for an artifact being generated with other params, indexed by
+# artifact path. They are generated once the current generation completes.
+# The values are tuples (artifact, callbacks)
+
+_prefetch_queue = []
+# The artifacts waiting to be generated in the background. They are
+# generated one at a time, to avoid concurrent builds in the same object
+# directory.
+
+
+def _log(msg, mode="error"):
+    """Facility logger"""
+    GPS.Console("Messages").write(msg + "\n", mode=mode)
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _inputs(artifact):
+    """
+    Return the files the artifact depends on, with their modification times.
+    These are read from the 'D' lines of the ALI file, and always include
+    the source file itself.
+    """
+    paths = [artifact.source.path]
+    try:
+        with open(artifact.ali, errors="replace") as f:
+            for line in f:
+                if line.startswith("D "):
+                    paths.append(GPS.File(line.split()[1]).path)
+    except IOError:
+        pass
+
+    result = {}
+    for p in paths:
+        m = _mtime(p)
+        if m is not None:
+            result[p] = m
+    return result
+
+
+def is_up_to_date(artifact):
+    """Whether the artifact exists and none of its inputs has changed"""
+    artifact_mtime = _mtime(artifact.path)
+    if artifact_mtime is None:
+        return False
+
+    record = _records.get(artifact.path)
+    if record is None:
+        # Generated in a previous session: we cannot know which options
+        # were used, but otherwise compare with the date of its inputs.
+        if artifact.params is not None:
+            return False
+        inputs = _inputs(artifact)
+        if any(m > artifact_mtime for m in inputs.values()):
+            return False
+        _records[artifact.path] = (None, inputs)
+        return True
+
+    params, inputs = record
+    return params == artifact.params and all(
+        _mtime(p) == m for p, m in inputs.items())
+
+
+def request(artifact, on_ready):
+    """
+    Call on_ready with the path of the artifact as soon as it is up to date,
+    generating it if needed. on_ready is not called if the generation fails,
+    in which case the error is displayed in the Messages view.
+    """
+    _requested[artifact.path] = artifact
+
+    generation = _running.get(artifact.path)
+    if generation is not None:
+        if generation.artifact.params == artifact.params:
+            # Already being generated, for instance in the background: the
+            # user is now waiting for it.
+            generation.quiet = False
+            generation.callbacks.append(on_ready)
+            return
+
+        # Two processes must not write the same artifact: wait for the
+        # current one. Only the last of the waiting requests is kept.
+        waiting = _waiting.get(artifact.path)
+        if waiting is not None and waiting[0].params == artifact.params:
+            waiting[1].append(on_ready)
+        else:
+            _waiting[artifact.path] = (artifact, [on_ready])
+        return
+
+    if is_up_to_date(artifact):
+        on_ready(artifact.path)
+    else:
+        _generate(artifact, [on_ready], quiet=False)
+
+
+def _generate(artifact, callbacks=(), quiet=True):
+    generation = _Generation(artifact, quiet)
+    generation.callbacks.extend(callbacks)
+    _running[artifact.path] = generation
+
+    if quiet:
+        GPS.Logger("COMPILER_ARTIFACTS").log("prefetching " + artifact.path)
+    else:
+        _log("Generating %s ..." % artifact.path, mode="text")
+
+    try:
+        proc = GPS.Process(artifact.command, on_exit=_on_exit,
+                           remote_server="Build_Server")
+        proc.generation = generation
+    except Exception:
+        _log("Could not launch: %s" % artifact.command)
+        _generation_done(generation)
+
+
+def _generation_done(generation):
+    """Start what was waiting for the end of generation"""
+    path = generation.artifact.path
+    if _running.get(path) is generation:
+        del _running[path]
+
+    waiting = _waiting.pop(path, None)
+    if waiting is not None:
+        artifact, callbacks = waiting
+        if is_up_to_date(artifact):
+            for cb in callbacks:
+                cb(artifact.path)
+        else:
+            _generate(artifact, callbacks, quiet=False)
+            return
+
+    _prefetch_next()
+
+
+def _on_exit(process, status, full_output):
+    generation = process.generation
+    artifact = generation.artifact
+
+    if status:
+        _records.pop(artifact.path, None)
+        if generation.quiet:
+            GPS.Logger("COMPILER_ARTIFACTS").log(process.get_result())
+        else:
+            _log(process.get_result())
+    else:
+        if artifact.on_output:
+            artifact.on_output(artifact.path, full_output)
+        _records[artifact.path] = (artifact.params, _inputs(artifact))
+
+        for cb in generation.callbacks:
+            cb(artifact.path)
+
+    _generation_done(generation)
+
+
+def _prefetch_next():
+    """Generate the next artifact in the background, if any"""
+    while _prefetch_queue and not _running:
+        artifact = _prefetch_queue.pop(0)
+        if not is_up_to_date(artifact):
+            _generate(artifact)
+
+
+@hook("file_saved")
+def _on_file_saved(file):
+    if not PREFETCH_PREF.get():
+        return
+
+    for path, artifact in _requested.items():
+        record = _records.get(path)
+        if artifact.source == file \
+                or (record is not None and file.path in record[1]):
+            if artifact not in _prefetch_queue:
+                _prefetch_queue.append(artifact)
+
+    _prefetch_next()
+
+
+@hook("project_view_changed")
+def _on_project_view_changed():
+    # The object directories and switches might have changed
+    _records.clear()
+    _requested.clear()
+    del _prefetch_queue[:]
@@ -154,6 +154,14 @@ class CompletionProposal(object):
         return [self.name, self.label, self.documentation,
                 self.icon_name, self.action_name, self.language_category]
 
+    def get_documentation(self):
+        """
+            Return the documentation of the proposal. This is only called
+            when the proposal is selected, and when `documentation` is
+            empty: override this to compute the documentation lazily.
+        """
+        return self.documentation
+
 
 class SimpleCompletionResolver(object):
 
@@ -243,6 +251,8 @@ class AdaIteratorWrapper(object):
     def rewind(self):
         if self.cached_results:
             self.index_in_cache = 0
+            self.at_end = False
+            self._ada_next()
 
     def _ada_at_end(self):
         return self.at_end
@@ -256,6 +266,7 @@ class AdaIteratorWrapper(object):
 
             try:
                 self.current = next(self.iterator)
+                self.cached_results.append(self.current)
             except StopIteration:
                 self.at_end = True
                 self.current = None
@@ -274,3 +285,16 @@ class AdaIteratorWrapper(object):
 
                 self.index_in_cache = -1
                 self._ada_next()
+
+    def _ada_next_batch(self, count):
+        """
+        Return the data of the next `count` proposals (fewer when the end
+        is reached), as lists of the fields returned by get_data_as_list
+        followed by the proposal itself.
+        """
+        result = []
+        while len(result) < count and not self.at_end:
+            result.append(
+                self.current.get_data_as_list() + [self.current])
+            self._ada_next()
+        return result
@@ -9,6 +9,15 @@ import gs_utils
 
 cross_ref_runtime = GPS.Preference('Project:Cross-References/runtime')
 
+COALESCE_DELAY = 500
+# The requests to recompute the cross references received within this
+# delay, in milliseconds, are handled by a single run of gnatinspect.
+
+UP_TO_DATE = "up_to_date"
+PENDING = "pending"
+RUNNING = "running"
+# The possible states of the cross-reference database
+
 
 def runtime_switch():
     """
@@ -75,6 +84,12 @@ class Sqlite_Cross_References(object):
 """
 
     def __init__(self):
+        # The state of the database: see the constants above
+        self.state = UP_TO_DATE
+
+        # The promises to resolve when the database is up to date
+        self.waiters = []
+
         # If true, gnatinspect is never run.
         # This should be the case when the LSP support is enabled for Ada:
         if GPS.Logger("GPS.LSP.ADA_SUPPORT").active:
@@ -104,6 +119,25 @@ class Sqlite_Cross_References(object):
         self.gnatinspect_launch_registered = False
         self.gnatinspect_already_running = False
 
+        # Whether gnatinspect is run as soon as it is requested, and
+        # synchronously. The testsuite expects the database to be computed
+        # before it goes on.
+        self.synchronous = GPS.Logger("TESTSUITE").active
+
+        # The timeout used to coalesce the requests, if any
+        self.timeout = None
+
+        # Whether the next run of gnatinspect should be quiet, and whether it
+        # is needed even if no ALI file has changed
+        self.pending_quiet = True
+        self.pending_forced = False
+
+        # The (mtime, size) of the ALI files, indexed by file name, when the
+        # last successful run of gnatinspect was launched, and when the
+        # current one was launched
+        self.ali_stamps = None
+        self.launched_stamps = None
+
         # Initialize self.trusted_mode and other preferences
         self.on_preferences_changed(None)
 
@@ -112,21 +146,62 @@ class Sqlite_Cross_References(object):
             lambda *args: self.recompute_xref(quiet=False),
             name="recompute xref info")
 
-    def gnatinspect_completed(self):
-        """ Call this when gnatinspect completed working.
+    def gnatinspect_completed(self, status=None):
+        """ Call this when gnatinspect completed working, with its exit
+            status, or None if it was not run.
         """
         self.gnatinspect_already_running = False
 
+        # The database only reflects the ALI files if gnatinspect succeeded
+        if status == 0:
+            self.ali_stamps = self.launched_stamps
+        self.launched_stamps = None
+
         if self.gnatinspect_launch_registered:
             # Aha, someone had requested a launch of gnatinspect while
             # this one was running. Launch this now.
             self.gnatinspect_launch_registered = False
-            self.recompute_xref()
+            self.state = PENDING
+            self.__schedule()
+        else:
+            self.state = UP_TO_DATE
+            waiters = self.waiters
+            self.waiters = []
+            for p in waiters:
+                p.resolve(True)
+
+    def is_up_to_date(self):
+        """ Whether the cross-reference database is up to date, ie no run of
+            gnatinspect is pending or in progress.
+        """
+        return self.state == UP_TO_DATE
 
-    def recompute_xref(self, force=False, quiet=True):
-        """ Launch recompilation of the cross references.
-            if Force is True, run regardless of a running gnatinspect
-            (this flag is used to protect against reentry)"""
+    def wait_up_to_date(self):
+        """ Return a promise resolved when the cross-reference database is
+            up to date. Use this in workflows that need the cross references,
+            instead of requesting a new computation.
+        """
+        from workflows.promises import Promise
+
+        p = Promise("xref")
+        if self.is_up_to_date():
+            p.resolve(True)
+        else:
+            self.waiters.append(p)
+        return p
+
+    def recompute_xref(self, force=False, quiet=True, check_ali=False):
+        """ Request a recompilation of the cross references. The requests
+            received within COALESCE_DELAY ms are handled by a single run of
+            gnatinspect, and the requests received while gnatinspect is
+            running are handled by a single run when it completes.
+            If check_ali is True, gnatinspect is only run if some ALI files
+            changed since its last run.
+            Force is kept for backward compatibility: reentry is always
+            protected against."""
+
+        self.pending_quiet = self.pending_quiet and quiet
+        self.pending_forced = self.pending_forced or not check_ali
 
         if self.gnatinspect_already_running:
             # We are already running gnatinspect. If someone registers
@@ -137,15 +212,78 @@ class Sqlite_Cross_References(object):
             self.gnatinspect_launch_registered = True
             return
 
+        self.state = PENDING
+
+        # Launch immediately when the user asked for it
+        self.__schedule(immediate=not quiet)
+
+    def __schedule(self, immediate=False):
+        """ Launch gnatinspect at the end of the current time window, or
+            now if immediate is True or gnatinspect is run synchronously.
+        """
+        if immediate or self.synchronous:
+            if self.timeout is not None:
+                self.timeout.remove()
+                self.timeout = None
+            self.__launch()
+        elif self.timeout is None:
+            self.timeout = GPS.Timeout(COALESCE_DELAY, self.__on_timeout)
+
+    def __on_timeout(self, timeout):
+        timeout.remove()
+        self.timeout = None
+        if self.gnatinspect_already_running:
+            self.gnatinspect_launch_registered = True
+        else:
+            self.__launch()
+
+    def __ali_stamps(self):
+        """ Return the (mtime, size) of the ALI files of the project, indexed
+            by file name.
+        """
+        stamps = {}
+        for d in GPS.Project.root().object_dirs(recursive=True):
+            try:
+                entries = os.scandir(d)
+            except OSError:
+                continue
+            with entries:
+                for e in entries:
+                    if e.name.endswith(".ali"):
+                        try:
+                            st = e.stat()
+                            stamps[e.path] = (st.st_mtime, st.st_size)
+                        except OSError:
+                            pass
+        return stamps
+
+    def __launch(self):
+        """ Launch gnatinspect for the requests received so far """
+        quiet = self.pending_quiet
+        forced = self.pending_forced
+        self.pending_quiet = True
+        self.pending_forced = False
+
         # The project might not exist, for instance when GPS is loading the
         # default project in a directory
 
         if not os.path.exists(GPS.Project.root().file().path):
+            self.gnatinspect_completed()
+            return
+
+        # gnatinspect only reads the ALI files that changed, but it still
+        # needs to load the project and check all the ALI files: skip it
+        # when a compilation did not change any of them.
+        stamps = self.__ali_stamps()
+        if not forced and stamps == self.ali_stamps:
+            self.gnatinspect_completed()
             return
+        self.launched_stamps = stamps
 
         # We are about to launch gnatinspect
         self.gnatinspect_launch_registered = False
         self.gnatinspect_already_running = True
+        self.state = RUNNING
         target = GPS.BuildTarget("Load Xref Info")
 
         # This might fail if we have spaces in the name of the directory, but
@@ -155,8 +293,8 @@ class Sqlite_Cross_References(object):
         if not self.trusted_mode:
             extra_args.append("--symlinks")
 
-        target.execute(synchronous=GPS.Logger(
-            "TESTSUITE").active, quiet=quiet, extra_args=extra_args)
+        target.execute(synchronous=self.synchronous, quiet=quiet,
+                       extra_args=extra_args)
 
     def on_compilation_finished(self, hook, category,
                                 target_name="", *args):
@@ -167,7 +305,7 @@ class Sqlite_Cross_References(object):
                             "Check Semantic", "Update file XRef",
                             "Update file XRef in background"] or
                 category in ["Makefile", "CodePeer"]):
-            self.recompute_xref()
+            self.recompute_xref(check_ali=True)
 
     def on_project_view_changed(self, hook):
         self.recompute_xref()
@@ -190,7 +328,8 @@ class GnatInspect_OnExit_Hook(tool_output.OutputParser):
             GPS.Logger("XREF").log(
                 "gnatinspect returned with status %s" % status)
 
-        r.gnatinspect_completed()
+        r.gnatinspect_completed(status)
 
-        if not r.gnatinspect_already_running:
+        # Another run of gnatinspect might be pending or already running
+        if r.state == UP_TO_DATE:
             GPS.Hook("xref_updated").run()
@@ -2019,7 +2019,63 @@ class patch_obj:
         return "".join(text)
 
 
-def compute_diff(str1, str2):
+LINE_DIFF_TIMEOUT = 0.5
+# The time budget of compute_diff, in seconds
+
+REFINE_MAX_LENGTH = 10000
+# Changed blocks of lines longer than this are not refined into a character
+# diff
+
+
+def compute_diff(str1, str2, timeout=LINE_DIFF_TIMEOUT, refine=True):
+    """
+    Return the differences between str1 and str2, as a list of
+    (operation, text) tuples, where operation is -1 (delete), 0 (keep) or
+    1 (insert).
+
+    The lines are compared first, so that the time spent depends on the
+    number of changed lines rather than on the size of the texts. Then,
+    if refine is True, each block of changed lines is compared character by
+    character, to keep the edits small.
+
+    The whole computation stops after timeout seconds: the blocks that were
+    not compared yet are then replaced as a whole.
+    """
     dmp = diff_match_patch()
-    diff = dmp.diff_main(str1, str2)
-    return diff
+    deadline = time.time() + timeout
+
+    chars1, chars2, lines = dmp.diff_linesToChars(str1, str2)
+    diffs = dmp.diff_main(chars1, chars2, False, deadline)
+    dmp.diff_charsToLines(diffs, lines)
+
+    result = []
+    deleted = []
+    inserted = []
+
+    def flush():
+        old = "".join(deleted)
+        new = "".join(inserted)
+        if (refine
+                and old and new
+                and len(old) + len(new) <= REFINE_MAX_LENGTH
+                and time.time() < deadline):
+            result.extend(dmp.diff_main(old, new, False, deadline))
+        else:
+            if old:
+                result.append((dmp.DIFF_DELETE, old))
+            if new:
+                result.append((dmp.DIFF_INSERT, new))
+        del deleted[:]
+        del inserted[:]
+
+    for op, text in diffs:
+        if op == dmp.DIFF_DELETE:
+            deleted.append(text)
+        elif op == dmp.DIFF_INSERT:
+            inserted.append(text)
+        else:
+            flush()
+            result.append((op, text))
+    flush()
+
+    return result
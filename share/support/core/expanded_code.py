@@ -1,12 +1,14 @@
 """
 This file provides support for displaying Ada expanded code as generated by
 GNAT (-gnatGL switch).
+The .dg files are generated again only when one of the sources of the unit
+has changed (see compiler_artifacts.py).
 """
 
 
 import os
-import distutils.dep_util
 import GPS
+import compiler_artifacts
 from gs_utils import in_ada_file, interactive
 
 
@@ -146,17 +148,6 @@ def edit_dg(dg, source_filename, line, for_subprogram, in_external_editor):
                 expanded_code_marks[source_filename] = [mark_num]
 
 
-# noinspection PyUnusedLocal
-def on_exit(process, status, full_output):
-    if status:
-        GPS.Console("Messages").write(process.get_result(), mode="error")
-    else:
-        create_dg(process.dg, full_output)
-        edit_dg(process.dg, process.source_filename,
-                process.line, process.for_subprogram,
-                process.in_external_editor)
-
-
 def show_gnatdg(for_subprogram=False, in_external_editor=False):
     """Show the .dg file of the current file"""
     GPS.MDI.save_all(False)
@@ -187,24 +178,21 @@ def show_gnatdg(for_subprogram=False, in_external_editor=False):
             (file, objdir))
 
     dg = os.path.join(objdir, os.path.basename(local_file)) + '.dg'
-
-    if distutils.dep_util.newer(local_file, dg):
-        file_name = '"""%s"""' % file
-        scenario = GPS.Project.root().scenario_variables_cmd_line("-X")
-        cmd = 'gprbuild -q %s -f -c -u -gnatcdx -gnatws -gnatGL' % prj
-        cmd += ' ' + file_name
-        if scenario:
-            cmd += ' ' + scenario
-
-        GPS.Console("Messages").write("Generating " + dg + "...\n")
-        proc = GPS.Process(cmd, on_exit=on_exit, remote_server="Build_Server")
-        proc.source_filename = local_file
-        proc.dg = dg
-        proc.line = line
-        proc.for_subprogram = for_subprogram
-        proc.in_external_editor = in_external_editor
-    else:
-        edit_dg(dg, local_file, line, for_subprogram, in_external_editor)
+    ali = os.path.join(
+        objdir, os.path.splitext(os.path.basename(local_file))[0]) + '.ali'
+
+    file_name = '"""%s"""' % file
+    scenario = GPS.Project.root().scenario_variables_cmd_line("-X")
+    cmd = 'gprbuild -q %s -f -c -u -gnatcdx -gnatws -gnatGL' % prj
+    cmd += ' ' + file_name
+    if scenario:
+        cmd += ' ' + scenario
+
+    compiler_artifacts.request(
+        compiler_artifacts.Artifact(
+            dg, context.file(), ali, cmd, on_output=create_dg),
+        lambda dg: edit_dg(
+            dg, local_file, line, for_subprogram, in_external_editor))
 
 #################################
 # Register the contextual menus #
@@ -6,6 +6,7 @@ from collections import MutableMapping as DictMixin
 import types
 import GPS
 import GPS.Browsers
+from gs_utils import profiler
 
 # The autodoc may not have visibility on gi.repository
 try:
@@ -137,6 +138,8 @@ class hook:
     def __call__(self, fn):
         def do_work(hook, *args, **kwargs):
             return fn(*args, **kwargs)
+        do_work = profiler.profiled(
+            "hook " + self.name, do_work, profiler.callback_name(fn))
         do_work.__name__ = fn.__name__   # Reset name for interactive()
         do_work.__doc__ = fn.__doc__
         GPS.Hook(self.name).add(do_work, last=self.last)
@@ -373,6 +376,9 @@ def make_interactive(callback, category="General", filter="", menu="", key="",
                 return None
             return r
 
+    do = profiler.profiled(
+        "action", do, name or profiler.callback_name(callback))
+
     a = Action(name or callback.__name__)
     a.create(do, filter=filter, category=category, description=doc,
              icon=icon, for_learning=for_learning)
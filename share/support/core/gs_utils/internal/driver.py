@@ -13,12 +13,17 @@ from gs_utils.internal.asserts import SUCCESS, FAILURE, NOT_RUN, XFAIL, get_exit
 # Some of the imports here are necessary for some of the tests
 from workflows.promises import hook, timeout, wait_tasks, wait_idle
 
+# The workflows started by run_test_driver. A warm instance of the testsuite
+# (see testsuite/drivers/warm_server.py) stops them when the test exits.
+test_workflows = []
+
 
 def do_exit(timeout):
     """ Force an exit of GPS right now, logging as an error the contents
         of the Messages window. This is useful for capturing more traces
         for stalled tests that are about to get killed by rlimit.
     """
+    timeout.removed = True
     timeout.remove()
     simple_error(GPS.Console("Messages").get_text())
     GPS.exit(force=1)
@@ -53,7 +58,10 @@ def run_test_driver(action_fn):
     """
 
     def workflow():
-        _ = yield hook("gps_started")
+        # In a warm instance of the testsuite (see
+        # testsuite/drivers/warm.py), GS has already started
+        if "GNATSTUDIO_WARM_PORT" not in os.environ:
+            _ = yield hook("gps_started")
         yield timeout(10)
 
         last_result = None
@@ -72,6 +80,8 @@ def run_test_driver(action_fn):
                    traceback.format_exc()))
 
         finally:
+            if not getattr(exit_timeout, "removed", False):
+                exit_timeout.remove()
             if "GPS_PREVENT_EXIT" not in os.environ:
                 if last_result in (SUCCESS, FAILURE, NOT_RUN, XFAIL):
                     status = last_result
@@ -92,11 +102,11 @@ def run_test_driver(action_fn):
     # Exit GPS 10 seconds before the rlimit expires. If the rlimit
     # is not set, default to waiting 130 seconds.
     timeout_seconds = int(os.environ.get('GPS_RLIMIT_SECONDS', '130')) - 10
-    GPS.Timeout(timeout_seconds * 1000, do_exit)
+    exit_timeout = GPS.Timeout(timeout_seconds * 1000, do_exit)
 
     # Run the workflow
 
-    driver(workflow())
+    test_workflows.append(driver(workflow()))
 
 
 def editor_contextual(editor, name):
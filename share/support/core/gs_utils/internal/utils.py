@@ -195,6 +195,14 @@ def wait_for_mdi_child(name, step=500, n=10):
 class TimeoutExceeded(Exception):
     pass
 
+
+UI_HOOKS = workflows.promises.TASK_HOOKS + (
+    "buffer_edited", "location_changed", "mdi_child_selected",
+    "compilation_finished", "xref_updated", "project_view_changed",
+    "language_server_response_processed")
+# The hooks after which the predicate of wait_until_true is evaluated again
+
+
 @workflows.run_as_workflow
 def wait_until_true(test_func, *args, **kwargs):
     """
@@ -206,24 +214,22 @@ def wait_until_true(test_func, *args, **kwargs):
         wait_until_true(lambda:<test>, timeout=X),
 
     wait until X milliseconds at most; if the timeout is exceeded,
-    raise TimeoutExceeded.
+    raise TimeoutExceeded. Otherwise, give up silently after 15 seconds.
+
+    test_func is evaluated again after each of the UI_HOOKS, or after the
+    hooks given by "hooks" in the kwargs, and at least every 500ms.
     """
-    k = 0
-    n = 30
-    increment = 500
-    total_waited = 0
-    timeout = None
-    if "timeout" in kwargs:
-        timeout = kwargs["timeout"]
-        del(kwargs["timeout"])
-
-    while not test_func(*args, **kwargs) and k < n:
-        # Check for the timeout
-        if timeout is not None and total_waited > timeout:
-            raise TimeoutExceeded
-        yield workflows.promises.timeout(increment)
-        total_waited += increment
-        k += 1
+    timeout = kwargs.pop("timeout", None)
+    hooks = kwargs.pop("hooks", UI_HOOKS)
+
+    success = yield workflows.promises.wait_until(
+        lambda: test_func(*args, **kwargs),
+        hooks=hooks,
+        fallback=500,
+        max_wait=timeout if timeout is not None else 15000)
+
+    if not success and timeout is not None:
+        raise TimeoutExceeded
 
 
 @workflows.run_as_workflow
@@ -263,15 +269,15 @@ def wait_until_not_busy(debugger, t=100):
 
 
 def wait_for_entities(cb, *args, **kwargs):
-    """Execute cb when all entities have finished loading.
+    """Execute cb when the cross-reference database is up to date and all
+       entities have finished loading.
        This function is not blocking"""
 
-    def on_timeout(timeout):
-        if GPS.Command.list() == []:
-            timeout.remove()
-            cb(*args, **kwargs)
-
-    GPS.Timeout(200, on_timeout)
+    import cross_references
+    cross_references.r.wait_up_to_date().then(
+        lambda _: workflows.promises.wait_until(
+            lambda: GPS.Command.list() == [], fallback=200)).then(
+        lambda _: cb(*args, **kwargs))
 
 
 def wait_for_tasks(cb, *args, **kwargs):
@@ -280,17 +286,16 @@ def wait_for_tasks(cb, *args, **kwargs):
     def internal_on_idle():
         cb(*args, **kwargs)
 
-    def internal_wait_until_no_tasks(timeout):
-        if GPS.Task.list() == []:
-            timeout.remove()
-
-            # Tasks can update locations view, so wait until locations view
-            # has completed its operations also.
+    def internal_on_no_tasks(_):
+        # Tasks can update locations view, so wait until locations view
+        # has completed its operations also.
 
-            process_all_events()
-            GLib.idle_add(internal_on_idle)
+        process_all_events()
+        GLib.idle_add(internal_on_idle)
 
-    GPS.Timeout(400, internal_wait_until_no_tasks)
+    workflows.promises.wait_until(
+        lambda: GPS.Task.list() == [], fallback=400).then(
+        internal_on_no_tasks)
 
 
 def wait_for_idle(cb, *args, **kwargs):
@@ -313,15 +318,21 @@ def wait_outline(filename):
         name = file.base_name()
 
 
-def record_time(t):
+def record_time(t, name=None):
     """ Record the time t in the time.out file.
         t should be a float representing the number of seconds we want to
         record.
+        A test can record several measures by naming them: they are then
+        appended to the file, one per line. This file is read by the perf
+        tests driver (see testsuite/drivers/perf.py).
     """
 
-    f = open('time.out', 'w')
-    f.write(str(t))
-    f.close()
+    if name is None:
+        with open('time.out', 'w') as f:
+            f.write(str(t))
+    else:
+        with open('time.out', 'a') as f:
+            f.write("%s %s\n" % (name, t))
 
 
 def recompute_xref():
@@ -0,0 +1,180 @@
+"""
+A profiler for the Python callbacks run by GNAT Studio: hooks, actions,
+timeouts and the steps of workflows.
+
+It is only active when the PYTHON.PROFILER trace is activated, for instance
+with --traceon=PYTHON.PROFILER on the command line. In this case, the
+callbacks registered through gs_utils.hook, gs_utils.interactive,
+gs_utils.make_interactive, modules.Module, workflows.driver and GPS.Timeout
+are instrumented:
+
+- the number of calls and the wall time spent in each callback are
+  recorded, and can be displayed with the action
+  "profiler: show statistics".
+
+- each callback that runs longer than the frame budget (see the preference
+  Plugins/profiler/frame_budget) is logged in the PYTHON.PROFILER trace,
+  since it blocks the user interface.
+
+- the time spent in each stack of nested callbacks is recorded, and saved
+  with the action "profiler: save profile" (and when GNAT Studio exits) in
+  the "folded" format used by flame graph tools (flamegraph.pl, speedscope):
+
+      hook file_saved:on_save;action format file:do 12345
+
+  where the last number is the time in microseconds spent in the callback
+  itself, excluding the callbacks it called.
+"""
+
+import GPS
+import os
+import time
+
+logger = GPS.Logger("PYTHON.PROFILER")
+
+active = logger.active
+# Whether the callbacks should be instrumented
+
+_stats = {}
+# The statistics for each callback, indexed by (kind, name). The values are
+# lists [calls, total time, max time, calls over the frame budget]
+
+_folded = {}
+# The time spent in each stack of callbacks, excluding the time spent in
+# the nested callbacks, indexed by the ";"-separated stack
+
+_stack = []
+# The callbacks being executed: lists [label, start time, time spent in
+# nested callbacks]
+
+_budget = 0.016
+# The frame budget, in seconds
+
+
+def callback_name(fn):
+    name = getattr(fn, "__qualname__", None) or getattr(
+        fn, "__name__", None) or repr(fn)
+    module = getattr(fn, "__module__", None)
+    return "%s.%s" % (module, name) if module else name
+
+
+def _enter(kind, name):
+    _stack.append(["%s %s" % (kind, name), time.time(), 0.0])
+
+
+def _leave(kind, name):
+    label, start, nested = _stack.pop()
+    elapsed = time.time() - start
+
+    s = _stats.get((kind, name))
+    if s is None:
+        s = _stats[(kind, name)] = [0, 0.0, 0.0, 0]
+    s[0] += 1
+    s[1] += elapsed
+    s[2] = max(s[2], elapsed)
+
+    if elapsed > _budget:
+        s[3] += 1
+        logger.log("%s took %.1fms" % (label, elapsed * 1000))
+
+    key = ";".join([f[0] for f in _stack] + [label])
+    _folded[key] = _folded.get(key, 0.0) + elapsed - nested
+    if _stack:
+        _stack[-1][2] += elapsed
+
+
+def profiled(kind, fn, name=None):
+    """
+    Return fn, instrumented so that its calls are recorded as a callback of
+    the given kind ("hook file_saved", "action", ...) if the profiler is
+    active. Otherwise return fn itself.
+
+    :param str name: the name of the callback, by default the qualified
+       name of fn.
+    """
+    if not active:
+        return fn
+
+    name = name or callback_name(fn)
+
+    def wrapper(*args, **kwargs):
+        _enter(kind, name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _leave(kind, name)
+
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    wrapper.__doc__ = getattr(fn, "__doc__", None)
+    return wrapper
+
+
+def show_statistics():
+    """Display the statistics of the callbacks in the Messages view"""
+    console = GPS.Console("Messages")
+    console.write("%8s %10s %10s %8s  %s\n" % (
+        "calls", "total(ms)", "max(ms)", "> budget", "callback"))
+    for (kind, name), (calls, total, longest, over) in sorted(
+            _stats.items(), key=lambda item: -item[1][1]):
+        console.write("%8d %10.1f %10.1f %8d  %s %s\n" % (
+            calls, total * 1000, longest * 1000, over, kind, name))
+
+
+def save_profile(filename=None):
+    """
+    Save the time spent in each stack of callbacks, in the folded format
+    of flame graphs.
+
+    :param str filename: the file to write, by default
+       python_profile.folded in the GNAT Studio home directory.
+    :return: the name of the file
+    """
+    filename = filename or os.path.join(
+        GPS.get_home_dir(), "python_profile.folded")
+    with open(filename, "w") as f:
+        for key, seconds in sorted(_folded.items()):
+            f.write("%s %d\n" % (key, int(seconds * 1000000)))
+    return filename
+
+
+def _on_preferences_changed(hook, *args):
+    global _budget
+    _budget = _budget_pref.get() / 1000.0
+
+
+def _on_exit(hook):
+    try:
+        save_profile()
+    except IOError:
+        pass
+    return True
+
+
+if active:
+    _budget_pref = GPS.Preference("Plugins/profiler/frame_budget")
+    _budget_pref.create(
+        "Frame budget (ms)", "integer",
+        "The Python callbacks running longer than this are reported by"
+        " the profiler, since they block the user interface.",
+        16, 1, 10000)
+    _on_preferences_changed(None)
+    GPS.Hook("preferences_changed").add(_on_preferences_changed)
+    GPS.Hook("before_exit_action_hook").add(_on_exit)
+
+    GPS.Action("profiler: show statistics").create(
+        show_statistics, category="Profiler",
+        description="Display the time spent in each Python callback.")
+    GPS.Action("profiler: save profile").create(
+        lambda: GPS.Console("Messages").write(
+            "Profile saved in %s\n" % save_profile()),
+        category="Profiler",
+        description="Save the time spent in the Python callbacks, in the"
+                    " format of flame graphs.")
+
+    # The timeouts are created directly through the GPS API
+    _timeout_init = GPS.Timeout.__init__
+
+    def _profiled_timeout_init(self, timeout, action):
+        _timeout_init(self, timeout, profiled("timeout", action))
+
+    GPS.Timeout.__init__ = _profiled_timeout_init
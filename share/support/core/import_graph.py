@@ -0,0 +1,135 @@
+"""Cached graph of the dependencies between source files
+
+This module provides the graph of the with clauses (or #include statements)
+between the sources of the loaded project, as computed from the
+cross-reference database.
+
+The graph is shared by all plugins and filled lazily: the imports of a file
+are only queried once from the database, and the whole graph is discarded
+when the cross-reference database is updated or the project view changes.
+
+    import import_graph
+
+    path = import_graph.graph.shortest_path(
+        GPS.File("main.adb"), GPS.File("pkg.ads"))
+"""
+
+import GPS
+import collections
+import os.path
+from gs_utils import hook
+
+
+class ImportGraph(object):
+
+    def __init__(self):
+        # The files imported by each file, indexed by (file, include_implicit)
+        self.__imports = {}
+
+        # The dependencies of each project on the other projects, indexed by
+        # (project, include_implicit)
+        self.__projects = {}
+
+    def clear(self):
+        """Discard all the cached information"""
+        self.__imports = {}
+        self.__projects = {}
+
+    def imports(self, file, include_implicit=False):
+        """
+        Return the list of files imported by file, ignoring the files from
+        the runtime.
+
+        :param GPS.File file: the importing file
+        :param bool include_implicit: whether to include the implicit
+           dependencies, for instance on the parent packages in Ada.
+        :return: a list of GPS.File
+        """
+        key = (file, include_implicit)
+        result = self.__imports.get(key)
+        if result is None:
+            result = [f for f in file.imports(
+                include_implicit=include_implicit,
+                include_system=False) if f]
+            self.__imports[key] = result
+        return result
+
+    def shortest_path(self, from_file, to_file, include_implicit=False):
+        """
+        Compute one of the shortest chains of dependencies which explains why
+        from_file depends on to_file.
+
+        :param GPS.File from_file: the importing file
+        :param GPS.File to_file: the imported file
+        :param bool include_implicit: see `imports`
+        :return: the list of files from from_file to to_file (both included),
+           or None if from_file does not depend on to_file.
+        """
+        parents = {from_file: None}
+        to_analyze = collections.deque([from_file])
+
+        while to_analyze:
+            file = to_analyze.popleft()
+            if file == to_file:
+                break
+
+            imports = self.imports(file, include_implicit)
+
+            # imports does not list the dependency from body to spec, so we
+            # add it explicitly if from_file is a body.
+            if file == from_file:
+                ext = os.path.splitext(from_file.path)
+                if ext[1] == ".adb" or (
+                        ext[1] == ".ada" and ext[0][-2:] == ".2"):
+                    imports = imports + [from_file.other_file()]
+
+            for f in imports:
+                if f and f not in parents:
+                    parents[f] = file
+                    to_analyze.append(f)
+        else:
+            return None
+
+        path = []
+        file = to_file
+        while file is not None:
+            path.append(file)
+            file = parents[file]
+        path.reverse()
+        return path
+
+    def project_imports(self, project, include_implicit=True):
+        """
+        Compute the projects that project depends on, because one of its
+        sources imports one of their sources.
+
+        :param GPS.Project project: the importing project
+        :param bool include_implicit: see `imports`
+        :return: a dict indexed by GPS.Project. The values are the lists of
+           (source, imported file) tuples that explain the dependency.
+        """
+        key = (project, include_implicit)
+        result = self.__projects.get(key)
+        if result is None:
+            result = {}
+            for s in project.sources(recursive=False):
+                for imp in self.imports(s, include_implicit):
+                    ip = imp.project(default_to_root=False)
+                    if ip and ip != project:
+                        result.setdefault(ip, []).append((s, imp))
+            self.__projects[key] = result
+        return result
+
+
+graph = ImportGraph()
+# The graph shared by all plugins
+
+
+@hook("xref_updated")
+def _on_xref_updated(*args):
+    graph.clear()
+
+
+@hook("project_view_changed")
+def _on_project_view_changed(*args):
+    graph.clear()
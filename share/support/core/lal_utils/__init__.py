@@ -1,8 +1,84 @@
 import GPS
+import bisect
 import ctypes
 import libadalang as lal
 
 
+class SlocIndex(object):
+    """An index of the nodes of an analysis unit by source location.
+
+    It is built with one traversal of the tree, and then answers lookups
+    in logarithmic time.
+    """
+
+    def __init__(self, unit):
+        self.root = unit.root
+        self.__starts = []    # the (line, column) where the nodes start
+        self.__nodes = []     # the corresponding nodes
+        self.__by_start = {}  # the nodes starting at (line, column)
+
+        # The nodes are visited in prefix order, so their start locations
+        # are sorted, and a node comes after its parents.
+        for n in self.root.finditer(lambda _: True):
+            start = n.sloc_range.start
+            key = (start.line, start.column)
+            self.__starts.append(key)
+            self.__nodes.append(n)
+            self.__by_start.setdefault(key, []).append(n)
+
+    def starting_at(self, line, column, kind_name=None):
+        """Return the nodes that start at the given location, from the
+        outermost to the innermost, optionally only those of the given kind.
+        """
+        nodes = self.__by_start.get((line, column), [])
+        if kind_name is None:
+            return list(nodes)
+        return [n for n in nodes if n.kind_name == kind_name]
+
+    def innermost(self, line, column, kind_name=None):
+        """Return the innermost node that contains the given location,
+        optionally the innermost of the given kind. Return None if there is
+        no such node.
+        """
+        pos = (line, column)
+        idx = bisect.bisect_right(self.__starts, pos) - 1
+        if idx < 0:
+            return None
+
+        # This is the last node starting before pos: the innermost node
+        # containing pos is either this one or one of its parents.
+        n = self.__nodes[idx]
+        while n is not None:
+            end = n.sloc_range.end
+            if (pos < (end.line, end.column)
+                    and (kind_name is None or n.kind_name == kind_name)):
+                return n
+            n = n.parent
+        return None
+
+
+_indexes = {}
+# The SlocIndex of the units, indexed by file name
+
+
+def index(buf):
+    """Return the SlocIndex for the current contents of the buffer buf"""
+    name = buf.file().name()
+    unit = buf.get_analysis_unit()
+    result = _indexes.get(name)
+    if result is None or result.root != unit.root:
+        result = _indexes[name] = SlocIndex(unit)
+    return result
+
+
+def _on_buffer_changed(hook, file, *args):
+    _indexes.pop(file.name(), None)
+
+
+GPS.Hook("buffer_edited").add(_on_buffer_changed)
+GPS.Hook("file_closed").add(_on_buffer_changed)
+
+
 def node(file, line, column, kind_name):
     """Return the node at the given coordinates and with the given kind.
 
@@ -12,10 +88,21 @@ def node(file, line, column, kind_name):
     buf = GPS.EditorBuffer.get(file, open=False)
     if not buf:
         return None
-    unit = buf.get_analysis_unit()
-    return unit.root.find(lambda x: x.sloc_range.start.line == line and
-                          x.sloc_range.start.column == column and
-                          x.kind_name == kind_name)
+    nodes = index(buf).starting_at(line, column, kind_name)
+    return nodes[0] if nodes else None
+
+
+def node_at(file, line, column, kind_name=None):
+    """Return the innermost node that contains the given coordinates,
+    optionally the innermost one of the given kind.
+
+    If the buffer for this file is not open, or there is no such node,
+    return None.
+    """
+    buf = GPS.EditorBuffer.get(file, open=False)
+    if not buf:
+        return None
+    return index(buf).innermost(line, column, kind_name)
 
 
 def get_enclosing_subprogram(node):
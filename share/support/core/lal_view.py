@@ -4,6 +4,7 @@
 import GPS
 import os
 import libadalang
+import lal_utils
 from modules import Module
 from gi.repository import Gtk, Gdk, GLib, Pango
 from gs_utils import make_interactive
@@ -14,6 +15,11 @@ COL_START_LINE = 2
 COL_START_COLUMN = 3
 COL_END_LINE = 4
 COL_END_COLUMN = 5
+COL_NODE = 6
+
+REFRESH_DELAY = 300
+# How long to wait after the last modification of the buffer before
+# refreshing the view, in milliseconds
 
 
 class LAL_View_Widget():
@@ -24,18 +30,19 @@ class LAL_View_Widget():
 
         self.compact_mode = True
         # The view has a compact mode (the default) and a full tree mode.
-        # In full tree mode, the whole tree is displayed and refreshed when
-        # the buffer is modified. In compact mode, The tree is refreshed
-        # everytime the cursor location changes, and only shows the current
-        # tree path.
+        # In full tree mode, the whole tree can be browsed: the children of
+        # the nodes are only added to the model when their row is expanded.
+        # In compact mode, the view only shows the current tree path, and
+        # it is updated everytime the cursor location changes.
 
         # A label to push diagnostics messages and token info
         self.message_label = Gtk.Label()
         self.message_label.set_halign(Gtk.Align.START)
         self.message_label.set_ellipsize(Pango.EllipsizeMode.END)
 
-        # The model: see COL_* constants above
-        self.store = Gtk.TreeStore(str, Gdk.RGBA, int, int, int, int)
+        # The model: see COL_* constants above. The rows whose COL_NODE is
+        # None are placeholders for children that have not been added yet.
+        self.store = Gtk.TreeStore(str, Gdk.RGBA, int, int, int, int, object)
 
         # Initialize the tree view
         self.view = Gtk.TreeView(self.store)
@@ -47,6 +54,7 @@ class LAL_View_Widget():
         self.node_col.add_attribute(cell, "foreground-rgba", COL_FOREGROUND)
         self.view.append_column(self.node_col)
         self.view.connect("button_press_event", self._on_view_button_press)
+        self.view.connect("test-expand-row", self._on_test_expand_row)
 
         full_mode_toggle = Gtk.CheckButton("full tree (slow)")
         full_mode_toggle.set_name("lal_view full toggle")
@@ -80,6 +88,9 @@ class LAL_View_Widget():
         # The list of iters that are currently highlighted
         self.highlighted_iters = []
 
+        # In compact mode, the (node, iter) for the current tree path
+        self.compact_path = []
+
         # The colors to highlight the tree with
         self.default_fg = Gdk.RGBA()
         self.highlight_fg = Gdk.RGBA()
@@ -162,73 +173,102 @@ class LAL_View_Widget():
             self.show_current_location(self.line, self.column)
 
     def _add_node(self, parent, node):
-        """Add a node as child of parent. parent can be None"""
-        if not node:
-            return
-
+        """Add a row for node as child of parent, which can be None. Its
+           children are only added when the row is expanded.
+        """
         start_line = node.sloc_range.start.line
         start_column = node.sloc_range.start.column
         end_line = node.sloc_range.end.line
         end_column = node.sloc_range.end.column
 
-        if not self.compact_mode or (
-            (start_line, start_column) <=
-                (self.line, self.column) <=
-                (end_line, end_column)):
-
-            it = self.store.append(parent)
-            text = "<b>{}</b>{}".format(
-                # Uncomment this for a representation useful for debug:
-                # GLib.markup_escape_text(repr(node)),
-                node.kind_name,
-                " {}".format(GLib.markup_escape_text(node.text))
-                if start_line == end_line else "")
-
-            self.store[it] = [
-                text,
-                self.default_fg,
-                start_line,
-                start_column,
-                end_line,
-                end_column,
-            ]
-
-            for n in node.children:
-                self._add_node(it, n)
-
-    def _traverse_and_highlight(self, it, line, column):
-        """Traverse the subtree starting at iter it, and highlight the
-           nodes that encompass the location at line/column.
-
-           Return the deepest iter found that matches.
+        it = self.store.append(parent)
+        text = "<b>{}</b>{}".format(
+            # Uncomment this for a representation useful for debug:
+            # GLib.markup_escape_text(repr(node)),
+            node.kind_name,
+            " {}".format(GLib.markup_escape_text(node.text))
+            if start_line == end_line else "")
+
+        self.store[it] = [
+            text,
+            self.default_fg,
+            start_line,
+            start_column,
+            end_line,
+            end_column,
+            node,
+        ]
+
+        if not self.compact_mode and any(node.children):
+            self.store.append(it, ["", self.default_fg, 0, 0, 0, 0, None])
+
+        return it
+
+    def _add_children(self, it):
+        """Replace the placeholder below it, if any, with the rows for the
+           children of its node.
         """
-        lowest_found = None
         child = self.store.iter_children(it)
-        while child:
-            row = self.store[child]
+        if child is None or self.store[child][COL_NODE] is not None:
+            return
 
-            if row[COL_START_LINE] > line:
-                # We are past the point where the nodes will match the
-                # location: we can stop traversing.
-                return lowest_found
+        self.store.remove(child)
+        for n in self.store[it][COL_NODE].children:
+            if n:
+                self._add_node(it, n)
 
-            if ((row[COL_START_LINE], row[COL_START_COLUMN]) <=
-                (line, column) <=
-                    (row[COL_END_LINE], row[COL_END_COLUMN])):
+    def _on_test_expand_row(self, view, it, path):
+        """Add the children of a node when its row is expanded"""
+        self._add_children(it)
+        return False
 
-                # This node encompasses the location: highlight it...
-                lowest_found = child
-                self.highlighted_iters.append(child)
-                row[COL_FOREGROUND] = self.highlight_fg
+    def _current_path(self, line, column):
+        """Return the list of nodes that contain the location, from the
+           root to the innermost.
+        """
+        buf = GPS.EditorBuffer.get(self.file, open=False)
+        if not buf:
+            return []
+        node = lal_utils.index(buf).innermost(line, column)
+        return list(reversed(node.parent_chain)) if node else []
 
-                # ... and look below it for more
-                below = self._traverse_and_highlight(child, line, column)
-                if below:
-                    lowest_found = below
+    def _show_compact_path(self, nodes):
+        """In compact mode, update the tree to show the nodes. Only the rows
+           that differ from the previous path are replaced.
+        """
+        common = 0
+        while (common < len(nodes)
+               and common < len(self.compact_path)
+               and self.compact_path[common][0] == nodes[common]):
+            common += 1
+
+        if common < len(self.compact_path):
+            # This also removes the rows below it
+            self.store.remove(self.compact_path[common][1])
+        del self.compact_path[common:]
+
+        parent = self.compact_path[-1][1] if self.compact_path else None
+        for n in nodes[common:]:
+            parent = self._add_node(parent, n)
+            self.compact_path.append((n, parent))
 
-            child = self.store.iter_next(child)
+        self.view.expand_all()
 
-        return lowest_found
+    def _find_rows(self, nodes):
+        """In full mode, return the iters for the nodes, which form a tree
+           path starting at the root. The rows are added as needed.
+        """
+        result = []
+        it = self.store.get_iter_first()
+        for n in nodes:
+            while it is not None and self.store[it][COL_NODE] != n:
+                it = self.store.iter_next(it)
+            if it is None:
+                break
+            result.append(it)
+            self._add_children(it)
+            it = self.store.iter_children(it)
+        return result
 
     def show_current_location(self, line, column):
         """Highlight the given location in the tree and scroll to it"""
@@ -239,23 +279,25 @@ class LAL_View_Widget():
         self.line = line
         self.column = column
 
+        nodes = self._current_path(line, column)
+
         if self.compact_mode:
-            self.store.clear()
-            self._add_node(None, self.unit.root)
-            self.view.expand_all()
+            self._show_compact_path(nodes)
         else:
             # Clear all previous highlighting
             for j in self.highlighted_iters:
                 self.store[j][COL_FOREGROUND] = self.default_fg
-            self.highlighted_iters = []
 
-            lowest_found = self._traverse_and_highlight(None, line, column)
+            self.highlighted_iters = self._find_rows(nodes)
+            for j in self.highlighted_iters:
+                self.store[j][COL_FOREGROUND] = self.highlight_fg
 
-            # If we have finished iterating, scroll to the lowest found
-            if lowest_found:
+            # Show and scroll to the innermost node
+            if self.highlighted_iters:
+                path = self.store.get_path(self.highlighted_iters[-1])
+                self.view.expand_to_path(path)
                 self.view.scroll_to_cell(
-                    self.store.get_path(lowest_found),
-                    self.node_col, True, 0.5, 0.5)
+                    path, self.node_col, True, 0.5, 0.5)
 
         # Display the current token in the label
         self.token = self.unit.lookup_token(libadalang.Sloc(line, column))
@@ -277,6 +319,7 @@ class LAL_View_Widget():
         self.view.set_model(None)
         self.store.clear()
         self.highlighted_iters = []
+        self.compact_path = []
 
         self.file = buf.file()
         if not self.file.language().lower() == "ada":
@@ -301,15 +344,14 @@ class LAL_View_Widget():
                 os.path.basename(buf.file().name())))
 
         if self.compact_mode:
-            # In compact mode, the view is regenerated when we change
-            # locations
+            # In compact mode, the view is updated when we change locations
             pass
         else:
-            # In full mode, display the whole tree now
+            # In full mode, display the root now: the other nodes are added
+            # when their parent is expanded.
             self._add_node(None, unit.root)
 
         self.view.set_model(self.store)
-        self.view.expand_all()
 
 
 class LAL_View(Module):
@@ -320,6 +362,7 @@ class LAL_View(Module):
 
     def __init__(self):
         self.widget = None
+        self.refresh_timeout = None
 
     def setup(self):
         # Create an "open Libadalang" action
@@ -343,15 +386,28 @@ class LAL_View(Module):
             self.widget.show_current_location(line, column)
 
     def buffer_edited(self, file):
+        # Wait until the user stops typing to refresh the view
+        if self.widget:
+            if self.refresh_timeout is not None:
+                GLib.source_remove(self.refresh_timeout)
+            self.refresh_timeout = GLib.timeout_add(
+                REFRESH_DELAY, self._on_refresh_timeout)
+
+    def _on_refresh_timeout(self):
+        self.refresh_timeout = None
         if self.widget:
             current_loc = GPS.current_context().location()
             if current_loc:
                 self.widget.refresh()
                 self.widget.show_current_location(
                     current_loc.line(), current_loc.column())
+        return False
 
     def on_view_destroy(self):
         self.widget = None
+        if self.refresh_timeout is not None:
+            GLib.source_remove(self.refresh_timeout)
+            self.refresh_timeout = None
 
     def create_view(self):
         self.widget = LAL_View_Widget()
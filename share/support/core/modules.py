@@ -52,6 +52,7 @@ underscore) as a parameter to :func:`GPS.Browsers.View.create`.
 import GPS
 import traceback
 import sys
+from gs_utils import profiler
 
 try:
     # While building the doc, we might not have access to this module
@@ -267,6 +268,9 @@ class Module(object, metaclass=Module_Metaclass):
                         return pref(hook, *args, **kwargs)
                 else:
                     return pref(*args, **kwargs)
+            internal = profiler.profiled(
+                "hook " + hook_name, internal,
+                "%s.%s" % (self.name(), hook_name))
             setattr(self, "__%s" % hook_name, internal)
             p = getattr(self, "__%s" % hook_name)
             if hook_name == "context_changed":
@@ -33,6 +33,35 @@ TYPE_LABELS = {
 }
 
 
+class JediProposal(CompletionProposal):
+
+    """
+       A completion proposal whose documentation is only computed by jedi
+       when the proposal is selected.
+    """
+
+    def __init__(self, jedi_completion):
+        CompletionProposal.__init__(
+            self,
+            name=jedi_completion.name,
+            label=jedi_completion.name,
+            documentation="",
+            language_category=TYPE_LABELS.get(
+                jedi_completion.type, completion.CAT_UNKNOWN))
+        self.__completion = jedi_completion
+
+    def get_documentation(self):
+        if self.__completion is not None:
+            try:
+                self.documentation = self.__completion.docstring()
+            except Exception:
+                GPS.Logger("JEDI_PARSING").log(
+                    "jedi fails to get the documentation of " + self.name)
+            # The inference state is no longer needed
+            self.__completion = None
+        return self.documentation
+
+
 class PythonResolver(CompletionResolver):
 
     """
@@ -42,7 +71,40 @@ class PythonResolver(CompletionResolver):
     def __init__(self):
         self.__prefix = None
         # additional directories that module search will perform
-        self.source_dirs = set([])
+        self.__source_dirs = set([])
+        # The jedi project, reused between requests until the source dirs
+        # change, so that jedi keeps the modules it has already parsed.
+        self.__project = None
+
+    @property
+    def source_dirs(self):
+        return self.__source_dirs
+
+    @source_dirs.setter
+    def source_dirs(self, dirs):
+        self.__source_dirs = set(dirs)
+        self.__project = None
+
+    def __get_project(self, directory):
+        """
+           Return the jedi project, adding directory to its search path
+        """
+        if directory not in self.__source_dirs:
+            self.__source_dirs.add(directory)
+            self.__project = None
+
+        if self.__project is None:
+            # We can't rely on sys.path and must create a jedi.Project see
+            # extract from the online doc below:
+            #    If project is provided with a sys_path, that is going to be
+            #    used. If environment is provided, its sys.path will be used
+            #    (see Environment.get_sys_path);
+            #    Otherwise sys.path will match that of the default
+            #    environment of Jedi, which typically matches the sys path
+            #    that was used at the time when Jedi was imported.
+            self.__project = jedi.Project(
+                None, sys_path=sys.path + sorted(self.__source_dirs))
+        return self.__project
 
     def get_completions(self, loc):
         """
@@ -60,38 +122,25 @@ class PythonResolver(CompletionResolver):
                 (current_char in ['_', '.'] or current_char.isalnum())):
             return []
 
-        # We can't rely on sys.path and must create a jedi.Project see
-        # extract from the online doc below:
-        #    If project is provided with a sys_path, that is going to be used.
-        #    If environment is provided, its sys.path will be used
-        #    (see Environment.get_sys_path);
-        #    Otherwise sys.path will match that of the default environment of
-        #    Jedi, which typically matches the sys path that was used at the
-        #    time when Jedi was imported.
-
-        self.source_dirs.update([loc.buffer().file().directory()])
-        project = jedi.Project(None,
-                               sys_path=sys.path + list(self.source_dirs))
+        file = loc.buffer().file()
+        project = self.__get_project(file.directory())
 
         try:
             # filter out ^L in source text
             text = loc.buffer().get_chars()
             # text = text.replace('\x0c', ' ')
-            # Feed Jedi API
-            script = jedi.Script(code=text, project=project)
+            # Feed Jedi API. Passing the path lets jedi reuse the previous
+            # parse of the file, and only reparse the modified parts.
+            script = jedi.Script(code=text, path=file.path, project=project)
             completions = script.complete(line=loc.line(),
                                           column=loc.column() - 1)
 
-            # Sort, filter results
-            result = sorted((CompletionProposal(
-                name=i.name,
-                label=i.name,
-                documentation=i.docstring(),
-                language_category=TYPE_LABELS.get(
-                    i.type, completion.CAT_UNKNOWN))
-                for i in completions
-                if i.name.startswith(self.__prefix)),
-                key=lambda d: d.name)
+            # Sort, filter results. The documentation is only computed when
+            # a proposal is selected.
+            result = sorted((JediProposal(i)
+                             for i in completions
+                             if i.name.startswith(self.__prefix)),
+                            key=lambda d: d.name)
         except:
             jedi_log = GPS.Logger("JEDI_PARSING")
             jedi_log.log("jedi fails to parse:" +
@@ -8,24 +8,39 @@ import GPS
 import gs_utils
 import pygps
 import os.path
-import functools
 
 
-def message_compare(a, b):
-    """ Comparison function between two messages: compare messages based on
-        line, then column, then text.
+def in_locations_filter(context):
+    return context.module_name == "Location_View_Record"
+
+
+def locations_export_lines():
+    """
+    Generate the lines of the export of the messages listed in the Locations
+    view, sorted by category, then file, then line, column and text.
+    Only the categories which have messages in the Locations view are
+    listed, and only one of them is held in memory at a time.
     """
-    if a.get_line() < b.get_line():
-        return 1
-    if a.get_column() < b.get_column():
-        return 1
-    if a.get_text() < b.get_text():
-        return 1
-    return 1
+    in_locations = GPS.Message.Flags.IN_LOCATIONS
 
+    for category in sorted(GPS.Locations.list_categories()):
+        if GPS.Message.count(category=category, flags=in_locations) == 0:
+            continue
 
-def in_locations_filter(context):
-    return context.module_name == "Location_View_Record"
+        # Retrieve the fields of each message once, so that sorting
+        # does not call back into GPS.
+        files = {}
+        for m in GPS.Message.list(category=category):
+            if m.get_flags() & in_locations:
+                files.setdefault(m.get_file().path, []).append(
+                    (m.get_line(), m.get_column(), m.get_text()))
+
+        yield category + "\n"
+        for path in sorted(files):
+            yield "    %s\n" % path
+            for line, column, text in sorted(files[path]):
+                yield "        %s:%s %s\n" % (line, column, text)
+        yield "\n"
 
 
 @gs_utils.interactive(
@@ -38,56 +53,11 @@ def export_locations_to_editor():
     Export all messages listed in the Locations view to an editor.
     """
 
-    categories = {}
-
-    # Get all messages
-
-    msgs = GPS.Message.list()
-
-    # Filter them and organize them by category and file
-    for m in msgs:
-        if m.get_flags() & 2:
-            file = m.get_file()
-            category = m.get_category()
-
-            if category in categories:
-                if file in categories[category]:
-                    categories[category][file] += [m]
-                else:
-                    categories[category][file] = [m]
-            else:
-                categories[category] = {file: [m]}
-
-    if not categories:
+    if GPS.Message.count(flags=GPS.Message.Flags.IN_LOCATIONS) == 0:
         GPS.MDI.dialog("The Locations view is empty.")
         return
 
-    # Construct a string that we will write in the editor
-
-    text = ""
-
-    categories_list = [c for c in categories]
-    categories_list.sort()
-
-    for c in categories_list:
-        text += c + "\n"
-
-        files_list = [f for f in categories[c]]
-        files_list.sort()
-
-        for f in files_list:
-            text += "    %s\n" % f.path
-            messages = categories[c][f]
-            messages = sorted(messages,
-                              key=functools.cmp_to_key(message_compare))
-
-            for m in messages:
-                text += "        %s:%s %s\n" % (
-                    m.get_line(),
-                    m.get_column(),
-                    m.get_text())
-
-        text += "\n"
+    text = "".join(locations_export_lines())
 
     # Open an editor
 
@@ -122,13 +92,9 @@ def export_filtered_locations_to_editor():
 def on_filter(context):
     if context.file():
         # Return True if there are any messages in the file context
-        # which have the flag '2' set to 1, meaning that they show up in
-        # the Locations view.
-        for m in GPS.Message.list(file=context.file()):
-            if m.get_flags() & 2:
-                return True
-
-        return False
+        # which show up in the Locations view.
+        return GPS.Message.count(
+            file=context.file(), flags=GPS.Message.Flags.IN_LOCATIONS) > 0
 
 
 def on_label(context):
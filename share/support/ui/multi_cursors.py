@@ -129,25 +129,26 @@ def mc_all_entity_references():
 
     identifier = editor.get_chars(loc_id_start, loc_id_end)
 
-    # Get the references for the current entity using the ALS
-    # in priority. Fallback to the old xref engine when the
+    # Get the references for the current entity in this file using the ALS
+    # in priority: the documentHighlight request only returns the
+    # occurrences in the given document, so we don't need to filter the
+    # references in the whole workspace. Fallback to the old xref engine when
     # the request gets rejected.
 
     als = GPS.LanguageServer.get_by_language_name("Ada")
 
     params = {"textDocument": {"uri": editor.file().uri},
               "position": {"line": loc_id_start.line() - 1,
-                           "character": loc_id_start.column() - 1},
-              "context": {"includeDeclaration": True}}
+                           "character": loc_id_start.column() - 1}}
 
-    result = yield als.request_promise("textDocument/references", params)
+    result = yield als.request_promise("textDocument/documentHighlight",
+                                       params)
     yield hook('language_server_response_processed')
 
     if result.is_valid:
-        locs = [editor.at(lsp_loc['range']['end']['line'] + 1,
-                          lsp_loc['range']['end']['character'])
-                for lsp_loc in result.data
-                if lsp_loc['uri'] == editor.file().uri]
+        locs = [editor.at(highlight['range']['end']['line'] + 1,
+                          highlight['range']['end']['character'])
+                for highlight in result.data or []]
 
     elif result.is_reject:
         try:
@@ -155,8 +156,7 @@ def mc_all_entity_references():
                 identifier, editor.file(),
                 loc_id_start.line(), loc_id_start.column())
             locs = [editor.at(floc.line(), floc.column())
-                    for floc in entity.references()
-                    if floc.file() == editor.file()]
+                    for floc in entity.references(in_file=editor.file())]
         except GPS.Exception:
             return
     else:
@@ -173,30 +173,52 @@ def mc_all_entity_references():
     mark_start = loc_id_start.create_mark()
     mark_end = loc_id_end.forward_char().create_mark(left_gravity=False)
 
-    def apply_overlay(editor, mark_start, mark_end, overlay):
+    def apply_overlay(editor, ref, overlay):
         """
-        Apply overlay overlay between mark_start and mark end
-        if mark_start - mark_end >= 1 char
+        Apply overlay overlay between the marks of ref if they are at least
+        one char apart, and record the length of the highlighted range in ref.
         """
-        lstart = mark_start.location()
-        lend = mark_end.location().forward_char(-1)
+        lstart = ref[0].location()
+        lend = ref[1].location()
+        ref[2] = lend.offset() - lstart.offset()
+        lend = lend.forward_char(-1)
         if lend >= lstart:
             editor.apply_overlay(overlay, lstart, lend)
 
+    def ref_at(offset):
+        """
+        Return the reference whose marks bracket offset, if any. The
+        references in sorted_marks do not overlap, and edits do not change
+        their order, so a binary search only needs the locations of a few
+        marks.
+        """
+        low, high = 0, len(sorted_marks)
+        while low < high:
+            mid = (low + high) // 2
+            if sorted_marks[mid][0].location().offset() <= offset:
+                low = mid + 1
+            else:
+                high = mid
+        if low > 0 and offset <= sorted_marks[low - 1][1].location().offset():
+            return sorted_marks[low - 1]
+        return None
+
     # noinspection PyUnusedLocal
-    def on_edit(hook_name, file_name):
+    def on_edit(hook_name, file_name, *args):
         """
-        Event handler on insert/delete. Mainly ensures that the current field
-        in alias expansion is highlighted (via the aliases overlay)
+        Event handler on insert/delete. Ensures that the references are still
+        highlighted after the edition. Inserted characters do not inherit the
+        overlay, so only the references being edited, which contain one of
+        the cursors, and whose length changed since they were last
+        highlighted need to be highlighted again.
         """
         if editor == GPS.EditorBuffer.get(file_name):
-            editor.remove_overlay(
-                overlay,
-                editor.beginning_of_buffer(),
-                editor.end_of_buffer()
-            )
-            for mark_start, mark_end in marks:
-                apply_overlay(editor, mark_start, mark_end, overlay)
+            for cursor in editor.get_cursors():
+                ref = ref_at(cursor.mark().location().offset())
+                if ref is not None and (
+                        ref[1].location().offset() -
+                        ref[0].location().offset()) != ref[2]:
+                    apply_overlay(editor, ref, overlay)
 
     # noinspection PyUnusedLocal
     def on_move(hook_name, file_name, line, column):
@@ -220,8 +242,10 @@ def mc_all_entity_references():
         GPS.Hook("character_added").remove(on_edit)
         GPS.Hook("location_changed").remove(on_move)
 
-    marks.append((mark_start, mark_end))
-    apply_overlay(editor, mark_start, mark_end, overlay)
+    # Each element is [mark_start, mark_end, length], where length is the
+    # length of the reference when it was last highlighted.
+    marks.append([mark_start, mark_end, None])
+    apply_overlay(editor, marks[-1], overlay)
     cursor_loc_t = loc_tuple(loc)
     word_offset = loc.column() - loc_id_start.column()
 
@@ -234,9 +258,12 @@ def mc_all_entity_references():
             s, e = get_word_bounds(loc)
             ms = s.create_mark()
             me = e.forward_char().create_mark(left_gravity=False)
-            marks.append((ms, me))
-            apply_overlay(editor, ms, me, overlay)
+            marks.append([ms, me, None])
+            apply_overlay(editor, marks[-1], overlay)
             editor.add_cursor(loc)
 
+    # The references, sorted by location
+    sorted_marks = sorted(marks, key=lambda ref: ref[0].location().offset())
+
     GPS.Hook("character_added").add(on_edit)
     GPS.Hook("location_changed").add(on_move)
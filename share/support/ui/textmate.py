@@ -3,6 +3,7 @@
 """
 
 import glob
+import json
 import os
 import plistlib
 import sys
@@ -34,6 +35,14 @@ color_prefs = {
     "entity.name.function":   "current_block",
 }
 
+CACHE_BASE_NAME = "textmate_themes.json"
+# The file, in the GNAT Studio home directory, where the themes computed
+# from the .tmTheme files are saved, so that the files do not need to be
+# parsed again as long as they are not modified.
+
+CACHE_VERSION = 1
+# Change this when the contents of the computed themes change
+
 
 def to_GPS_prefs(d):
     """ Considering a dictionary d representing prefs in the theme plist,
@@ -98,7 +107,14 @@ class TextmateTheme(object):
         self.general = self.o['settings'][0]['settings']
 
     def theme(self):
-        """ Return a dictionary of preferences
+        """ Return the Theme
+        """
+        is_light, d = self.preferences()
+        return Theme(self.name, is_light, d)
+
+    def preferences(self):
+        """ Return a tuple (is_light, d) where d is the dictionary of
+            preferences
         """
         d = {}  # The result dict
 
@@ -201,7 +217,51 @@ class TextmateTheme(object):
             "DEFAULT", transparent,
             e_smart_color)
 
-        return Theme(self.name, is_light, d)
+        return is_light, d
+
+
+def _to_json(value):
+    """ Convert a value of the preferences dictionary to a value that can
+        be serialized in JSON
+    """
+    if isinstance(value, Color):
+        return {"rgba": [value.r, value.g, value.b, value.a]}
+    elif isinstance(value, tuple):
+        return [_to_json(v) for v in value]
+    return value
+
+
+def _from_json(value):
+    """ The reverse of _to_json
+    """
+    if isinstance(value, dict):
+        result = Color(from_hex="#000000")
+        result.r, result.g, result.b, result.a = value["rgba"]
+        return result
+    elif isinstance(value, list):
+        return tuple(_from_json(v) for v in value)
+    return value
+
+
+def _load_cache(filename):
+    """ Return the entries of the cache file, indexed by theme file name
+    """
+    try:
+        with open(filename, 'r') as f:
+            contents = json.load(f)
+        if contents.get("version") == CACHE_VERSION:
+            return contents["themes"]
+    except (IOError, OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def _save_cache(filename, entries):
+    try:
+        with open(filename, 'w') as f:
+            json.dump({"version": CACHE_VERSION, "themes": entries}, f)
+    except (IOError, OSError):
+        pass
 
 
 def textmate_themes():
@@ -218,9 +278,30 @@ def textmate_themes():
     user_themes = glob.glob(os.path.join(
         GPS.get_home_dir(), 'themes', '*.tmTheme'))
 
+    cache_file = os.path.join(GPS.get_home_dir(), CACHE_BASE_NAME)
+    cache = _load_cache(cache_file)
+    entries = {}
+
     for file in default_themes + user_themes:
         try:
-            results.append(TextmateTheme(file).theme())
+            stamp = os.stat(file)
+            entry = cache.get(file)
+            if (entry is None
+                    or entry["mtime"] != stamp.st_mtime
+                    or entry["size"] != stamp.st_size):
+                t = TextmateTheme(file)
+                is_light, d = t.preferences()
+                entry = {"mtime": stamp.st_mtime,
+                         "size": stamp.st_size,
+                         "name": t.name,
+                         "light": is_light,
+                         "preferences": {k: _to_json(v)
+                                         for k, v in d.items()}}
+            entries[file] = entry
+            results.append(Theme(
+                entry["name"], entry["light"],
+                {k: _from_json(v)
+                 for k, v in entry["preferences"].items()}))
         except Exception:
             msg, _, tb = sys.exc_info()
             tb = "\n".join(traceback.format_list(traceback.extract_tb(tb)))
@@ -229,4 +310,7 @@ def textmate_themes():
                 "Exception when parsing theme file '%s':\n%s\n%s\n"
                 % (file, msg, str(tb)))
 
+    if entries != cache:
+        _save_cache(cache_file, entries)
+
     return results
@@ -116,12 +116,18 @@ is executed.
 
 """
 
+import concurrent.futures
 import inspect
+import os
 import sys
+import threading
 import GPS
 import workflows.promises as promises
+import workflows.tracer as tracer
+from gs_utils import profiler
 import traceback
 import types
+from gi.repository import GLib
 
 # A table of all registered workflows
 registered_workflows = {}
@@ -224,21 +230,63 @@ def driver(gen_inst):
     :return: a promise, that will be resolved when the workflow has finished
       executing. This can in general be ignored, since as described above
       `driver` will automatically chain things. In some contexts it might be
-      useful to use this promise though.
+      useful to use this promise though. Its `stop` method aborts the
+      workflow: the generators that have not finished are closed, which runs
+      their `finally` blocks, and the promise is resolved.
     """
 
-    promise = promises.Promise()
+    promise = promises.Promise("workflow")
 
     # Stack of generators, similar to a call stack. The first one is the
     # original generator and the last one is the most recently spawned one.
     gen_stack = [gen_inst]
 
+    # Not empty once the workflow has been stopped
+    stopped = []
+
+    # The trace of this execution, if the tracer is active
+    trace = tracer.start(gen_inst)
+
+    def close_generators():
+        """Close the generators of the workflow, the innermost first."""
+        while gen_stack:
+            try:
+                gen_stack.pop().close()
+            except Exception as e:
+                GPS.Logger("WORKFLOW").log(
+                    "Exception while stopping workflow: %s" % (e, ))
+
+    def stop():
+        """Abort the workflow."""
+        stopped.append(True)
+
+        # A generator cannot be closed while it is executing, for instance
+        # when it is the one calling stop: resume will close it once it
+        # yields.
+        if not any(gen.gi_running for gen in gen_stack):
+            close_generators()
+            promise.resolve()
+
+    promise.stop = stop
+
     def resume(return_val=None):
         """Resume execution for this workflow."""
         el = None
         exc_info = None
 
+        if stopped and not gen_stack:
+            # The promise the workflow was waiting for has been resolved after
+            # the workflow was stopped
+            return
+
+        if trace:
+            trace.resume()
+
         while gen_stack:
+            if stopped:
+                close_generators()
+                break
+
             gen = gen_stack[-1]
             try:
                 if exc_info is not None:
@@ -291,9 +339,18 @@ def driver(gen_inst):
                 gen_stack.append(el)
                 el = None
             elif isinstance(el, promises.Promise):
+                if stopped:
+                    # Stopped while it was executing: close it now rather
+                    # than when the promise is resolved, which might be much
+                    # later
+                    close_generators()
+                    break
+
                 # If the last generator yielded a promise, schedule to resume
                 # its execution when the promise is ready.
                 # ??? Should we connect to reject to cancel the whole workflow?
+                if trace:
+                    trace.suspend(gen, el)
                 el.then(resume)
                 return
 
@@ -303,6 +360,9 @@ def driver(gen_inst):
 
         # If we reach this point, there's nothing to execute anymore: just log
         # any uncaught exception.
+        if trace:
+            trace.finish(exc_info is not None)
+
         if exc_info is not None:
             message = (
                 'Uncaught exception in workflows:\n'
@@ -318,6 +378,10 @@ def driver(gen_inst):
         else:
             promise.resolve(return_val)
 
+    resume = profiler.profiled(
+        "workflow", resume,
+        getattr(gen_inst, "__qualname__", None) or repr(gen_inst))
+
     # We just created a new execution state (gen_stack), so technically we are
     # resuming it below.
     resume()
@@ -499,6 +563,321 @@ def task_workflow(task_name, workflow, active=False, **kwargs):
     return t
 
 
+def _task_is_running(task):
+    """Whether task has neither completed nor been interrupted"""
+    return task in GPS.Task.list()
+
+
+class pool(object):
+    """
+    Run jobs concurrently, with at most `k` of them in flight at any time.
+    A job is a function that returns a promise, a generator (which is run
+    with the driver), or directly its result::
+
+        def check(file):
+            return ProcessWrapper(["check", file.path]).wait_until_terminate()
+
+        def check_all(task, files):
+            p = workflows.pool(4, task=task)
+            for f in files:
+                p.submit(check, f)
+            p.close()
+            yield p.results.subscribe(on_result)
+
+    The stream `results` emits a tuple (index, result) each time a job
+    completes, in the order of completion, where index is the order in
+    which the job was submitted. Once `close` has been called and all jobs
+    have completed, it is resolved with the list of the results, in the
+    order of submission.
+
+    When `task` is given, its progress is updated as jobs complete, and
+    no new job is started once it has been interrupted: `results` is then
+    rejected. The jobs already running are not stopped, but their results
+    are ignored.
+    """
+
+    def __init__(self, k, task=None):
+        """
+        :param int k: the maximal number of jobs running at the same time
+        :param GPS.Task task: the task that owns the jobs
+        """
+        self.k = max(1, k)
+        self.task = task
+        self.results = promises.Stream("pool")
+        self.__pending = []    # the jobs waiting for a free slot
+        self.__values = []     # the results, in the order of submission
+        self.__running = 0
+        self.__done = 0
+        self.__closed = False
+        self.__finished = False
+        self.__starting = False
+
+        if task is not None:
+            GPS.Hook("task_finished").add(self.__on_task_finished)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule the job fn(*args, **kwargs).
+
+        :return: a promise resolved with the result of the job, or rejected
+           if it raises an exception or its promise is rejected.
+        """
+        p = promises.Promise("pool")
+        if self.__finished:
+            p.reject("pool is closed")
+            return p
+
+        self.__pending.append((len(self.__values), p, fn, args, kwargs))
+        self.__values.append(None)
+        self.__start_jobs()
+        return p
+
+    def close(self):
+        """
+        Indicate that no more jobs will be submitted, so that `results` is
+        resolved once all the jobs have completed.
+        """
+        self.__closed = True
+        self.__check_completed()
+
+    def cancel(self, reason="cancelled"):
+        """Do not start the pending jobs, and reject `results`"""
+        if self.__finished:
+            return
+        self.__finished = True
+        for _, p, _, _, _ in self.__pending:
+            p.reject(reason)
+        self.__pending = []
+        self.__disconnect()
+        self.results.reject(reason)
+
+    def __disconnect(self):
+        if self.task is not None:
+            GPS.Hook("task_finished").remove(self.__on_task_finished)
+
+    def __on_task_finished(self, hook):
+        # The task is only removed from the list of tasks after this hook
+        GLib.idle_add(self.__check_task)
+
+    def __check_task(self):
+        if not self.__finished and not _task_is_running(self.task):
+            self.cancel("interrupted")
+        return False
+
+    def __start_jobs(self):
+        # Jobs that complete immediately call this function again: let the
+        # outer loop start the next jobs instead.
+        if self.__starting:
+            return
+        self.__starting = True
+        try:
+            while (not self.__finished
+                   and self.__pending
+                   and self.__running < self.k):
+                if self.task is not None and not _task_is_running(self.task):
+                    self.cancel("interrupted")
+                    return
+
+                index, p, fn, args, kwargs = self.__pending.pop(0)
+                self.__running += 1
+                try:
+                    r = fn(*args, **kwargs)
+                    if isinstance(r, types.GeneratorType):
+                        r = driver(r)
+                except Exception as e:
+                    GPS.Logger("WORKFLOW").log(
+                        "Unexpected exception in job: %s\n%s" %
+                        (e, traceback.format_exc()))
+                    self.__job_done(index, p, None, str(e))
+                    continue
+
+                if isinstance(r, promises.Promise):
+                    r.then(
+                        lambda v, index=index, p=p:
+                            self.__job_done(index, p, v),
+                        lambda reason, index=index, p=p:
+                            self.__job_done(index, p, None, reason))
+                else:
+                    self.__job_done(index, p, r)
+        finally:
+            self.__starting = False
+
+    def __job_done(self, index, p, value, failure=None):
+        self.__running -= 1
+        self.__done += 1
+        if self.__finished:
+            return
+
+        self.__values[index] = value
+        if self.task is not None:
+            self.task.set_progress(self.__done, len(self.__values))
+
+        if failure is None:
+            p.resolve(value)
+            self.results.emit((index, value))
+        else:
+            p.reject(failure)
+
+        self.__start_jobs()
+        self.__check_completed()
+
+    def __check_completed(self):
+        if (not self.__finished
+                and self.__closed
+                and self.__done == len(self.__values)):
+            self.__finished = True
+            self.__disconnect()
+            self.results.resolve(self.__values)
+
+
+def map_concurrent(fn, items, k, task=None):
+    """
+    Run fn on each of the items, with at most `k` of them in flight at any
+    time. See `pool` for the kind of functions that can be used as fn::
+
+        def check_all(task, files):
+            yield workflows.map_concurrent(
+                check, files, 4, task=task).subscribe(on_result)
+
+    :return: the stream of the results, see `pool.results`. The jobs are
+       only started when GNAT Studio is idle, so that the caller has a
+       chance to subscribe to the stream first.
+    """
+    p = pool(k, task=task)
+
+    def start():
+        for item in items:
+            p.submit(fn, item)
+        p.close()
+        return False
+
+    GLib.idle_add(start)
+    return p.results
+
+
+# The pool of threads used by run_in_executor, created on first use
+_executor = None
+
+EXECUTOR_THREADS = min(4, os.cpu_count() or 1)
+
+
+def _is_gps_api(fn):
+    """Whether fn, a builtin function or method, is part of the GPS API"""
+    if getattr(fn, "__module__", None) == "GPS":
+        return True
+    owner = getattr(fn, "__self__", None)
+    if owner is None:
+        return False
+    if not isinstance(owner, type):
+        owner = type(owner)
+    return (getattr(owner, "__module__", None) or "").startswith("GPS")
+
+
+_executor_state = threading.local()
+# In the executor threads, the first call to the GPS API done by the
+# current function, if any
+
+GUARD = GPS.Logger("WORKFLOW.EXECUTOR_GUARD")
+# When active, run_in_executor checks that the functions do not call the GPS
+# API. This is a debugging aid: the check slows down the functions a lot.
+
+
+def _guard(frame, event, arg):
+    """
+    A profile function, set in the executor threads when GUARD is active,
+    that forbids calls to the GPS API: it is not thread-safe and must only
+    be called from the main loop.
+    Python removes the profile function when it raises an exception, so
+    the calls done after a caught exception are not checked, but the first
+    one has been recorded.
+    """
+    if event == "c_call" and _is_gps_api(arg):
+        message = "%s cannot be called from run_in_executor" % (
+            getattr(arg, "__qualname__", arg), )
+        if _executor_state.violation is None:
+            _executor_state.violation = message
+        raise RuntimeError(message)
+
+
+def _run_guarded(fn, args, kwargs):
+    """
+    Run fn in an executor thread. If fn called the GPS API, raise a
+    RuntimeError even if fn caught the one raised by the call.
+    """
+    _executor_state.violation = None
+    sys.setprofile(_guard)
+    try:
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            if _executor_state.violation is not None:
+                raise RuntimeError(_executor_state.violation)
+            raise
+        if _executor_state.violation is not None:
+            raise RuntimeError(_executor_state.violation)
+        return result
+    finally:
+        sys.setprofile(None)
+
+
+def _on_exit(hook):
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    return True
+
+
+def run_in_executor(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) in a background thread, so that long
+    computations in pure Python (parsing a big file, computing a diff...)
+    do not block the user interface::
+
+        @run_as_workflow
+        def load(filename):
+            with open(filename) as f:
+                data = yield run_in_executor(json.load, f)
+            ... use data, back in the main loop
+
+    fn must not use the GPS API, nor Gtk, which can only be used from the
+    main loop. When the WORKFLOW.EXECUTOR_GUARD trace is active, calls to
+    the GPS API raise a RuntimeError in fn, and the promise is rejected.
+
+    :return: a promise, resolved in the main loop with the result of fn,
+       or rejected with the error message if fn raises an exception.
+    """
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=EXECUTOR_THREADS,
+            thread_name_prefix="gs-executor")
+        GPS.Hook("before_exit_action_hook").add(_on_exit)
+
+    p = promises.Promise("executor")
+
+    def on_result(future):
+        # Called in the main loop
+        try:
+            p.resolve(future.result())
+        except Exception as e:
+            GPS.Logger("WORKFLOW").log(
+                "Unexpected exception in run_in_executor: %s\n%s" % (
+                    e, "".join(traceback.format_exception(
+                        type(e), e, e.__traceback__))))
+            p.reject(str(e))
+        return False
+
+    def on_done(future):
+        # Called in the executor thread: go back to the main loop
+        GLib.idle_add(on_result, future)
+
+    if GUARD.active:
+        future = _executor.submit(_run_guarded, fn, args, kwargs)
+    else:
+        future = _executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(on_done)
+    return p
+
+
 def create_target_from_workflow(target_name, workflow_name, workflow,
                                 icon_name="gps-print-symbolic",
                                 in_toolbar=True,
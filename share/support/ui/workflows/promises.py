@@ -67,7 +67,12 @@ class Promise(object):
     RESOLVED = 0
     REJECTED = 1
 
-    def __init__(self):
+    def __init__(self, kind="promise"):
+        """
+        :param str kind: what the promise is waiting for ("process",
+           "timeout", "hook", ...), as displayed by the workflow tracer.
+        """
+        self.kind = kind
         self.__success = []  # Called when the promise is resolved
         self.__failure = []  # Called when the promise is rejected
         self.__result = None   # The result of the promise
@@ -171,8 +176,8 @@ class Stream(Promise):
     compatible with the workflow framework.
     """
 
-    def __init__(self):
-        super(Stream, self).__init__()
+    def __init__(self, kind="stream"):
+        super(Stream, self).__init__(kind)
         self._onnext = []
 
     def subscribe(self, onnext=None, onerror=None, oncompleted=None):
@@ -281,7 +286,7 @@ def join(*args):
 
     :param List(Promise) *args: promises to wait on
     """
-    p = Promise()
+    p = Promise("join")
 
     class _Resolver:
         _count = 0
@@ -319,7 +324,7 @@ def timeout(msecs):
     busy doing anything else, rather than wait an explicit delay, which might
     depend on the CPU load for instance.
     """
-    p = Promise()
+    p = Promise("timeout")
 
     def timeout_handler():
         p.resolve()
@@ -334,7 +339,7 @@ def wait_idle():
     This primitive allows the writer of a workflow to wait until all event have
     been handled, and resume execution of the workflow in an idle callback
     """
-    p = Promise()
+    p = Promise("idle")
     process_all_events()
     GLib.idle_add(lambda: p.resolve())
     return p
@@ -344,6 +349,80 @@ known_tasks = ["debugger output monitor 1", "refreshing Runtime menu"]
 # List of background tasks that are known to be running in the background
 
 
+TASK_HOOKS = ("task_started", "task_finished")
+# The hooks run when the list of background tasks changes
+
+
+def wait_until(predicate, hooks=TASK_HOOKS, fallback=2000, max_wait=None):
+    """
+    This primitive allows the user to delay the execution of the rest of a
+    workflow until predicate returns True. For example:
+
+        yield wait_until(lambda: not GPS.Task.list())
+
+    predicate is evaluated once the workflow gives control back to GPS, then
+    each time one of the hooks is run (in an idle callback, so that all the
+    handlers of the hook have been executed). It is also evaluated every
+    fallback milliseconds, in case the state it depends on is changed
+    without running any of the hooks.
+
+    The promise is resolved with True as soon as predicate returns True,
+    or with False if max_wait milliseconds (if specified) have elapsed.
+    """
+
+    p = Promise("wait_until")
+    state = {"idle": None, "done": False}
+    start = time.time()
+
+    def finish(result):
+        # Only once, even if called again from a nested check
+        if state["done"]:
+            return
+        state["done"] = True
+        for name in hooks:
+            GPS.Hook(name).remove(on_hook)
+        GLib.source_remove(fallback_id)
+        if state["idle"] is not None:
+            GLib.source_remove(state["idle"])
+            state["idle"] = None
+        p.resolve(result)
+
+    def check():
+        if state["done"]:
+            return False
+        ok = predicate()
+
+        # predicate might process the pending events, and thus run check
+        # recursively, which might already have resolved the promise
+        if state["done"]:
+            return False
+
+        if ok:
+            finish(True)
+        elif max_wait is not None and \
+                (time.time() - start) * 1000 >= max_wait:
+            finish(False)
+        return False
+
+    def on_idle():
+        state["idle"] = None
+        return check()
+
+    def on_hook(hook, *args):
+        if state["idle"] is None and not state["done"]:
+            state["idle"] = GLib.idle_add(on_idle)
+
+    def on_fallback():
+        check()
+        return not state["done"]
+
+    fallback_id = GLib.timeout_add(fallback, on_fallback)
+    for name in hooks:
+        GPS.Hook(name).add(on_hook)
+    on_hook(None)
+    return p
+
+
 def wait_tasks(other_than=None):
     """
     This primitive allows the user to delay the execution of the rest of a
@@ -355,18 +434,15 @@ def wait_tasks(other_than=None):
     than the ones in other_than.
     """
 
-    p = Promise()
     filt = other_than or []
 
-    def timeout_handler():
-        if not [x for x in GPS.Task.list() if x.name() not in filt]:
-            process_all_events()
-            GLib.idle_add(lambda: p.resolve())
+    def no_tasks():
+        if [x for x in GPS.Task.list() if x.name() not in filt]:
             return False
-        return True   # will try again
+        process_all_events()
+        return True
 
-    GLib.timeout_add(200, timeout_handler)
-    return p
+    return wait_until(no_tasks)
 
 
 def wait_specific_tasks(names):
@@ -374,16 +450,8 @@ def wait_specific_tasks(names):
     Allows to delay the execution of the rest of a workflow until given tasks
     are terminated.
     """
-    p = Promise()
-
-    def timeout_handler():
-        if not [x for x in GPS.Task.list() if x.name() in names]:
-            GLib.idle_add(lambda: p.resolve())
-            return False
-        return True   # will try again
-
-    GLib.timeout_add(200, timeout_handler)
-    return p
+    return wait_until(
+        lambda: not [x for x in GPS.Task.list() if x.name() in names])
 
 
 def modal_dialog(action_fn, msecs=300):
@@ -395,7 +463,7 @@ def modal_dialog(action_fn, msecs=300):
         yield modal_dialog(
             300, lambda: GPS.execute_action('open project properties'))
     """
-    p = Promise()
+    p = Promise("dialog")
 
     def __on_timeout():
         p.resolve()
@@ -420,7 +488,7 @@ def idle_modal_dialog(action_fn):
     Similar to `modal_dialog()`, but waits until GPS is finished processing
     events, instead of a specific timeout.
     """
-    p = Promise()
+    p = Promise("dialog")
 
     def __on_idle():
         GLib.idle_add(lambda: p.resolve())
@@ -442,7 +510,7 @@ def hook(hook_name, debounced=False):
     will be stored in the file variable. Result is a list if hook returns
     several values.
     """
-    p = Promise()
+    p = Promise("hook")
 
     def hook_handler(hook, *args):
         GPS.Hook(hook_name).remove(hook_handler)
@@ -470,7 +538,7 @@ def wait_signal(widget, signal_name, *args):
     This will wait until the "response" signal is emitted, and the actual
     Gtk.ResponseType will be returned as a result.
     """
-    p = Promise()
+    p = Promise("signal")
 
     def callback(hook, *args):
         # resolve accepts only one argument, so pass list of args if it longer
@@ -724,7 +792,7 @@ class ProcessWrapper(object):
         else:
             self.__current_pattern = pattern
 
-        p = self.__current_promise = Promise()
+        p = self.__current_promise = Promise("process")
 
         # Can we resolve immediately ?
         self.__check_pattern_and_resolve()
@@ -744,7 +812,7 @@ class ProcessWrapper(object):
 
         :return: a promise
         """
-        p = Promise()
+        p = Promise("process")
 
         s = self.wait_until_match("^.*\n")
         if s is None:
@@ -773,7 +841,7 @@ class ProcessWrapper(object):
                 yield p.stream.subscribe(on_output)
         """
         if self.__stream is None:
-            self.__stream = Stream()
+            self.__stream = Stream("process")
         return self.__stream
 
     @property
@@ -844,7 +912,7 @@ class ProcessWrapper(object):
            non zero status, then print the full output of the process to the
            Messages window.
         """
-        p = Promise()
+        p = Promise("process")
         output = []
 
         def on_terminate(status):
@@ -1063,7 +1131,7 @@ class DebuggerWrapper(object):
            Promise returned for this purpose will be answered with: True/False
         """
 
-        self.__this_promise = Promise()
+        self.__this_promise = Promise("debugger")
         self.__next_cmd = cmd
         self.__output = None
 
@@ -1107,7 +1175,7 @@ class TargetWrapper():
         Promises made here will be answered with: exit status of the build.
         """
 
-        self.__promise = Promise()
+        self.__promise = Promise("target")
         self.__target.execute(main_name=main_name,
                               synchronous=False,
                               file=file,
@@ -0,0 +1,155 @@
+"""
+A tracer for the workflows executed by workflows.driver.
+
+It is only active when the WORKFLOW.TRACE trace is activated, for instance
+with --traceon=WORKFLOW.TRACE on the command line. Each workflow then gets
+a numeric id, and the tracer records the time spent running its Python code
+between two yields, and the time spent waiting for each promise it yields,
+along with the kind of that promise ("process", "timeout", "hook", "join",
+...) and the line of the generator that yielded it.
+
+The traces are saved with the action "workflows: save trace" (and when
+GNAT Studio exits) in the Chrome trace-event format, which can be loaded in
+chrome://tracing, https://ui.perfetto.dev or speedscope. Each workflow is
+displayed as a separate thread, so that the critical path of workflows
+waiting on each other and the idle gaps are visible.
+"""
+
+import GPS
+import collections
+import itertools
+import json
+import os
+import time
+
+logger = GPS.Logger("WORKFLOW.TRACE")
+
+active = logger.active
+# Whether the workflows should be traced
+
+MAX_EVENTS = 200000
+# The number of events kept in memory: the oldest ones are discarded
+
+_events = collections.deque(maxlen=MAX_EVENTS)
+_ids = itertools.count(1)
+_pid = os.getpid()
+
+
+def _now():
+    """The current time, in microseconds as expected by the trace format"""
+    return int(time.time() * 1000000)
+
+
+def _generator_name(gen):
+    return getattr(gen, "__qualname__", None) or getattr(
+        gen, "__name__", None) or repr(gen)
+
+
+def _location(gen):
+    """The current line of the suspended generator gen, as file:line"""
+    frame = getattr(gen, "gi_frame", None)
+    if frame is None:
+        return ""
+    return "%s:%d" % (os.path.basename(frame.f_code.co_filename),
+                      frame.f_lineno)
+
+
+class Trace(object):
+    """The trace of one execution of a workflow"""
+
+    def __init__(self, gen):
+        self.id = next(_ids)
+        self.name = _generator_name(gen)
+        self.start = _now()
+        self.last = self.start   # start of the current running/waiting phase
+        self.waiting = None      # the promise being waited for, if any
+        self.waiting_at = ""     # where the promise was yielded
+        self.running = 0         # total time running Python code
+        self.waited = 0          # total time waiting for promises
+
+        _events.append({"name": "thread_name", "ph": "M", "pid": _pid,
+                        "tid": self.id,
+                        "args": {"name": "%s #%d" % (self.name, self.id)}})
+
+    def _event(self, name, cat, start, end, args=None):
+        _events.append({"name": name, "cat": cat, "ph": "X", "pid": _pid,
+                        "tid": self.id, "ts": start, "dur": end - start,
+                        "args": args or {}})
+
+    def resume(self):
+        """Called when the workflow starts running Python code"""
+        now = _now()
+        if self.waiting is not None:
+            self.waited += now - self.last
+            self._event("wait " + self.waiting, "wait", self.last, now,
+                        {"at": self.waiting_at})
+            self.waiting = None
+        self.last = now
+
+    def suspend(self, gen, promise):
+        """Called when gen, one of the generators of the workflow, yields
+           promise.
+        """
+        now = _now()
+        self.running += now - self.last
+        self._event(_generator_name(gen), "run", self.last, now)
+        self.waiting = getattr(promise, "kind", "promise")
+        self.waiting_at = _location(gen)
+        self.last = now
+
+    def finish(self, failed):
+        """Called when the workflow has finished"""
+        now = _now()
+        self.running += now - self.last
+        self._event(self.name, "run", self.last, now)
+        self._event(self.name, "workflow", self.start, now,
+                    {"running_ms": self.running / 1000.0,
+                     "waiting_ms": self.waited / 1000.0,
+                     "failed": failed})
+        logger.log("workflow %s #%d: %.1fms running, %.1fms waiting%s" % (
+            self.name, self.id, self.running / 1000.0, self.waited / 1000.0,
+            " (failed)" if failed else ""))
+
+
+def start(gen):
+    """
+    Return the Trace for a new execution of the generator gen, or None if
+    the tracer is not active.
+    """
+    if not active:
+        return None
+    return Trace(gen)
+
+
+def save_trace(filename=None):
+    """
+    Save the traces of the workflows in the Chrome trace-event format.
+
+    :param str filename: the file to write, by default
+       workflows_trace.json in the GNAT Studio home directory.
+    :return: the name of the file
+    """
+    filename = filename or os.path.join(
+        GPS.get_home_dir(), "workflows_trace.json")
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": list(_events),
+                   "displayTimeUnit": "ms"}, f)
+    return filename
+
+
+def _on_exit(hook):
+    try:
+        save_trace()
+    except IOError:
+        pass
+    return True
+
+
+if active:
+    GPS.Hook("before_exit_action_hook").add(_on_exit)
+    GPS.Action("workflows: save trace").create(
+        lambda: GPS.Console("Messages").write(
+            "Workflows trace saved in %s\n" % save_trace()),
+        category="Profiler",
+        description="Save the traces of the workflows, in the Chrome"
+                    " trace-event format.")
@@ -136,6 +136,33 @@ class BasicTestDriver(GPSTestDriver):
                 )
         return printed
 
+    def devel_executable(self):
+        """Return the development GS executable if it exists, or None"""
+        base = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+        devel_gs = os.path.join(base, "gnatstudio", "obj", "gnatstudio")
+        if sys.platform == "win32":
+            devel_gs += ".exe"
+            devel_gs = unixpath(devel_gs)
+        return devel_gs if os.path.exists(devel_gs) else None
+
+    def gs_env(self, gs, home, slot):
+        """Return the environment needed to run the GS command gs with
+           the given home.
+        """
+        env = {
+            "GNATSTUDIO_HOME": home,
+            "GNATINSPECT": shutil.which("gnatinspect") + " --exit",
+            "GNATSTUDIO": gs,
+            "GPS": gs,
+            "GPS_WRAPPER": " ".join(self.env.valgrind_cmd),
+            "GNATSTUDIO_PYTHON_COV": self.test_env["pycov"],
+            # For the tests of the testsuite drivers themselves
+            "GNATSTUDIO_TESTSUITE_DRIVERS": os.path.dirname(
+                os.path.abspath(__file__)),
+        }
+        env.update(Xvfbs.get_env(slot))
+        return env
+
     def run(self, previous_values, slot):
         # Check whether the test should be skipped
         skip = self.should_skip()
@@ -147,17 +174,13 @@ class BasicTestDriver(GPSTestDriver):
         # If there's a test.cmd, execute it with the shell;
         # otherwise execute test.py.
         wd = self.test_env["working_dir"]
-        base = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
         # In the development environment, run the development GPS,
         # otherwise use the GS found on the PATH
-        devel_gs = os.path.join(base, "gnatstudio", "obj", "gnatstudio")
-        if sys.platform == "win32":
-            devel_gs += ".exe"
-            devel_gs = unixpath(devel_gs)
+        devel_gs = self.devel_executable()
         test_cmd = os.path.join(wd, "test.cmd")
 
-        if os.path.exists(devel_gs):
+        if devel_gs:
             # We are testing the development executable: we need to
             # pass the valgrind command ourselves.
             if os.path.exists(test_cmd):
@@ -180,16 +203,7 @@ class BasicTestDriver(GPSTestDriver):
                 # run the script directly
                 cmd_line = [GS, "--load=python:test.py"]
 
-        env = {
-            "GNATSTUDIO_HOME": self.test_env["working_dir"],
-            "GNATINSPECT": shutil.which("gnatinspect") + " --exit",
-            "GNATSTUDIO": GS,
-            "GPS": GS,
-            "GPS_WRAPPER": " ".join(self.env.valgrind_cmd),
-            "GNATSTUDIO_PYTHON_COV": self.test_env["pycov"],
-        }
-
-        env.update(Xvfbs.get_env(slot))
+        env = self.gs_env(GS, wd, slot)
 
         process = Run(
             cmd_line,
@@ -202,19 +216,25 @@ class BasicTestDriver(GPSTestDriver):
             env=env,
             ignore_environ=False,
         )
-        output = process.out
+        self.analyze(process.status, process.out)
+
+    def analyze(self, status, output):
+        """Set the result of the test from the exit status and output of GS
+           and push it.
+        """
+        wd = self.test_env["working_dir"]
 
         if output:
             # If there's an output, capture it
             self.result.log += output
 
         is_error = False
-        if process.status:
+        if status:
             # Nonzero status?
-            if process.status == 100:
+            if status == 100:
                 # This one is an xfail
                 self.result.set_status(TestStatus.XFAIL)
-            elif process.status == 99:
+            elif status == 99:
                 # This is intentionally deactivated in this configuration
                 self.result.set_status(TestStatus.SKIP)
             else:
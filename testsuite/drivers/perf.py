@@ -0,0 +1,160 @@
+from e3.testsuite.result import TestStatus
+from drivers.basic import BasicTestDriver
+import datetime
+import json
+import os
+import socket
+import statistics
+import threading
+
+BASELINE_RUNS = 5
+# The number of previous runs whose median is used as a reference
+
+MIN_DELTA = 0.05
+# Differences below this number of seconds are never regressions: they are
+# in the noise of the measures.
+
+
+class PerfHistory(object):
+    """ The timings recorded by the perf tests on this machine.
+
+        The history is stored as JSON, in <directory>/<hostname>.json:
+            {"runs": [{"date": "...",
+                       "results": {"<test>": {"<measure>": <seconds>}}}]}
+    """
+
+    def __init__(self):
+        self.file = None
+        self.runs = []
+        self.current = {}
+        self.lock = threading.Lock()
+
+    def load(self, file):
+        self.file = file
+        try:
+            with open(self.file) as f:
+                self.runs = json.load(f)["runs"]
+        except (IOError, ValueError, KeyError):
+            self.runs = []
+
+    def baseline(self, test, measure, runs=None):
+        """ The reference time for the measure in runs (by default all the
+            runs in the history), or None if it was never recorded.
+        """
+        values = [run["results"][test][measure]
+                  for run in (self.runs if runs is None else runs)
+                  if measure in run["results"].get(test, {})]
+        if values:
+            return statistics.median(values[-BASELINE_RUNS:])
+        return None
+
+    def is_regression(self, test, measure, value, threshold, runs=None):
+        """ Whether value is more than threshold percent slower than the
+            reference.
+        """
+        ref = self.baseline(test, measure, runs)
+        return (ref is not None
+                and value - ref > MIN_DELTA
+                and value > ref * (1 + threshold / 100.0))
+
+    def add(self, test, measures):
+        with self.lock:
+            self.current[test] = measures
+
+    def save(self):
+        if not self.current:
+            return
+        self.runs.append({"date": datetime.datetime.now().isoformat(),
+                          "results": self.current})
+        os.makedirs(os.path.dirname(self.file), exist_ok=True)
+        tmp = self.file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"runs": self.runs}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.file)
+
+    def report(self, results, runs, threshold):
+        """ Return the comparison of results (as in self.current) with
+            the given previous runs, as a list of lines.
+        """
+        lines = []
+        for test in sorted(results):
+            for measure, value in sorted(results[test].items()):
+                ref = self.baseline(test, measure, runs)
+                if ref is None:
+                    lines.append("%-50s %9.3fs  (new)" % (
+                        test + ":" + measure, value))
+                else:
+                    lines.append("%-50s %9.3fs  %+6.1f%%%s" % (
+                        test + ":" + measure, value,
+                        (value - ref) * 100.0 / ref if ref else 0.0,
+                        "  REGRESSION" if self.is_regression(
+                            test, measure, value, threshold, runs) else ""))
+        return lines
+
+
+PerfResults = PerfHistory()
+
+
+def history_file(directory):
+    """The file that stores the history of this machine in directory"""
+    return os.path.join(directory, socket.gethostname() + ".json")
+
+
+def read_timings(wd):
+    """ Read the time.out file written by record_time in wd, as a dict
+        {measure: seconds}.
+    """
+    result = {}
+    try:
+        with open(os.path.join(wd, "time.out")) as f:
+            for line in f:
+                words = line.split()
+                if len(words) == 1:
+                    result["time"] = float(words[0])
+                elif len(words) == 2:
+                    result[words[0]] = float(words[1])
+    except (IOError, ValueError):
+        pass
+    return result
+
+
+class PerfTestDriver(BasicTestDriver):
+    """ A test measuring the performance of GS. The test records its
+        timings with gs_utils.internal.utils.record_time.
+
+        When the testsuite is run with --perf, the timings are stored in the
+        history of the machine, and the test fails if one of them is slower
+        than the median of the previous runs by more than the threshold
+        (--perf-threshold, or perf_threshold in test.yaml, in percent).
+        Otherwise this is a regular test.
+    """
+
+    def analyze(self, status, output):
+        if status or output or not self.env.options.perf:
+            super(PerfTestDriver, self).analyze(status, output)
+            return
+
+        test = self.test_env["test_name"]
+        timings = read_timings(self.test_env["working_dir"])
+        threshold = float(self.test_env.get(
+            "perf_threshold", self.env.options.perf_threshold))
+        PerfResults.add(test, timings)
+
+        regressions = [
+            "%s: %.3fs, reference %.3fs" % (
+                measure, value, PerfResults.baseline(test, measure))
+            for measure, value in sorted(timings.items())
+            if PerfResults.is_regression(test, measure, value, threshold)]
+
+        self.result.log += "".join(
+            "%s: %.3fs\n" % m for m in sorted(timings.items()))
+        if regressions:
+            self.result.log += "performance regressions:\n%s\n" % (
+                "\n".join(regressions))
+            self.result.set_status(TestStatus.FAIL, "performance regression")
+        elif not timings:
+            self.result.log += "no timings recorded in time.out\n"
+            self.result.set_status(TestStatus.ERROR)
+        else:
+            self.result.set_status(TestStatus.PASS)
+        self.push_result()
@@ -0,0 +1,190 @@
+from e3.fs import mkdir, sync_tree, rm
+from e3.testsuite.result import TestStatus
+from drivers.basic import BasicTestDriver
+import glob
+import json
+import os
+import socket
+import subprocess
+import time
+
+WARM_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "warm_server.py")
+# The script loaded in each warm instance of GS
+
+START_TIMEOUT = 120
+# How long to wait for a warm instance to start, in seconds
+
+
+class WarmInstance(object):
+    """A GS instance that runs tests one after the other (see
+       warm_server.py).
+    """
+
+    def __init__(self, driver, slot):
+        """Start a GS instance for the given job slot"""
+        testsuite_dir = os.path.join(os.path.dirname(__file__), "..")
+        self.home = os.path.abspath(os.path.join(
+            driver.env.working_dir, "warm-{}".format(slot)))
+        self.pristine_home = os.path.abspath(
+            os.path.join(testsuite_dir, "gnatstudio_home"))
+        mkdir(self.home)
+        self.reset_home()
+
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        listener.settimeout(START_TIMEOUT * driver.env.wait_factor)
+
+        gs = driver.devel_executable() or "gnatstudio"
+        env = dict(os.environ)
+        env.update(driver.gs_env(gs, self.home, slot))
+        env["GNATSTUDIO_WARM_PORT"] = str(listener.getsockname()[1])
+
+        self.log = os.path.join(self.home, "output.log")
+        self.log_fd = open(self.log, "wb")
+        self.process = subprocess.Popen(
+            driver.env.valgrind_cmd + [gs, "--load=python:" + WARM_SERVER],
+            cwd=self.home, env=env,
+            stdout=self.log_fd, stderr=subprocess.STDOUT)
+
+        try:
+            self.conn, _ = listener.accept()
+        except Exception:
+            self.process.kill()
+            self.log_fd.close()
+            raise
+        finally:
+            listener.close()
+        self.buffer = b""
+
+    def reset_home(self):
+        """Restore the .gnatstudio directory of the instance"""
+        gps_home = os.path.join(self.home, ".gnatstudio")
+        for f in glob.glob(os.path.join(gps_home, "*")):
+            if os.path.basename(f) != "log":
+                rm(f, recursive=True)
+        mkdir(gps_home)
+        sync_tree(self.pristine_home, gps_home, delete=False)
+
+    def run(self, wd, timeout):
+        """Run the test.py in wd and return its exit status and output.
+           Raise an exception if the instance did not answer in time, in
+           which case it should not be used anymore.
+        """
+        offset = os.path.getsize(self.log)
+        self.conn.settimeout(timeout)
+        self.conn.sendall((json.dumps(
+            {"dir": wd, "script": os.path.join(wd, "test.py")}) + "\n").encode(
+                "utf-8"))
+
+        while b"\n" not in self.buffer:
+            data = self.conn.recv(4096)
+            if not data:
+                raise EOFError("warm instance exited")
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        status = json.loads(line.decode("utf-8"))["status"]
+
+        with open(self.log, "rb") as f:
+            f.seek(offset)
+            output = f.read().decode("utf-8", errors="replace")
+
+        self.reset_home()
+        return status, output
+
+    def stop(self):
+        try:
+            self.conn.close()
+            self.process.wait(timeout=30)
+        except Exception:
+            self.process.kill()
+        self.log_fd.close()
+
+
+class WarmInstanceRegistry(object):
+    """The pool of warm instances, one per job slot"""
+
+    def __init__(self):
+        self.instances = {}
+
+    def get(self, driver, slot):
+        """Return the instance for slot, starting it if needed"""
+        if slot not in self.instances:
+            self.instances[slot] = WarmInstance(driver, slot)
+        return self.instances[slot]
+
+    def discard(self, slot):
+        """Kill the instance for slot: a new one will be started for the
+           next test.
+        """
+        instance = self.instances.pop(slot, None)
+        if instance is not None:
+            instance.process.kill()
+            instance.stop()
+
+    def stop_instances(self):
+        for instance in self.instances.values():
+            instance.stop()
+        self.instances = {}
+
+
+WarmInstances = WarmInstanceRegistry()
+
+
+class WarmTestDriver(BasicTestDriver):
+    """ Run the tests in GS instances that are kept running between tests,
+        which avoids paying the startup of GS for each test.
+
+        Only the tests whose test.yaml contains
+                warm: True
+        are run this way, the others are run as with BasicTestDriver, in a
+        new GS. See testsuite/README.md for the tests that are safe to mark.
+        Marked tests are still run in a new GS if:
+          - they have a test.cmd
+          - they do not use run_test_driver
+          - they do not have exactly one project in their directory
+    """
+
+    def needs_cold_start(self):
+        wd = self.test_env["working_dir"]
+        test_py = os.path.join(wd, "test.py")
+
+        if (not self.test_env.get("warm")
+                or self.env.options.pycov
+                or self.env.options.valgrind_memcheck
+                or "GPS_PREVENT_EXIT" in os.environ
+                or os.path.exists(os.path.join(wd, "test.cmd"))
+                or not os.path.exists(test_py)
+                or len(glob.glob(os.path.join(wd, "*.gpr"))) != 1):
+            return True
+
+        with open(test_py) as f:
+            return "run_test_driver" not in f.read()
+
+    def run(self, previous_values, slot):
+        if self.needs_cold_start():
+            return super(WarmTestDriver, self).run(previous_values, slot)
+
+        skip = self.should_skip()
+        if skip is not None:
+            self.result.set_status(skip)
+            self.push_result()
+            return False
+
+        start = time.time()
+        try:
+            instance = WarmInstances.get(self, slot)
+            status, output = instance.run(
+                self.test_env["working_dir"], 120 * self.env.wait_factor)
+        except Exception as e:
+            # The instance is stuck or has crashed
+            WarmInstances.discard(slot)
+            self.result.log += "warm instance failed after {:.1f}s: {}\n".format(
+                time.time() - start, e)
+            self.result.set_status(TestStatus.ERROR)
+            self.result.log += self._capture_for_developers()
+            self.push_result()
+            return
+
+        self.analyze(status, output)
@@ -0,0 +1,197 @@
+"""
+Script loaded in the warm instances of GS started by drivers/warm.py.
+
+Once GS has started, it connects to the port given by GNATSTUDIO_WARM_PORT
+and waits for requests, one JSON object per line:
+
+    {"dir": <working directory of the test>, "script": <test.py>}
+
+For each request, the state of GS is reset (editors closed, messages
+cleared, project of the test loaded), then the test script is executed.
+The test ends when it calls GPS.exit: instead of exiting, the exit status
+is sent back to the driver:
+
+    {"status": <exit status>}
+
+and the instance waits for the next test. The workflows of the test are
+stopped, and what the test changed is undone: the views it opened are
+closed, the preferences get back their previous value, and the hook
+functions and actions it added are removed. GS exits when the driver closes
+the connection.
+"""
+
+import GPS
+import json
+import glob
+import os
+import runpy
+import socket
+import sys
+import traceback
+from gi.repository import GLib
+
+
+class WarmServer(object):
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.buffer = b""
+        self.running = None  # the test being run
+
+        # The views that exist once GS has started are kept between tests
+        self.permanent_views = set(w.name() for w in GPS.MDI.children())
+
+        self.saved_prefs = {}    # name -> value before the test
+        self.saved_actions = set()  # the actions that existed before the test
+        self.added_hooks = []    # the (hook, function) added by the test
+
+        self.real_exit = GPS.exit
+        self.real_hook_add = GPS.Hook.add
+        self.real_hook_add_debounce = GPS.Hook.add_debounce
+        GPS.exit = self.on_exit
+        GPS.Hook.add = self.make_hook_add(self.real_hook_add)
+        GPS.Hook.add_debounce = self.make_hook_add(
+            self.real_hook_add_debounce)
+
+        GLib.io_add_watch(self.sock.fileno(), GLib.PRIORITY_DEFAULT,
+                          GLib.IO_IN | GLib.IO_HUP, self.on_input)
+
+    def make_hook_add(self, real_add):
+        server = self
+
+        def hook_add(hook, function, *args, **kwargs):
+            if server.running:
+                server.added_hooks.append((hook, function))
+            return real_add(hook, function, *args, **kwargs)
+
+        return hook_add
+
+    def on_input(self, fd, condition):
+        data = self.sock.recv(65536)
+        if not data:
+            # The driver has stopped
+            self.real_exit(force=True)
+            return False
+
+        self.buffer += data
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            request = json.loads(line.decode("utf-8"))
+            GLib.idle_add(lambda r=request: self.run_test(r))
+        return True
+
+    def reset(self, wd):
+        """Reset the state of GS before running a test in wd"""
+        for buf in GPS.EditorBuffer.list():
+            buf.close(force=True)
+
+        for window in GPS.MDI.children():
+            if window.name() not in self.permanent_views:
+                window.close(force=True)
+
+        for category in GPS.Locations.list_categories():
+            GPS.Locations.remove_category(category)
+        GPS.Console("Messages").clear()
+
+        # The status of the testsuite utilities
+        import gs_utils.internal.asserts as asserts
+        import gs_utils.internal.utils as utils
+        asserts.exit_status = asserts.SUCCESS
+        utils.exit_status = asserts.SUCCESS
+        utils.before_exit_has_run = 0
+
+        os.chdir(wd)
+        GPS.cd(wd)
+        GPS.Project.load(glob.glob(os.path.join(wd, "*.gpr"))[0],
+                         force=True, keep_desktop=False)
+
+    def snapshot(self):
+        """Record the state that restore puts back after the test"""
+        self.saved_prefs = {}
+        for name in GPS.Preference.list():
+            try:
+                self.saved_prefs[name] = GPS.Preference(name).get()
+            except GPS.Exception:
+                # A type of preference not supported by the Python API: it
+                # cannot be set by the test either
+                pass
+
+        self.saved_actions = set(GPS.lookup_actions())
+        self.added_hooks = []
+
+    def restore(self, wd):
+        """Undo the changes done by the test in wd"""
+        for hook, function in reversed(self.added_hooks):
+            try:
+                hook.remove(function)
+            except GPS.Exception:
+                pass  # Already removed by the test
+        self.added_hooks = []
+
+        for name in set(GPS.lookup_actions()) - self.saved_actions:
+            GPS.Action(name).unregister()
+
+        GPS.freeze_prefs()
+        try:
+            for name, value in self.saved_prefs.items():
+                pref = GPS.Preference(name)
+                if pref.get() != value:
+                    pref.set(value)
+        finally:
+            GPS.thaw_prefs()
+
+        # Forget the modules of the test, which might be reused with the
+        # same name by another test
+        for name, module in list(sys.modules.items()):
+            f = getattr(module, "__file__", None) or ""
+            if f.startswith(wd):
+                del sys.modules[name]
+        if wd in sys.path:
+            sys.path.remove(wd)
+
+    def run_test(self, request):
+        wd = request["dir"]
+        self.running = wd
+        try:
+            self.reset(wd)
+            self.snapshot()
+            sys.path.insert(0, wd)
+            runpy.run_path(request["script"], run_name="__main__")
+        except Exception:
+            GPS.Logger("TESTSUITE").log(
+                "Warm instance could not run the test:\n%s"
+                % traceback.format_exc())
+            self.on_exit(force=True, status=1)
+        return False
+
+    def on_exit(self, force=False, status=0):
+        if not self.running:
+            # The test has already exited, for instance both explicitly and
+            # at the end of run_test_driver, or from the finally block of a
+            # workflow stopped below
+            return
+
+        wd = self.running
+        self.running = None
+
+        # The test might exit while its workflow is waiting for something:
+        # it must not resume during the next test
+        import gs_utils.internal.driver as driver
+        for workflow in driver.test_workflows:
+            workflow.stop()
+        driver.test_workflows = []
+
+        self.restore(wd)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.sock.sendall(
+            (json.dumps({"status": int(status)}) + "\n").encode("utf-8"))
+
+
+def on_gps_started(hook):
+    global server
+    server = WarmServer(int(os.environ["GNATSTUDIO_WARM_PORT"]))
+
+
+server = None
+GPS.Hook("gps_started").add(on_gps_started)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""
+Compare the timings of the last run of the perf tests with the previous
+runs, as recorded in the history of a machine by "./run-tests --perf":
+
+    ./perf_report.py [--threshold PERCENT] [perf_history/<hostname>.json]
+"""
+from drivers.perf import PerfHistory, history_file
+import argparse
+import os
+import sys
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--threshold", type=float, default=20,
+                    help="The slowdown, in percent, reported as a regression")
+parser.add_argument("history", nargs="?", default=history_file(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "perf_history")))
+args = parser.parse_args()
+
+history = PerfHistory()
+history.load(args.history)
+
+if not history.runs:
+    sys.exit("No perf results in %s" % args.history)
+
+last = history.runs[-1]
+print("Run of %s, compared with the %d previous runs" % (
+    last["date"], len(history.runs) - 1))
+report = history.report(last["results"], history.runs[:-1], args.threshold)
+print("\n".join(report))
+sys.exit(1 if any(line.endswith("REGRESSION") for line in report) else 0)
@@ -0,0 +1,67 @@
+"""
+Test for the compiler_artifacts cache: an artifact is generated again only
+when its inputs or its parameters change, and a request with other
+parameters while it is being generated waits for the current generation
+instead of running a second process on the same artifact.
+"""
+import os
+import GPS
+import compiler_artifacts
+from gs_utils.internal.utils import *
+
+
+@run_test_driver
+def run_test():
+    source = GPS.File("foo.adb")
+    path = os.path.join(os.getcwd(), "foo.artifact")
+    generated = []  # the params of each completed generation
+    ready = []      # the callbacks called, in order
+
+    def artifact(params):
+        def on_output(path, output):
+            gps_assert(compiler_artifacts._running[path].artifact.params,
+                       params, "Another generation is running")
+            generated.append(params)
+            with open(path, "w") as f:
+                f.write(str(params))
+
+        return compiler_artifacts.Artifact(
+            path, source, os.path.join(os.getcwd(), "foo.ali"),
+            "sleep 0.2", on_output=on_output, params=params)
+
+    def request(params, name):
+        compiler_artifacts.request(
+            artifact(params), lambda path: ready.append(name))
+
+    gps_assert(compiler_artifacts.PREFETCH_PREF.get(), False,
+               "Prefetching should be disabled by default")
+
+    # Generated once, then reused
+    request(1, "first")
+    yield wait_until_true(lambda: ready)
+    request(1, "again")
+    gps_assert(ready, ["first", "again"],
+               "An up to date artifact should be ready immediately")
+    gps_assert(generated, [1], "The artifact should be generated once")
+
+    # Other parameters while it is being generated: the requests wait
+    request(2, "2")
+    request(2, "2 bis")
+    request(3, "3")
+    request(4, "4")
+    request(4, "4 bis")
+    yield wait_until_true(lambda: "4 bis" in ready)
+    gps_assert(generated, [1, 2, 4],
+               "Only the last waiting request should be generated")
+    gps_assert(ready, ["first", "again", "2", "2 bis", "4", "4 bis"],
+               "Wrong callbacks called")
+    gps_assert(compiler_artifacts._running, {}, "Generations left running")
+    gps_assert(compiler_artifacts._waiting, {}, "Requests left waiting")
+
+    # A change in the source file makes it out of date
+    mtime = os.path.getmtime(path) + 10
+    os.utime(source.path, (mtime, mtime))
+    request(4, "modified")
+    yield wait_until_true(lambda: "modified" in ready)
+    gps_assert(generated, [1, 2, 4, 4],
+               "The artifact should be generated again")
@@ -0,0 +1,66 @@
+"""
+Test for the scheduling of gnatinspect: the compilation_finished events
+received within the coalescing delay are handled by a single run, and no
+run is needed when no ALI file changed.
+"""
+import os
+import GPS
+import cross_references
+from gs_utils.internal.utils import *
+
+XREF_TARGET = "Load Xref Info"
+
+
+def compilation_finished():
+    GPS.Hook("compilation_finished").run(
+        "Builder results", "Build All", "default", 0, [])
+
+
+@run_test_driver
+def run_test():
+    r = cross_references.r
+    GPS.execute_action("Build All")
+    yield wait_tasks()
+    yield r.wait_up_to_date()
+
+    # The testsuite computes the database as soon as it is requested:
+    # coalesce the requests as in a normal session.
+    r.synchronous = False
+    runs = []
+
+    def on_compilation_finished(hook, category, target_name="", *args):
+        if target_name == XREF_TARGET:
+            runs.append(target_name)
+
+    GPS.Hook("compilation_finished").add(on_compilation_finished)
+
+    # A changed ALI file: one run for all the events
+    ali = os.path.join(GPS.Project.root().object_dirs()[0], "main.ali")
+    stamp = os.stat(ali)
+    os.utime(ali, (stamp.st_atime, stamp.st_mtime + 10))
+
+    for _ in range(5):
+        compilation_finished()
+    gps_assert(r.state, cross_references.PENDING,
+               "gnatinspect should wait for the end of the coalescing delay")
+
+    yield r.wait_up_to_date()
+    yield timeout(2 * cross_references.COALESCE_DELAY)
+    yield wait_tasks()
+    gps_assert(len(runs), 1,
+               "the events should be handled by a single run of gnatinspect")
+    gps_assert(r.is_up_to_date(), True,
+               "the database should be up to date")
+
+    # No ALI file changed: no run at all
+    for _ in range(5):
+        compilation_finished()
+
+    yield r.wait_up_to_date()
+    yield timeout(2 * cross_references.COALESCE_DELAY)
+    yield wait_tasks()
+    gps_assert(len(runs), 1,
+               "gnatinspect should not run when no ALI file changed")
+
+    GPS.Hook("compilation_finished").remove(on_compilation_finished)
+    r.synchronous = True
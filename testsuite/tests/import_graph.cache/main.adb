@@ -0,0 +1,6 @@
+with A;
+
+procedure Main is
+begin
+   A.Y := 1;
+end Main;
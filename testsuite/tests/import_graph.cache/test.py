@@ -0,0 +1,63 @@
+"""
+Test for the import graph shared by the dependency plugins: the imports are
+read from the cache until the cross-reference database is updated.
+"""
+import GPS
+import cross_references
+import import_graph
+from gs_utils.internal.utils import *
+
+NEW_MAIN = """with B;
+
+procedure Main is
+begin
+   B.X := 1;
+end Main;
+"""
+
+
+def names(path):
+    return [f.base_name() for f in path] if path else path
+
+
+def project_imports():
+    return {p.name(): sorted((s.base_name(), f.base_name()) for s, f in deps)
+            for p, deps in import_graph.graph.project_imports(
+                GPS.Project.root()).items()}
+
+
+@run_test_driver
+def run_test():
+    graph = import_graph.graph
+    main = GPS.File("main.adb")
+    b = GPS.File("b.ads")
+
+    GPS.execute_action("Build All")
+    yield wait_tasks()
+    yield cross_references.r.wait_up_to_date()
+
+    gps_assert(names(graph.shortest_path(main, b)),
+               ["main.adb", "a.ads", "b.ads"],
+               "wrong path before the change")
+    gps_assert(project_imports(), {"Lib": [("a.ads", "b.ads")]},
+               "wrong project imports before the change")
+
+    # Until the database is updated, the cached imports are used
+    with open(main.path, "w") as f:
+        f.write(NEW_MAIN)
+    gps_assert(names(graph.shortest_path(main, b)),
+               ["main.adb", "a.ads", "b.ads"],
+               "the imports should be read from the cache")
+
+    # The build updates the database, which discards the cache
+    GPS.execute_action("Build All")
+    yield wait_tasks()
+    yield cross_references.r.wait_up_to_date()
+
+    gps_assert(names(graph.shortest_path(main, b)),
+               ["main.adb", "b.ads"],
+               "the path should be computed again after xref_updated")
+    gps_assert(project_imports(),
+               {"Lib": [("a.ads", "b.ads"), ("main.adb", "b.ads")]},
+               "the project imports should be computed again after"
+               + " xref_updated")
@@ -0,0 +1,34 @@
+"""
+Test the words sent to aspell by the ispell plugin, and its cache of
+checked words.
+"""
+import GPS
+from gs_utils.internal.utils import *
+import ispell
+
+
+@run_test_driver
+def run_test():
+    yield wait_idle()
+
+    # Contractions are checked as a whole
+    gps_assert(ispell.word_re.findall("It doesn't work, isn't it? (yes)"),
+               ["It", "doesn't", "work", "isn't", "it", "yes"],
+               "Wrong words found in the text")
+
+    module = ispell.Spell_Check_Module()
+    module.add_results(["doesn't", "teh"],
+                       "*\n& teh 3 1: the, tea, ten\n")
+    gps_assert("doesn't" in module.good_words, True,
+               "A contraction accepted by aspell should be correct")
+    gps_assert(module.bad_words.get("teh"), ["the", "tea", "ten"],
+               "Wrong suggestions for a mispelled word")
+
+    # A word accepted by the user while it was being checked remains
+    # correct when the result arrives
+    module._accept_word("wrod")
+    module.add_results(["wrod"], "& wrod 2 1: word, rod\n")
+    gps_assert("wrod" in module.bad_words, False,
+               "An accepted word should not be mispelled again")
+    gps_assert(module.is_known("wrod"), True,
+               "An accepted word should be in the cache")
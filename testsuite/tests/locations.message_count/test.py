@@ -0,0 +1,51 @@
+"""
+Verify GPS.Message.count and the "Clear locations for file" contextual
+filter which relies on it.
+"""
+
+import GPS
+from gs_utils.internal.utils import *
+
+
+@run_test_driver
+def driver():
+    foo = GPS.File("foo.adb")
+    bar = GPS.File("bar.adb")
+    flags = GPS.Message.Flags
+
+    GPS.Message("cat1", foo, 3, 4, "first",
+                show_on_editor_side=False, show_in_locations=True)
+    GPS.Message("cat1", foo, 1, 1, "second",
+                show_on_editor_side=True, show_in_locations=False)
+    GPS.Message("cat2", foo, 2, 1, "third",
+                show_on_editor_side=True, show_in_locations=True)
+    GPS.Message("cat2", bar, 2, 1, "fourth",
+                show_on_editor_side=True, show_in_locations=False)
+
+    gps_assert(GPS.Message.count(), 4, "wrong total count")
+    gps_assert(GPS.Message.count(category="cat1"), 2,
+               "wrong count for cat1")
+    gps_assert(GPS.Message.count(file=foo), 3, "wrong count for foo.adb")
+    gps_assert(GPS.Message.count(category="cat2", file=bar), 1,
+               "wrong count for cat2 and bar.adb")
+    gps_assert(GPS.Message.count(flags=flags.IN_LOCATIONS), 2,
+               "wrong count of messages in the Locations view")
+    gps_assert(GPS.Message.count(file=bar, flags=flags.IN_LOCATIONS), 0,
+               "bar.adb should have no message in the Locations view")
+    gps_assert(GPS.Message.count(category="unknown"), 0,
+               "wrong count for an unknown category")
+
+    GPS.execute_action("export locations to editor")
+    yield wait_idle()
+
+    buf = GPS.EditorBuffer.get()
+    gps_assert(buf.get_chars().splitlines(),
+               ["cat1",
+                "    " + foo.path,
+                "        3:4 first",
+                "",
+                "cat2",
+                "    " + foo.path,
+                "        2:1 third",
+                ""],
+               "wrong export of the Locations view")
@@ -0,0 +1,6 @@
+with Ada.Text_IO;
+
+procedure Main is
+begin
+   null;
+end Main;
@@ -0,0 +1,40 @@
+"""
+Measure the time between a keystroke and the display of the completion
+window, with the completion provided by the Ada language server.
+"""
+import time
+from gs_utils.internal.utils import *
+
+ITERATIONS = 5
+
+
+@run_test_driver
+def run_test():
+    GPS.Preference("Smart-Completion-Mode").set("3")
+    buf = GPS.EditorBuffer.get(GPS.File("main.adb"))
+    view = buf.current_view()
+    yield wait_tasks()
+
+    times = []
+    for _ in range(ITERATIONS):
+        view.goto(buf.at(5, 1).end_of_line())
+        buf.insert(buf.at(5, 1).end_of_line(), "\n   Ada.Text_IO.")
+        view.goto(buf.at(6, 1).end_of_line())
+        yield wait_idle()
+
+        start = time.time()
+        send_key_event(ord("P"))
+        yield wait_until_true(
+            lambda: get_widget_by_name("completion-view") is not None)
+        times.append(time.time() - start)
+
+        gps_assert(get_widget_by_name("completion-view") is not None, True,
+                   "The completion window should be displayed")
+        send_key_event(GDK_ESCAPE)
+        yield wait_idle()
+        buf.delete(buf.at(6, 1), buf.at(6, 1).end_of_line())
+        buf.delete(buf.at(5, 1).end_of_line(), buf.at(6, 1))
+        yield wait_idle()
+
+    record_time(times[0], "first")
+    record_time(min(times), "best")
@@ -0,0 +1,37 @@
+"""
+Measure the time needed to open a large Ada file in an editor, until the
+editor is idle (highlighted, and its outline and xrefs computed).
+"""
+import time
+from gs_utils.internal.utils import *
+
+SUBPROGRAMS = 10000
+
+
+def generate(path):
+    with open(path, "w") as f:
+        f.write("package body Big is\n")
+        for j in range(SUBPROGRAMS):
+            f.write("   procedure P%d (X : in out Integer) is\n"
+                    "   begin\n"
+                    "      X := X + %d;  --  increment\n"
+                    "   end P%d;\n\n" % (j, j, j))
+        f.write("end Big;\n")
+
+
+@run_test_driver
+def run_test():
+    generate("big.adb")
+    GPS.Project.recompute()
+    yield wait_tasks(other_than=known_tasks)
+
+    start = time.time()
+    buf = GPS.EditorBuffer.get(GPS.File("big.adb"))
+    yield wait_idle()
+    record_time(time.time() - start, "open")
+
+    yield wait_tasks(other_than=known_tasks)
+    record_time(time.time() - start, "open_and_tasks")
+
+    gps_assert(buf.lines_count(), SUBPROGRAMS * 5 + 2,
+               "The whole file should have been loaded")
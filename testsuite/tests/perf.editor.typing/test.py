@@ -0,0 +1,44 @@
+"""
+Measure the time needed to process a keystroke (highlighting and parsing)
+at the beginning of a large Ada file.
+"""
+import time
+from gs_utils.internal.utils import *
+
+SUBPROGRAMS = 5000
+KEYSTROKES = 50
+
+
+def generate(path):
+    with open(path, "w") as f:
+        f.write("package body Big is\n")
+        for j in range(SUBPROGRAMS):
+            f.write("   procedure P%d (X : in out Integer) is\n"
+                    "   begin\n"
+                    "      X := X + %d;\n"
+                    "   end P%d;\n\n" % (j, j, j))
+        f.write("end Big;\n")
+
+
+@run_test_driver
+def run_test():
+    generate("big.adb")
+    GPS.Project.recompute()
+    buf = GPS.EditorBuffer.get(GPS.File("big.adb"))
+    yield wait_tasks(other_than=known_tasks)
+
+    view = buf.current_view()
+    view.goto(buf.at(2, 1))
+    buf.insert(buf.at(2, 1), "   --  \n")
+    view.goto(buf.at(2, 8))
+    yield wait_idle()
+
+    start = time.time()
+    for _ in range(KEYSTROKES):
+        send_key_event(ord("x"))
+        yield wait_idle()
+    record_time((time.time() - start) / KEYSTROKES, "keystroke")
+
+    gps_assert(buf.get_chars(buf.at(2, 1), buf.at(2, 1).end_of_line()),
+               "   --  " + "x" * KEYSTROKES,
+               "All the keystrokes should have been processed")
@@ -0,0 +1,34 @@
+"""
+Measure the time needed to create, display and remove a large number of
+messages in the Locations view.
+"""
+import time
+from gs_utils.internal.utils import *
+
+FILES = 100
+MESSAGES_PER_FILE = 1000
+CATEGORY = "perf"
+
+
+@run_test_driver
+def run_test():
+    files = [GPS.File("file%d.adb" % j) for j in range(FILES)]
+
+    start = time.time()
+    for f in files:
+        for line in range(1, MESSAGES_PER_FILE + 1):
+            GPS.Message(CATEGORY, f, line, 1, "message %d" % line,
+                        show_on_editor_side=False, show_in_locations=True)
+    record_time(time.time() - start, "create")
+
+    yield wait_idle()
+    record_time(time.time() - start, "create_and_display")
+
+    gps_assert(GPS.Message.count(category=CATEGORY),
+               FILES * MESSAGES_PER_FILE,
+               "All the messages should have been created")
+
+    start = time.time()
+    GPS.Locations.remove_category(CATEGORY)
+    yield wait_idle()
+    record_time(time.time() - start, "remove")
@@ -0,0 +1,45 @@
+"""
+Measure the time needed to load a project with many source files.
+"""
+import os
+import time
+from gs_utils.internal.utils import *
+
+DIRS = 20
+UNITS_PER_DIR = 100
+
+
+def generate():
+    for d in range(DIRS):
+        dir = os.path.join("src", "dir%d" % d)
+        os.makedirs(dir)
+        for u in range(UNITS_PER_DIR):
+            name = "pkg_%d_%d" % (d, u)
+            with open(os.path.join(dir, name + ".ads"), "w") as f:
+                f.write("package %s is\n   procedure P;\nend %s;\n"
+                        % (name, name))
+            with open(os.path.join(dir, name + ".adb"), "w") as f:
+                f.write("package body %s is\n"
+                        "   procedure P is null;\nend %s;\n"
+                        % (name, name))
+
+    with open("big.gpr", "w") as f:
+        f.write('project Big is\n'
+                '   for Source_Dirs use ("src/**");\n'
+                'end Big;\n')
+
+
+@run_test_driver
+def run_test():
+    generate()
+
+    start = time.time()
+    GPS.Project.load("big.gpr")
+    record_time(time.time() - start, "load")
+
+    yield wait_tasks(other_than=known_tasks)
+    record_time(time.time() - start, "load_and_tasks")
+
+    gps_assert(len(GPS.Project.root().sources()),
+               DIRS * UNITS_PER_DIR * 2,
+               "All the sources should be found")
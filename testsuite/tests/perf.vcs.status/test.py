@@ -0,0 +1,63 @@
+"""
+Measure the time needed to compute the VCS status of the files of a
+project stored in a large git repository.
+"""
+import os
+import shutil
+import subprocess
+import time
+from gs_utils.internal.utils import *
+
+FILES = 2000
+MODIFIED = 200
+
+
+def git(*args):
+    subprocess.check_call(("git",) + args, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+
+
+def generate():
+    os.makedirs(os.path.join("repo", "src"))
+    os.chdir("repo")
+    try:
+        with open("repo.gpr", "w") as f:
+            f.write('project Repo is\n'
+                    '   for Source_Dirs use ("src");\n'
+                    'end Repo;\n')
+        for j in range(FILES):
+            with open(os.path.join("src", "unit_%d.ads" % j), "w") as f:
+                f.write("package Unit_%d is\nend Unit_%d;\n" % (j, j))
+
+        git("init")
+        git("config", "user.email", "<>")
+        git("config", "user.name", "gps")
+        git("add", ".")
+        git("commit", "-m", "init")
+
+        for j in range(MODIFIED):
+            with open(os.path.join("src", "unit_%d.ads" % j), "a") as f:
+                f.write("--  modified\n")
+    finally:
+        os.chdir("..")
+
+
+@run_test_driver
+def run_test():
+    if not shutil.which("git"):
+        gps_not_run("git is not available")
+        return
+
+    generate()
+
+    start = time.time()
+    GPS.Project.load(os.path.join("repo", "repo.gpr"))
+    vcs = GPS.VCS2.active_vcs()
+    vcs.ensure_status_for_all_source_files()
+    yield wait_tasks(other_than=known_tasks)
+    record_time(time.time() - start, "status")
+
+    gps_assert(vcs.name, "git", "git should be detected")
+    status = vcs.get_file_status(GPS.File(os.path.join("repo", "src", "unit_0.ads")))
+    gps_assert(bool(status[0] & GPS.VCS2.Status.MODIFIED), True,
+               "The modified files should be detected")
@@ -0,0 +1,25 @@
+"""
+Run by testsuite.warm_reset in a warm instance: changes the state of GS,
+and exits while its workflow is still running. None of this should be
+visible from second/test.py.
+"""
+import os
+import GPS
+from gs_utils.internal.utils import *
+
+
+def warm_reset_leak(*args):
+    pass
+
+
+@run_test_driver
+def run_test():
+    GPS.Preference("General-Charset").set("ISO-8859-5")
+    GPS.execute_action("open Bookmarks")
+    GPS.Hook("file_edited").add(warm_reset_leak)
+    GPS.Action("warm reset leak").create(lambda: None)
+    yield wait_idle()
+
+    GPS.exit(force=True)
+    yield timeout(200)
+    os.environ["WARM_RESET_RESUMED"] = "1"
@@ -0,0 +1,26 @@
+"""
+Run by testsuite.warm_reset in the warm instance that ran first/test.py:
+check that the changes of the previous test were undone.
+"""
+import os
+import GPS
+from gs_utils.internal.utils import *
+
+
+@run_test_driver
+def run_test():
+    yield timeout(400)
+
+    gps_assert(GPS.Preference("General-Charset").get(),
+               os.environ["WARM_RESET_CHARSET"],
+               "The preference set by the previous test was not restored")
+    gps_assert(GPS.MDI.get("Bookmarks"), None,
+               "The view opened by the previous test was not closed")
+    gps_assert("warm_reset_leak" in " ".join(
+                   GPS.Hook("file_edited").describe_functions()),
+               False,
+               "The hook function added by the previous test was kept")
+    gps_assert(GPS.Action("warm reset leak").exists(), False,
+               "The action created by the previous test was kept")
+    gps_assert("WARM_RESET_RESUMED" in os.environ, False,
+               "The workflow of the previous test was resumed")
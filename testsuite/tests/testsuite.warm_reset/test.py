@@ -0,0 +1,66 @@
+"""
+Test for the warm instances of the testsuite (drivers/warm_server.py): run
+first/test.py then second/test.py in the same GS, as the warm driver does,
+and check that the state changed by the first one does not leak into the
+second one (which does the checks).
+"""
+import json
+import os
+import runpy
+import socket
+import GPS
+from gs_utils.internal.utils import *
+import gs_utils.internal.driver as driver
+
+
+@run_test_driver
+def run_test():
+    # This test is run in a GS of its own: the state of the workflows
+    # started by run_test_driver must not include this one
+    driver.test_workflows = []
+
+    view = GPS.MDI.get("Bookmarks")
+    if view:
+        view.close(force=True)
+    os.environ["WARM_RESET_CHARSET"] = GPS.Preference("General-Charset").get()
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    os.environ["GNATSTUDIO_WARM_PORT"] = str(port)
+
+    server_module = runpy.run_path(os.path.join(
+        os.environ["GNATSTUDIO_TESTSUITE_DRIVERS"], "warm_server.py"))
+    server = server_module["WarmServer"](port)
+    conn, _ = listener.accept()
+    listener.close()
+    conn.setblocking(False)
+
+    received = [b""]
+
+    def status_received():
+        try:
+            received[0] += conn.recv(4096)
+        except BlockingIOError:
+            pass
+        return b"\n" in received[0]
+
+    here = os.getcwd()
+    statuses = []
+    try:
+        for name in ("first", "second"):
+            wd = os.path.join(here, name)
+            conn.sendall((json.dumps(
+                {"dir": wd, "script": os.path.join(wd, "test.py")}) + "\n"
+            ).encode("utf-8"))
+            yield wait_until_true(status_received, timeout=30000)
+            line, received[0] = received[0].split(b"\n", 1)
+            statuses.append(json.loads(line.decode("utf-8"))["status"])
+    finally:
+        # Give back the real GS to the end of this test
+        GPS.exit = server.real_exit
+        GPS.Hook.add = server.real_hook_add
+        GPS.Hook.add_debounce = server.real_hook_add_debounce
+
+    gps_assert(statuses, [0, 0], "Wrong exit status of the warm tests")
@@ -0,0 +1,32 @@
+"""
+Test for workflows.map_concurrent: the jobs run with a bounded
+concurrency, and their results are emitted in the order of completion.
+"""
+import GPS
+from gs_utils.internal.utils import *
+import workflows
+from workflows.promises import timeout
+
+
+@run_test_driver
+def run_test():
+    running = [0]
+    max_running = [0]
+    completed = []
+
+    def job(delay):
+        running[0] += 1
+        max_running[0] = max(max_running[0], running[0])
+        yield timeout(delay)
+        running[0] -= 1
+        yield delay * 2
+
+    results = yield workflows.map_concurrent(
+        job, [500, 100, 200, 50, 10], 2).subscribe(
+            lambda r: completed.append(r))
+
+    gps_assert(max_running[0], 2, "Too many jobs running at the same time")
+    gps_assert(results, [1000, 200, 400, 100, 20],
+               "Wrong results, in the order of the items")
+    gps_assert([index for index, _ in completed], [1, 2, 3, 4, 0],
+               "Wrong order of completion")
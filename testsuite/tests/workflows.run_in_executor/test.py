@@ -0,0 +1,55 @@
+"""
+Test for workflows.run_in_executor: the function runs in a background
+thread, and is not allowed to call the GPS API, which is checked when the
+WORKFLOW.EXECUTOR_GUARD trace is active.
+"""
+import GPS
+import sys
+import threading
+from gs_utils.internal.utils import *
+import workflows
+
+
+@run_test_driver
+def run_test():
+    def compute(n):
+        return (sum(range(n)), threading.current_thread().name)
+
+    result, thread = yield workflows.run_in_executor(compute, 1000)
+    gps_assert(result, 499500, "Wrong result computed in the executor")
+    gps_assert(thread.startswith("gs-executor"), True,
+               "The function should run in an executor thread")
+
+    # The check is only done when the trace is active
+    workflows.GUARD.set_active(False)
+    profile = yield workflows.run_in_executor(sys.getprofile)
+    gps_assert(profile, None, "The function should not be profiled")
+    workflows.GUARD.set_active(True)
+
+    errors = []
+    workflows.run_in_executor(GPS.Project.root).then(
+        lambda r: errors.append("not rejected"),
+        lambda reason: errors.append(reason))
+    yield wait_until_true(lambda: errors)
+    gps_assert("cannot be called from run_in_executor" in errors[0], True,
+               "GPS API should not be usable in the executor: %s" % errors)
+
+    # The promise is rejected even if the function caught the error and
+    # returned normally. Python removes the profile function after the error,
+    # so the function must not call the GPS API again.
+    def catch_and_return():
+        try:
+            GPS.Project.root()
+            return "not blocked"
+        except RuntimeError:
+            return "blocked"
+
+    errors = []
+    workflows.run_in_executor(catch_and_return).then(
+        lambda r: errors.append("not rejected: %s" % (r, )),
+        lambda reason: errors.append(reason))
+    yield wait_until_true(lambda: errors)
+    gps_assert("cannot be called from run_in_executor" in errors[0], True,
+               "A caught error should still reject the promise: %s" % errors)
+    gps_assert(sys.getprofile() is None, True,
+               "The guard should not be set in the main thread")
@@ -0,0 +1,37 @@
+"""
+Test for workflows.promises.wait_until: the predicate can process the
+pending events, and thus be evaluated again before it returns. The
+promise must be resolved only once.
+"""
+import GPS
+from gs_utils.internal.utils import *
+from workflows.promises import wait_until
+
+HOOK = "wait_until_reentrant"
+
+
+@run_test_driver
+def run_test():
+    GPS.Hook.register(HOOK)
+    calls = []
+    results = []
+
+    def predicate():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            # Evaluate the predicate again while this call is running
+            GPS.Hook(HOOK).run()
+            process_all_events()
+        return True
+
+    p = wait_until(predicate, hooks=(HOOK, ))
+    p.then(results.append)
+    yield timeout(200)
+
+    gps_assert(len(calls), 2, "The predicate should be evaluated twice")
+    gps_assert(results, [True], "The promise should be resolved once")
+
+    # The hook is no longer connected
+    GPS.Hook(HOOK).run()
+    yield timeout(200)
+    gps_assert(len(calls), 2, "The predicate should not be evaluated anymore")
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 from drivers.basic import BasicTestDriver, Xvfbs
+from drivers.warm import WarmTestDriver, WarmInstances
+from drivers.perf import PerfTestDriver, PerfResults, history_file
 from distutils.spawn import find_executable
 from e3.testsuite import Testsuite
 from e3.testsuite.testcase_finder import YAMLTestFinder
 from e3.env import Env
+import logging
 import os
 
 DEFAULT_XVFB_DISPLAY = 1001
@@ -52,6 +55,28 @@ class GSPublicTestsuite(Testsuite):
             default=False,
             action="store_true",
             help="Generate a python coverage report.")
+        parser.add_argument(
+            "--warm",
+            default=False,
+            action="store_true",
+            help="Run the tests in GS instances kept running between tests,"
+                 " one per job, instead of starting GS for each test.")
+        parser.add_argument(
+            "--perf",
+            default=False,
+            action="store_true",
+            help="Record the timings of the perf tests in the history of"
+                 " this machine, and fail on performance regressions.")
+        parser.add_argument(
+            "--perf-threshold",
+            default=20,
+            type=float,
+            help="The slowdown, in percent, above which a perf test fails.")
+        parser.add_argument(
+            "--perf-history",
+            default=os.path.join(os.path.dirname(__file__), "perf_history"),
+            help="The directory where the timings of the perf tests are"
+                 " stored.")
 
     def set_up(self):
 
@@ -84,6 +109,9 @@ class GSPublicTestsuite(Testsuite):
                                           for opt in VALGRIND_OPTIONS]
             self.env.wait_factor = 10  # valgrind is slow
 
+        if self.env.options.perf:
+            PerfResults.load(history_file(self.env.options.perf_history))
+
         # Launch Xvfb if needs be
         self.xvfb = None
 
@@ -97,11 +125,21 @@ class GSPublicTestsuite(Testsuite):
 
     def tear_down(self):
         super(GSPublicTestsuite, self).tear_down()
+        WarmInstances.stop_instances()
         Xvfbs.stop_displays()
 
+        if self.env.options.perf:
+            report = PerfResults.report(
+                PerfResults.current, PerfResults.runs,
+                self.env.options.perf_threshold)
+            PerfResults.save()
+            logging.info("Performance report:\n%s", "\n".join(report))
+
     @property
     def test_driver_map(self):
-        return {'default': BasicTestDriver}
+        if self.main.args.warm:
+            return {'default': WarmTestDriver, 'perf': PerfTestDriver}
+        return {'default': BasicTestDriver, 'perf': PerfTestDriver}
 
     @property
     def default_driver(self):